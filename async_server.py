@@ -0,0 +1,202 @@
+import asyncio
+import json
+from typing import List
+import aiohttp
+from cache import TTLCache
+from model import User, Channel, MessagePage
+
+_MISSING = object()  # entrée absente ou expirée du cache
+
+class AsyncRemoteServer:
+    """Version asyncio de RemoteServer.
+
+    Expose les mêmes méthodes que BaseServer sous forme de coroutines. Les
+    requêtes indépendantes sont lancées en parallèle et le nombre de requêtes
+    en vol est borné par un sémaphore. S'utilise avec "async with" ou en
+    appelant close() en fin d'utilisation.
+    """
+    def __init__(self, url, max_in_flight : int = 20, user_cache_ttl : float = 60.0, connect_timeout : float = 3.05, read_timeout : float = 10.0, session : aiohttp.ClientSession = None):
+        self.url = url
+        self.max_in_flight = max_in_flight
+        self.timeout = aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout)
+        self.session = session
+        self.semaphore = None
+        self.user_cache = TTLCache(ttl=user_cache_ttl)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _session(self) -> aiohttp.ClientSession:
+        # Créés à la première requête pour appartenir à la boucle d'événements en cours.
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _get(self, path : str, **kwargs):
+        session = self._session()
+        async with self.semaphore:
+            async with session.get(self.url + path, **kwargs) as response:
+                return await response.json()
+
+    async def _post(self, path : str, payload : dict):
+        """Renvoie (code HTTP, texte de la réponse)."""
+        session = self._session()
+        async with self.semaphore:
+            async with session.post(self.url + path, json=payload) as response:
+                return response.status, await response.text()
+
+    async def _refresh_users(self) -> list:
+        users = await self._get("/users")
+        for user in users:
+            self.user_cache.set(user['id'], user['name'])
+        return users
+
+    async def _resolve_sender_names(self, messages : list):
+        """Renseigne sender_name avec au plus un GET /users."""
+        # Une seule lecture du cache par expéditeur : une entrée qui expire entre
+        # un test d'appartenance et la lecture donnerait None.
+        names = {}
+        missing = set()
+        for sender_id in {message['sender_id'] for message in messages}:
+            name = self.user_cache.get(sender_id, _MISSING)
+            if name is _MISSING:
+                missing.add(sender_id)
+            else:
+                names[sender_id] = name
+        if missing:
+            await self._refresh_users()
+            for sender_id in missing:
+                name = self.user_cache.get(sender_id, _MISSING)
+                if name is _MISSING:
+                    # Utilisateur supprimé : mémorisé pour ne pas relancer le téléchargement
+                    name = "Unknown"
+                    self.user_cache.set(sender_id, name)
+                names[sender_id] = name
+        for message in messages:
+            message['sender_name'] = names[message['sender_id']]
+        return messages
+
+    def cache_stats(self) -> dict:
+        return self.user_cache.stats()
+
+    async def get_user_name(self, user_id : int) -> str:
+        name = self.user_cache.get(user_id, _MISSING)
+        if name is _MISSING:
+            await self._refresh_users()
+            name = self.user_cache.get(user_id, "Unknown")
+        return name
+
+    async def get_users(self) -> List[User]:
+        users = await self._refresh_users()
+        return [User(id=user['id'], name=user['name']) for user in users]
+
+    async def create_user(self, name : str) -> User:
+        users = await self._refresh_users()
+        if any(user["name"] == name for user in users):
+            print(f"\033[31mL'utilisateur {name} existe déjà.\033[0m")
+            return
+
+        status, text = await self._post("/users/create", {"name": name})
+        if status != 200:
+            print(f"\033[31mErreur lors de la création de l'utilisateur {name}.\033[0m")
+            return None
+        user = json.loads(text)
+        self.user_cache.set(user['id'], user['name'])
+        print(f"\033[32mL'utilisateur {name} a été créé avec succès.\033[0m")
+        return User(id=user['id'], name=user['name'])
+
+    async def get_channels(self) -> List[Channel]:
+        channels = await self._get("/channels")
+        return [Channel(id=channel['id'], name=channel['name']) for channel in channels]
+
+    async def create_channel(self, name : str) -> Channel:
+        channels = await self._get("/channels")
+        if any(channel["name"] == name for channel in channels):
+            print(f"\033[31mLe canal {name} existe déjà.\033[0m")
+            return
+
+        status, text = await self._post("/channels/create", {"name": name})
+        if status != 200:
+            print(f"\033[31mErreur lors de la création du canal {name} : {text}\033[0m")
+            return None
+        channel = json.loads(text)
+        print(f"\033[32mLe canal {name} a été crée avec succès.\033[0m")
+        return Channel(id=channel['id'], name=channel['name'])
+
+    async def get_channel_members(self, channel_id : int) -> List[User]:
+        return await self._get(f"/channels/{channel_id}/members")
+
+    async def join_channel(self, channel_id : int, user_name : str):
+        # Utilisateurs et membres du canal sont demandés en parallèle.
+        users, members = await asyncio.gather(self._refresh_users(), self.get_channel_members(channel_id))
+        user = next((user for user in users if user["name"] == user_name), None)
+        if user is None:
+            print("\033[31mUtilisateur introuvable.\033[0m")
+            return
+
+        if any(member.get("id") == user["id"] for member in members):
+            print(f"\033[34m{user_name} est déjà dans le canal {channel_id}.\033[0m")
+            return
+
+        status, text = await self._post(f"/channels/{channel_id}/join", {"user_id": user["id"], "name": user_name})
+        if status == 200:
+            print(f"\033[32m{user_name} (ID: {user['id']}) a rejoint le canal {channel_id}.\033[0m")
+        else:
+            print(f"\033[31mErreur lors de la jonction au canal : {text}\033[0m")
+
+    async def get_all_messages(self) -> list:
+        messages = await self._get("/messages", headers={"accept": "application/json"})
+        return await self._resolve_sender_names(messages)
+
+    async def get_messages(self, channel_id : int) -> list:
+        page = await self._get(f"/channels/{channel_id}/messages")
+        return await self._resolve_sender_names(page['messages'])
+
+    async def get_messages_page(self, channel_id : int, limit : int = 50, before : int = None, after : int = None) -> MessagePage:
+        params = {"limit": limit}
+        if before is not None:
+            params["before"] = before
+        if after is not None:
+            params["after"] = after
+        page = await self._get(f"/channels/{channel_id}/messages", params=params)
+        await self._resolve_sender_names(page['messages'])
+        return MessagePage(page['messages'], before=page.get('before'), after=page.get('after'))
+
+    async def post_message(self, channel_id : int, sender_name : str, content : str) -> dict:
+        # Les trois vérifications préalables sont indépendantes : un seul aller-retour en temps.
+        users, members, channels = await asyncio.gather(
+            self._refresh_users(),
+            self.get_channel_members(channel_id),
+            self._get("/channels"),
+        )
+        user = next((user for user in users if user['name'] == sender_name), None)
+        if user is None:
+            print("\033[31mUtilisateur introuvable.\033[0m")
+            return None
+
+        channel = next((c for c in channels if c['id'] == channel_id), None)
+        if channel is None:
+            print("\033[31mCanal introuvable.\033[0m")
+            return None
+
+        if not any(m['id'] == user['id'] for m in members):
+            print(f"\033[31m{sender_name} doit rejoindre le canal {channel_id} avant d'envoyer des messages.\033[0m")
+            return None
+
+        status, text = await self._post(f"/channels/{channel_id}/messages/post", {"sender_id": user['id'], "content": content})
+        if status != 200:
+            print(f"\033[31mErreur lors de l'envoi du message.\033[0m")
+            return None
+        print(f"\033[32m{sender_name} a envoyé un message avec succès dans le canal {channel['name']}.\033[0m")
+        return (await self._resolve_sender_names([json.loads(text)]))[0]
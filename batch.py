@@ -0,0 +1,279 @@
+import json
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
+from server import BaseServer
+
+# Écritures regroupées : les commandes consécutives de même nature sont
+# envoyées en un seul appel aux API groupées du serveur.
+WRITES = {"create_user", "join_channel", "post_message"}
+
+def read_commands(stream):
+    """Itère sur les commandes d'un flux JSON lines : (numéro de ligne, commande ou erreur de syntaxe).
+
+    Les lignes vides et celles qui commencent par # sont ignorées.
+    """
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            command = json.loads(line)
+        except ValueError as error:
+            yield number, ValueError(f"JSON invalide : {error}")
+            continue
+        if not isinstance(command, dict) or "op" not in command:
+            yield number, ValueError("Commande sans champ op.")
+            continue
+        yield number, command
+
+def _entity(item) -> dict:
+    # Les serveurs distants peuvent renvoyer des dictionnaires plutôt que des User.
+    if isinstance(item, dict):
+        return {"id": item["id"], "name": item["name"]}
+    return {"id": item.id, "name": item.name}
+
+def _message(item) -> dict:
+    # RemoteServer renvoie les messages tels que reçus (dictionnaires, date ISO 8601).
+    if not isinstance(item, dict):
+        return item.to_dict()
+    date = item.get("reception_date", item.get("date"))
+    if isinstance(date, str):
+        date = datetime.fromisoformat(date).timestamp()
+    return {"id": item.get("id"), "sender_id": item["sender_id"], "channel": item.get("channel_id", item.get("channel")),
+            "content": item["content"], "date": date}
+
+class BatchRunner:
+    """Exécute des commandes JSON lines sur un BaseServer, sans menu ni nettoyage de la console.
+
+    Chaque commande produit une ligne JSON sur output, dans l'ordre des
+    commandes : {"line", "op", "ok", "result"} ou {"line", "op", "ok": false,
+    "error"}. Les créations d'utilisateurs, adhésions (au même canal) et envois
+    de messages consécutifs sont regroupés par lots de batch_size et exécutés
+    avec create_users, join_channel_many et post_messages ; un lot refusé par
+    le serveur est rejoué commande par commande pour attribuer les erreurs.
+    Une lecture, une autre écriture, {"op": "flush"} ou la fin du flux
+    exécutent le lot en attente. Les messages des serveurs vont sur stderr.
+    """
+    def __init__(self, server : BaseServer, output=None, batch_size : int = 1000):
+        self.server = server
+        self.output = output or sys.stdout
+        self.batch_size = batch_size
+        self.pending = []  # (ligne, commande) du lot en cours
+        self.pending_key = None
+        self.failures = 0
+        self.last_line = 0  # dernière ligne ayant reçu son résultat
+        # Noms d'utilisateurs et ids de canaux connus, chargés une fois à la première
+        # adhésion ou au premier envoi pour valider sans relister à chaque commande.
+        self.user_names = None
+        self.channel_ids = None
+        self.reads = {
+            "users": self._users,
+            "channels": self._channels,
+            "members": self._members,
+            "messages": self._messages,
+            "search": self._search,
+            "since": self._since,
+            "between": self._between,
+            "stats": self._stats,
+        }
+        self.writes = {
+            "create_channel": self._create_channel,
+            "ban_user": self._ban_user,
+            "ban_channel": self._ban_channel,
+        }
+
+    def run(self, stream) -> int:
+        """Exécute toutes les commandes du flux ; renvoie le nombre de commandes en échec."""
+        with redirect_stdout(sys.stderr):
+            for number, command in read_commands(stream):
+                if isinstance(command, Exception):
+                    self._flush()
+                    self._emit(number, None, error=str(command))
+                else:
+                    self.execute(number, command)
+            self._flush()
+        return self.failures
+
+    def execute(self, number : int, command : dict):
+        op = command["op"]
+        if op in WRITES:
+            key = (op, command.get("channel_id")) if op == "join_channel" else op
+            if key != self.pending_key or len(self.pending) >= self.batch_size:
+                self._flush()
+                self.pending_key = key
+            self.pending.append((number, command))
+            return
+        self._flush()
+        if op == "flush":
+            return
+        handler = self.reads.get(op) or self.writes.get(op)
+        if handler is None:
+            self._emit(number, op, error=f"Commande inconnue : {op}")
+            return
+        try:
+            self._emit(number, op, result=handler(command))
+        except KeyError as error:
+            self._emit(number, op, error=f"Champ manquant : {error.args[0]}")
+        except (ValueError, TypeError, AttributeError, OSError) as error:
+            self._emit(number, op, error=str(error))
+
+    def _emit(self, number : int, op : str, result=None, error : str = None):
+        self.last_line = number
+        if error is None:
+            line = {"line": number, "op": op, "ok": True, "result": result}
+        else:
+            self.failures += 1
+            line = {"line": number, "op": op, "ok": False, "error": error}
+        self.output.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.output.flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        pending, self.pending, self.pending_key = self.pending, [], None
+        commands = []
+        for number, command in pending:
+            missing = [field for field in self._fields(command["op"]) if field not in command]
+            if missing:
+                self._emit(number, command["op"], error=f"Champ manquant : {missing[0]}")
+            else:
+                commands.append((number, command))
+        if not commands:
+            return
+        op = commands[0][1]["op"]
+        try:
+            {"create_user": self._create_users, "join_channel": self._join_channel, "post_message": self._post_messages}[op](commands)
+        except (ValueError, TypeError, AttributeError, KeyError, OSError) as error:
+            # Erreur au milieu du lot (serveur injoignable...) : les commandes sans résultat échouent.
+            for number, _ in commands:
+                if number > self.last_line:
+                    self._emit(number, op, error=str(error))
+
+    @staticmethod
+    def _fields(op : str) -> tuple:
+        return {"create_user": ("name",), "join_channel": ("channel_id", "user_name"),
+                "post_message": ("channel_id", "sender_name", "content")}[op]
+
+    # Écritures regroupées
+    def _create_users(self, commands : list):
+        users = self.server.create_users([command["name"] for _, command in commands]) if len(commands) > 1 else None
+        if users is None:
+            users = [self.server.create_user(command["name"]) for _, command in commands]
+        for (number, command), user in zip(commands, users):
+            if user is None:
+                self._emit(number, "create_user", error=f"Utilisateur {command['name']} refusé par le serveur.")
+            else:
+                if self.user_names is not None:
+                    self.user_names.add(command["name"])
+                self._emit(number, "create_user", result=_entity(user))
+
+    def _load_known(self):
+        if self.user_names is None:
+            self.user_names = {_entity(user)["name"] for user in self.server.get_users()}
+            self.channel_ids = {channel.id for channel in self.server.get_channels()}
+
+    def _unknown(self, channel_id : int, user_name : str) -> str:
+        """Message d'erreur si le canal ou l'utilisateur n'existe pas, None sinon."""
+        if channel_id not in self.channel_ids:
+            return f"Canal {channel_id} introuvable."
+        if user_name not in self.user_names:
+            return f"Utilisateur {user_name} introuvable."
+        return None
+
+    def _join_channel(self, commands : list):
+        self._load_known()
+        channel_id = commands[0][1]["channel_id"]
+        errors = [self._unknown(channel_id, command["user_name"]) for _, command in commands]
+        valid = [command["user_name"] for (_, command), error in zip(commands, errors) if error is None]
+        if valid:
+            self.server.join_channel_many(channel_id, valid)
+        for (number, command), error in zip(commands, errors):
+            if error is None:
+                self._emit(number, "join_channel", result={"channel_id": channel_id, "user_name": command["user_name"]})
+            else:
+                self._emit(number, "join_channel", error=error)
+
+    def _post_messages(self, commands : list):
+        self._load_known()
+        errors = [self._unknown(command["channel_id"], command["sender_name"]) for _, command in commands]
+        messages = [(command["channel_id"], command["sender_name"], command["content"])
+                    for (_, command), error in zip(commands, errors) if error is None]
+        posted = self.server.post_messages(messages) if len(messages) > 1 else None
+        if posted is None:
+            posted = [self.server.post_message(*message) for message in messages]
+        posted = iter(posted)
+        for (number, command), error in zip(commands, errors):
+            if error is not None:
+                self._emit(number, "post_message", error=error)
+                continue
+            message = next(posted)
+            if message is None:
+                self._emit(number, "post_message", error=f"Message de {command['sender_name']} refusé sur le canal {command['channel_id']}.")
+            else:
+                self._emit(number, "post_message", result=_message(message))
+
+    # Autres écritures
+    def _create_channel(self, command : dict) -> dict:
+        channel = self.server.create_channel(command["name"])
+        if channel is None:
+            raise ValueError(f"Canal {command['name']} refusé par le serveur.")
+        if self.channel_ids is not None:
+            self.channel_ids.add(channel.id)
+        return _entity(channel)
+
+    def _ban_user(self, command : dict):
+        self.server.ban_user(command["name"])
+        self.user_names = self.channel_ids = None
+
+    def _ban_channel(self, command : dict):
+        self.server.ban_channel(command["name"])
+        self.user_names = self.channel_ids = None
+
+    # Lectures
+    def _users(self, command : dict) -> list:
+        return [_entity(user) for user in self.server.get_users()]
+
+    def _channels(self, command : dict) -> list:
+        return [_entity(channel) for channel in self.server.get_channels()]
+
+    def _members(self, command : dict) -> list:
+        return [_entity(member) for member in self.server.get_channel_members(command["channel_id"])]
+
+    def _messages(self, command : dict):
+        if "limit" not in command and "before" not in command and "after" not in command:
+            return [_message(message) for message in self.server.get_messages(command["channel_id"])]
+        page = self.server.get_messages_page(command["channel_id"], command.get("limit", 50), command.get("before"), command.get("after"))
+        return {"messages": [_message(message) for message in page.messages], "before": page.before, "after": page.after}
+
+    def _search(self, command : dict) -> list:
+        messages = self.server.search_messages(command["query"], command.get("channel_id"), command.get("sender_name"),
+                                               command.get("limit", 20), command.get("offset", 0))
+        return [_message(message) for message in messages]
+
+    def _since(self, command : dict) -> list:
+        messages = self.server.get_messages_since(command.get("seq", 0), command.get("channel_id"), command.get("limit"))
+        return [_message(message) for message in messages]
+
+    def _between(self, command : dict) -> list:
+        messages = self.server.get_messages_between(command["start"], command["end"], command.get("channel_id"), command.get("limit"))
+        return [_message(message) for message in messages]
+
+    def _stats(self, command : dict) -> dict:
+        stats = {}
+        if hasattr(self.server, "cache_stats"):
+            stats["cache"] = self.server.cache_stats()
+        if hasattr(self.server, "sync_status"):
+            stats["replica"] = self.server.sync_status()
+        metrics = getattr(self.server, "metrics", None)
+        if metrics is not None:
+            stats["metrics"] = metrics.snapshot()
+        return stats
+
+def run_batch(server : BaseServer, path : str = "-", output=None, batch_size : int = 1000) -> int:
+    """Exécute un fichier de commandes JSON lines (- pour l'entrée standard) ; renvoie le nombre d'échecs."""
+    runner = BatchRunner(server, output, batch_size)
+    if path == "-":
+        return runner.run(sys.stdin)
+    with open(path, "r", encoding="utf-8") as f:
+        return runner.run(f)
@@ -0,0 +1,199 @@
+"""Mesure les chemins critiques de Server et de RemoteServer sur des jeux de données synthétiques.
+
+Pour chaque taille, un processus neuf génère un fichier au format de
+messenger2.json, chronomètre les opérations du serveur local puis les mêmes
+opérations via RemoteServer contre http_server lancé dans un thread. Le
+résultat est un JSON (percentiles de latence, débit, pic de mémoire résidente)
+à comparer d'un commit à l'autre.
+
+Usage : python -m benchmarks.hot_paths [--sizes 1000,100000,1000000] [--repeat 20] [--journal] [--no-remote] [--output resultats.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def generate_dataset(path : str, messages : int, users : int, channels : int):
+    """Écrit un fichier au schéma de messenger2.json.
+
+    L'utilisateur u est membre de son canal u % channels + 1 et y poste ses
+    messages : le canal suivant reste libre pour les mesures de join_channel.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"users": ' + json.dumps([{"id": u, "name": f"user{u}"} for u in range(1, users + 1)]))
+        members = {c: [] for c in range(1, channels + 1)}
+        for u in range(1, users + 1):
+            members[u % channels + 1].append({"id": u, "name": f"user{u}"})
+        f.write(', "channels": ' + json.dumps([{"id": c, "name": f"channel{c}", "members": members[c]} for c in range(1, channels + 1)]))
+        f.write(', "messages": [')
+        for i in range(messages):
+            sender_id = i % users + 1
+            if i:
+                f.write(', ')
+            f.write(json.dumps({"sender_id": sender_id, "channel": sender_id % channels + 1, "content": f"message {i} de user{sender_id}"}))
+        f.write(']}')
+
+def percentile(sorted_values : list, p : float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies : list) -> dict:
+    """Percentiles en millisecondes et débit en opérations par seconde."""
+    values = sorted(latencies)
+    total = sum(values)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+        "ops_per_s": round(len(values) / total, 1) if total else None,
+    }
+
+def timed(function, arguments : list) -> dict:
+    """Appelle function(*args) pour chaque args de la liste et résume les latences."""
+    latencies = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets sous Linux.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def bench_local(path : str, repeat : int, users : int, channels : int, journal : bool) -> dict:
+    from server import Server
+    senders = [i % users + 1 for i in range(repeat)]
+    results = {}
+    results["load"] = timed(lambda: Server(path, journal=journal).close(), [()] * max(1, repeat // 5))
+
+    server = Server(path, journal=journal)
+    results["save"] = timed(server.save, [()] * max(1, repeat // 5))
+    results["get_messages"] = timed(server.get_messages, [(c % channels + 1,) for c in range(repeat)])
+    results["get_all_messages"] = timed(server.get_all_messages, [()] * max(1, repeat // 5))
+    results["post_message"] = timed(server.post_message, [(u % channels + 1, f"user{u}", f"bench {u}") for u in senders])
+    # Chaque utilisateur rejoint le canal suivant son canal d'origine, dont il n'est pas membre.
+    results["join_channel"] = timed(server.join_channel, [((u % channels + 1) % channels + 1, f"user{u}") for u in range(1, min(repeat, users) + 1)])
+    results["ban_channel"] = timed(server.ban_channel, [(f"channel{c}",) for c in range(1, min(repeat, channels - 1) + 1)])
+    server.close()
+    return results
+
+def start_http_server(path : str, journal : bool):
+    """Lance http_server dans un thread sur un port libre ; renvoie (url, fonction d'arrêt)."""
+    from aiohttp import web
+    from http_server import MessengerHTTPServer
+    from server import Server
+
+    server = Server(path, journal=journal)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(MessengerHTTPServer(server).app)
+    loop.run_until_complete(runner.setup())
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    loop.run_until_complete(web.SockSite(runner, sock).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        server.close()
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", stop
+
+def bench_remote(path : str, repeat : int, users : int, channels : int, journal : bool) -> dict:
+    from server import RemoteServer
+    url, stop = start_http_server(path, journal)
+    remote = RemoteServer(url)
+    senders = [i % users + 1 for i in range(repeat)]
+    results = {}
+    try:
+        results["get_users"] = timed(remote.get_users, [()] * repeat)
+        results["get_channels"] = timed(remote.get_channels, [()] * repeat)
+        results["get_messages"] = timed(remote.get_messages, [(c % channels + 1,) for c in range(repeat)])
+        results["get_all_messages"] = timed(remote.get_all_messages, [()] * max(1, repeat // 5))
+        results["post_message"] = timed(remote.post_message, [(u % channels + 1, f"user{u}", f"bench {u}") for u in senders])
+        results["join_channel"] = timed(remote.join_channel, [((u % channels + 1) % channels + 1, f"user{u}") for u in range(1, min(repeat, users) + 1)])
+    finally:
+        remote.close()
+        stop()
+    return results
+
+def run_size(messages : int, repeat : int, journal : bool, remote : bool) -> dict:
+    """Exécuté dans un processus dédié pour que le pic de mémoire soit propre à la taille."""
+    users = max(10, min(10_000, messages // 100))
+    channels = max(10, min(1000, messages // 1000))
+    with tempfile.TemporaryDirectory() as directory:
+        result = {"messages": messages, "users": users, "channels": channels}
+        path = os.path.join(directory, "bench.json")
+        start = time.perf_counter()
+        generate_dataset(path, messages, users, channels)
+        result["generate_s"] = round(time.perf_counter() - start, 3)
+        result["file_bytes"] = os.path.getsize(path)
+
+        # Les messages de succès de Server ne doivent pas fausser les mesures ni la sortie JSON.
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            result["local"] = bench_local(path, repeat, users, channels, journal)
+            if remote:
+                generate_dataset(path, messages, users, channels)
+                for suffix in (".log", ".tmp"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                result["remote"] = bench_remote(path, repeat, users, channels, journal)
+        result["peak_rss_kb"] = peak_rss_kb()
+    return result
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default="1000,100000,1000000", help="Nombres de messages, séparés par des virgules")
+    parser.add_argument('--repeat', type=int, default=20, help="Nombre d'appels mesurés par opération")
+    parser.add_argument('--journal', action='store_true', help="Serveur local en mode journal")
+    parser.add_argument('--no-remote', action='store_true', help="Ne mesure pas RemoteServer")
+    parser.add_argument('--output', help="Fichier de sortie (par défaut : sortie standard)")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "journal": args.journal,
+        "repeat": args.repeat,
+        "runs": [],
+    }
+    for size in (int(size) for size in args.sizes.split(",")):
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            report["runs"].append(pool.submit(run_size, size, args.repeat, args.journal, not args.no_remote).result())
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
@@ -0,0 +1,50 @@
+"""Compare la mémoire occupée par l'ancien modèle Message et par MessageLog.
+
+Usage : python -m benchmarks.memory_model [--messages 1000000]
+"""
+import argparse
+import json
+import tracemalloc
+from model import MessageLog
+
+class LegacyMessage():
+    """Ancienne représentation : un objet avec __dict__ et sender_name par message."""
+    def __init__(self, sender_id, channel_id, content):
+        self.sender_id = sender_id
+        self.channel_id = channel_id
+        self.content = content
+        self.sender_name = None
+
+def generate(count, users=1000, channels=100):
+    for i in range(count):
+        yield i % users + 1, i % channels + 1, f"message {i}"
+
+def measure(build, count):
+    """Renvoie (octets alloués, pic) pour la construction de count messages, contenus inclus."""
+    tracemalloc.start()
+    data = build(generate(count))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current, peak
+
+def build_legacy(rows):
+    return [LegacyMessage(*row) for row in rows]
+
+def build_columnar(rows):
+    log = MessageLog()
+    for row in rows:
+        log.append(*row)
+    return log
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, build in (("legacy", build_legacy), ("columnar", build_columnar)):
+        current, peak = measure(build, args.messages)
+        results[name] = {"bytes": current, "peak_bytes": peak, "bytes_per_message": round(current / args.messages, 1)}
+    results["ratio"] = round(results["columnar"]["bytes"] / results["legacy"]["bytes"], 3)
+    print(json.dumps({"messages": args.messages, "results": results}, indent=2))
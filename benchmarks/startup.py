@@ -0,0 +1,113 @@
+"""Mesure le temps d'import des modules et le temps de démarrage de messenger2.py.
+
+Chaque mesure est faite dans un processus Python neuf : import de server et
+client (dépendances lourdes chargées ou non), puis lancement du menu sur un
+fichier local (JSON ou binaire, avec ou sans --lazy) jusqu'à l'affichage de
+l'invite. Avec --max-import-ms, le script échoue si l'import dépasse ce budget
+ou si le mode local importe requests ou aiohttp, pour détecter une régression.
+
+Usage : python -m benchmarks.startup [--messages 100000] [--repeat 5] [--max-import-ms 50] [--output resultats.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from benchmarks.hot_paths import generate_dataset, git_revision
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("requests", "urllib3", "aiohttp", "sqlite3")
+PROMPT = "Choisissez une option"
+
+IMPORT_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+def measure_import(modules : str, repeat : int) -> dict:
+    """Import de modules (séparés par des virgules) dans repeat processus neufs."""
+    times = []
+    heavy = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(modules=modules, heavy=HEAVY_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        heavy = result["heavy"]
+    return {"median_ms": round(statistics.median(times) * 1000, 2), "min_ms": round(min(times) * 1000, 2), "heavy_modules": heavy}
+
+def measure_startup(arguments : list, repeat : int) -> dict:
+    """Lance messenger2.py ; chronomètre l'affichage de l'invite du menu puis la sortie (option x)."""
+    to_prompt = []
+    total = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-u", "messenger2.py", *arguments, "--client-cache", "0"], cwd=ROOT,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                                   env={**os.environ, "TERM": "dumb"})
+        seen = ""
+        while PROMPT not in seen:
+            chunk = process.stdout.read(1)
+            if not chunk:
+                raise RuntimeError(f"messenger2.py s'est arrêté avant d'afficher le menu : {seen[-500:]}")
+            seen += chunk
+        to_prompt.append(time.perf_counter() - start)
+        process.communicate("x\n")
+        total.append(time.perf_counter() - start)
+    return {"menu_median_ms": round(statistics.median(to_prompt) * 1000, 1), "exit_median_ms": round(statistics.median(total) * 1000, 1)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=100_000, help="Nombre de messages du fichier local")
+    parser.add_argument('--repeat', type=int, default=5, help="Nombre de processus lancés par mesure")
+    parser.add_argument('--max-import-ms', type=float, help="Échoue si l'import de server et client dépasse ce budget (médiane)")
+    parser.add_argument('--output', help="Fichier de sortie (par défaut : sortie standard)")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "messages": args.messages,
+        "repeat": args.repeat,
+        "imports": {},
+        "startup": {},
+    }
+    for modules in ("server", "server, client", "server, client, cached_server"):
+        report["imports"][modules] = measure_import(modules, args.repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "bench.json")
+        binary_path = os.path.join(directory, "bench.bin")
+        users = max(10, min(10_000, args.messages // 100))
+        channels = max(10, min(1000, args.messages // 1000))
+        generate_dataset(json_path, args.messages, users, channels)
+        sys.path.insert(0, ROOT)
+        from server import Server
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            Server(json_path).save_as(binary_path)
+        for name, arguments in (("json", ["--server", json_path]), ("json --lazy", ["--server", json_path, "--lazy"]),
+                                ("binary", ["--server", binary_path]), ("binary --lazy", ["--server", binary_path, "--lazy"])):
+            report["startup"][name] = measure_startup(arguments, args.repeat)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.max_import_ms is not None:
+        local = report["imports"]["server, client"]
+        if local["heavy_modules"] or local["median_ms"] > args.max_import_ms:
+            print(f"\033[31mRégression au démarrage : import en {local['median_ms']} ms (budget {args.max_import_ms} ms), "
+                  f"modules lourds importés : {', '.join(local['heavy_modules']) or 'aucun'}.\033[0m", file=sys.stderr)
+            sys.exit(1)
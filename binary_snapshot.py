@@ -0,0 +1,200 @@
+"""Format binaire des snapshots du serveur local.
+
+Disposition (petit-boutiste) :
+
+    en-tête    HEADER : magic, version, flags, lsn, nombre d'utilisateurs (U),
+               de canaux (C), de messages (N), d'adhésions (M), taille des chaînes
+    users      U id (int64)
+    channels   C id (int64), C nombres de membres (uint32), M id de membres (int64)
+    chaînes    noms des utilisateurs, puis des canaux, puis contenus des messages (UTF-8, concaténés)
+    offsets    U + C + N + 1 positions (uint64) des chaînes
+    messages   N id d'expéditeur (int64), puis N id de canal (int64)
+    séquence   (version 3) N numéros de séquence (int64), puis N dates de réception (float64, 0 si inconnue)
+    extra      (version 2) taille (uint32) puis objet JSON de données annexes (index de l'historique froid)
+
+Le fichier est projeté en mémoire (mmap) : les contenus des messages ne sont
+décodés qu'à la lecture.
+"""
+import json
+import mmap
+import struct
+from array import array
+
+MAGIC = b"MSGB"
+VERSION = 3
+EXTENSION = ".bin"
+HEADER = struct.Struct("<4sHHqIIIIQ")
+
+class MappedContents:
+    """Contenus des messages lus à la demande dans le snapshot projeté en mémoire.
+
+    Se comporte comme la liste MessageLog.contents : les messages ajoutés ou
+    supprimés après le chargement sont gardés à part, le fichier n'est jamais modifié.
+    """
+    __slots__ = ("mapped", "blob", "offsets", "count", "extra", "overrides")
+
+    def __init__(self, mapped : mmap.mmap, blob : memoryview, offsets : memoryview):
+        self.mapped = mapped
+        self.blob = blob
+        self.offsets = offsets
+        self.count = len(offsets) - 1
+        self.extra = []  # messages ajoutés depuis le chargement
+        self.overrides = {}  # ligne -> contenu remplacé (None si supprimé)
+
+    def __len__(self):
+        return self.count + len(self.extra)
+
+    def __getitem__(self, row : int):
+        if row < 0:
+            row += len(self)
+        if row >= self.count:
+            return self.extra[row - self.count]
+        if self.overrides and row in self.overrides:
+            return self.overrides[row]
+        return str(self.blob[self.offsets[row]:self.offsets[row + 1]], "utf-8")
+
+    def __setitem__(self, row : int, content):
+        if row < 0:
+            row += len(self)
+        if row >= self.count:
+            self.extra[row - self.count] = content
+        else:
+            self.overrides[row] = content
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def append(self, content):
+        self.extra.append(content)
+
+    def materialize(self) -> list:
+        """Copie tous les contenus dans une liste et ferme la projection.
+
+        À appeler avant de remplacer le fichier projeté : Windows refuse de
+        remplacer un fichier tant qu'il est projeté en mémoire.
+        """
+        contents = list(self)
+        self.blob.release()
+        self.offsets.release()
+        self.mapped.close()
+        self.count = 0
+        self.extra = contents
+        self.overrides = {}
+        return contents
+
+class Snapshot:
+    """Contenu décodé d'un snapshot binaire."""
+    def __init__(self, lsn, users, channels, sender_ids, channel_ids, contents, ids, dates, extra):
+        self.lsn = lsn
+        self.users = users  # [(id, nom)]
+        self.channels = channels  # [(id, nom, [id des membres])]
+        self.sender_ids = sender_ids
+        self.channel_ids = channel_ids
+        self.contents = contents
+        self.ids = ids  # None avant la version 3
+        self.dates = dates
+        self.extra = extra
+
+def _int_column(view : memoryview) -> array:
+    column = array("l")
+    if column.itemsize == 8:
+        column.frombytes(view)
+    else:
+        column.extend(view.cast("q"))
+    return column
+
+def save(path : str, lsn : int, users : list, channels : list, rows, extra : dict = None):
+    """Écrit un snapshot ; rows itère sur les messages (sender_id, channel_id, content, id, date)."""
+    offsets = array("Q", [0])
+    sender_ids = array("q")
+    channel_ids = array("q")
+    ids = array("q")
+    dates = array("d")
+    with open(path, "wb") as f:
+        f.write(bytes(HEADER.size))
+        f.write(array("q", (user.id for user in users)).tobytes())
+        f.write(array("q", (channel.id for channel in channels)).tobytes())
+        f.write(array("I", (len(channel.members) for channel in channels)).tobytes())
+        member_ids = array("q", (member.id for channel in channels for member in channel.members))
+        f.write(member_ids.tobytes())
+
+        size = 0
+        for name in [user.name for user in users] + [channel.name for channel in channels]:
+            data = name.encode("utf-8")
+            f.write(data)
+            size += len(data)
+            offsets.append(size)
+        for sender_id, channel_id, content, id, date in rows:
+            data = content.encode("utf-8")
+            f.write(data)
+            size += len(data)
+            offsets.append(size)
+            sender_ids.append(sender_id)
+            channel_ids.append(channel_id)
+            ids.append(id)
+            dates.append(date)
+
+        f.write(offsets.tobytes())
+        f.write(sender_ids.tobytes())
+        f.write(channel_ids.tobytes())
+        f.write(ids.tobytes())
+        f.write(dates.tobytes())
+        data = json.dumps(extra or {}).encode("utf-8")
+        f.write(struct.pack("<I", len(data)) + data)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, lsn, len(users), len(channels), len(sender_ids), len(member_ids), size))
+
+def load(path : str) -> Snapshot:
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapped) < HEADER.size:
+        raise ValueError(f"{path} n'est pas un snapshot binaire valide.")
+    magic, version, _, lsn, user_count, channel_count, message_count, member_count, size = HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} n'est pas un snapshot binaire valide.")
+    if version > VERSION:
+        raise ValueError(f"Version de snapshot {version} non prise en charge (au plus {VERSION}).")
+
+    view = memoryview(mapped)
+    position = HEADER.size
+
+    def take(length):
+        nonlocal position
+        position += length
+        return view[position - length:position]
+
+    user_ids = take(8 * user_count).cast("q")
+    channel_ids = take(8 * channel_count).cast("q")
+    member_counts = take(4 * channel_count).cast("I")
+    member_ids = take(8 * member_count).cast("q")
+    blob = take(size)
+    offsets = take(8 * (user_count + channel_count + message_count + 1)).cast("Q")
+
+    def name(index):
+        return str(blob[offsets[index]:offsets[index + 1]], "utf-8")
+
+    users = [(user_ids[i], name(i)) for i in range(user_count)]
+    channels = []
+    start = 0
+    for i in range(channel_count):
+        end = start + member_counts[i]
+        channels.append((channel_ids[i], name(user_count + i), list(member_ids[start:end])))
+        start = end
+
+    contents = MappedContents(mapped, blob, offsets[user_count + channel_count:])
+    sender_column = _int_column(take(8 * message_count))
+    channel_column = _int_column(take(8 * message_count))
+    ids = dates = None
+    if version >= 3:
+        ids, dates = array("q"), array("d")
+        ids.frombytes(take(8 * message_count))
+        dates.frombytes(take(8 * message_count))
+    extra = {}
+    if version >= 2:
+        extra = json.loads(bytes(take(struct.unpack_from("<I", view, position)[0] + 4)[4:]))
+    return Snapshot(lsn, users, channels, sender_column, channel_column, contents, ids, dates, extra)
+
+def format_for(path : str) -> str:
+    """Format d'un fichier de snapshot d'après son extension : "binary" ou "json"."""
+    return "binary" if path.endswith(EXTENSION) else "json"
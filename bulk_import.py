@@ -0,0 +1,55 @@
+import json
+from itertools import islice
+from server import BaseServer
+
+def read_jsonl(path : str):
+    """Itère sur les messages d'un fichier JSON lines : {"channel_id", "sender_name", "content"} par ligne."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                message = json.loads(line)
+                yield message.get("channel_id", message.get("channel")), message["sender_name"], message["content"]
+
+def import_messages(server : BaseServer, path : str, batch_size : int = 1000) -> int:
+    """Importe un fichier JSON lines de messages par lots, via les API groupées.
+
+    Les expéditeurs inconnus sont créés et ajoutés aux canaux nécessaires avant
+    l'envoi de chaque lot. Les messages adressés à un canal inexistant sont
+    ignorés. Renvoie le nombre de messages importés.
+    """
+    channel_ids = {channel.id for channel in server.get_channels()}
+    user_names = {user.name for user in server.get_users()}
+    members = {}  # id du canal -> noms des membres connus
+    imported = 0
+    skipped = 0
+
+    messages = read_jsonl(path)
+    while True:
+        batch = list(islice(messages, batch_size))
+        if not batch:
+            break
+        kept = [message for message in batch if message[0] in channel_ids]
+        skipped += len(batch) - len(kept)
+
+        new_users = list(dict.fromkeys(sender for _, sender, _ in kept if sender not in user_names))
+        if new_users:
+            server.create_users(new_users)
+            user_names.update(new_users)
+
+        joining = {}
+        for channel_id, sender, _ in kept:
+            if channel_id not in members:
+                members[channel_id] = {member['name'] if isinstance(member, dict) else member.name
+                                       for member in server.get_channel_members(channel_id)}
+            if sender not in members[channel_id]:
+                joining.setdefault(channel_id, []).append(sender)
+                members[channel_id].add(sender)
+        for channel_id, names in joining.items():
+            server.join_channel_many(channel_id, names)
+
+        if kept and server.post_messages(kept) is not None:
+            imported += len(kept)
+
+    if skipped:
+        print(f"\033[31m{skipped} messages ignorés : canal inexistant.\033[0m")
+    return imported
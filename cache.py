@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Cache clé -> valeur borné en taille, dont les entrées expirent après ttl secondes.
+
+    Les entrées les moins récemment utilisées sont évincées quand maxsize est
+    atteint. Les compteurs hits/misses permettent de suivre l'efficacité du cache.
+    """
+    _MISSING = object()
+
+    def __init__(self, ttl : float = 60.0, maxsize : int = 10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.entries = OrderedDict()  # clé -> (date d'expiration, valeur)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key, self._MISSING)
+        if entry is not self._MISSING:
+            expires, value = entry
+            if expires > self.clock():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+        self.misses += 1
+        return default
+
+    def __contains__(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and entry[0] > self.clock()
+
+    def set(self, key, value):
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Supprime une entrée, ou tout le cache si key est None."""
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self.entries),
+        }
@@ -0,0 +1,120 @@
+from typing import List
+from cache import TTLCache
+from model import User, Channel, Message, MessagePage
+from server import BaseServer
+
+class CachedServer(BaseServer):
+    """Cache de lecture placé entre le Client et n'importe quel BaseServer.
+
+    Les listes d'utilisateurs, de canaux et de membres ainsi que les noms
+    d'utilisateurs sont mémorisés ttl secondes (au plus maxsize entrées). Les
+    mutations passant par ce serveur invalident les entrées concernées ; les
+    modifications faites par d'autres clients sont visibles à l'expiration.
+    Les messages ne sont pas mis en cache pour que la lecture et le suivi des
+    canaux restent à jour.
+    """
+    def __init__(self, server : BaseServer, ttl : float = 5.0, maxsize : int = 1024):
+        self.server = server
+        self.lists = TTLCache(ttl=ttl, maxsize=maxsize)  # "users", "channels", ("members", id du canal)
+        self.user_names = TTLCache(ttl=ttl, maxsize=maxsize)  # id -> nom
+
+    def __getattr__(self, name):
+        # Méthodes propres au serveur enveloppé (save, close, metrics...).
+        return getattr(self.server, name)
+
+    def _cached(self, key, load):
+        value = self.lists.get(key)
+        if value is None:
+            value = load()
+            self.lists.set(key, value)
+        # Copie : l'appelant peut modifier la liste sans altérer le cache.
+        return list(value)
+
+    def _users_changed(self):
+        self.lists.invalidate("users")
+        self.user_names.invalidate()
+
+    def cache_stats(self) -> dict:
+        stats = {"lists": self.lists.stats(), "user_names": self.user_names.stats()}
+        if hasattr(self.server, "cache_stats"):
+            stats["server"] = self.server.cache_stats()
+        return stats
+
+    # Utilisateurs
+    def get_users(self) -> List[User]:
+        return self._cached("users", self.server.get_users)
+
+    def get_user_name(self, user_id : int) -> str:
+        name = self.user_names.get(user_id)
+        if name is None:
+            name = self.server.get_user_name(user_id)
+            self.user_names.set(user_id, name)
+        return name
+
+    def create_user(self, name : str) -> User:
+        user = self.server.create_user(name)
+        self._users_changed()
+        return user
+
+    def create_users(self, names : List[str]) -> List[User]:
+        users = self.server.create_users(names)
+        self._users_changed()
+        return users
+
+    def ban_user(self, name : str):
+        self.server.ban_user(name)
+        # L'utilisateur disparaît aussi des listes de membres.
+        self.lists.invalidate()
+        self.user_names.invalidate()
+
+    # Canaux
+    def get_channels(self) -> List[Channel]:
+        return self._cached("channels", self.server.get_channels)
+
+    def create_channel(self, name : str) -> Channel:
+        channel = self.server.create_channel(name)
+        self.lists.invalidate("channels")
+        return channel
+
+    def ban_channel(self, name : str):
+        self.server.ban_channel(name)
+        self.lists.invalidate()
+
+    def get_channel_members(self, channel_id : int) -> List[User]:
+        return self._cached(("members", channel_id), lambda: self.server.get_channel_members(channel_id))
+
+    def join_channel(self, channel_id : int, user_name : str):
+        self.server.join_channel(channel_id, user_name)
+        self.lists.invalidate(("members", channel_id))
+
+    def join_channel_many(self, channel_id : int, user_names : List[str]):
+        self.server.join_channel_many(channel_id, user_names)
+        self.lists.invalidate(("members", channel_id))
+
+    # Messages
+    def get_all_messages(self) -> List[Message]:
+        return self.server.get_all_messages()
+
+    def get_messages(self, channel_id : int) -> List[Message]:
+        return self.server.get_messages(channel_id)
+
+    def get_messages_page(self, channel_id : int, limit : int = 50, before : int = None, after : int = None) -> MessagePage:
+        return self.server.get_messages_page(channel_id, limit, before, after)
+
+    def search_messages(self, query : str, channel_id : int = None, sender_name : str = None, limit : int = 20, offset : int = 0) -> List[Message]:
+        return self.server.search_messages(query, channel_id, sender_name, limit, offset)
+
+    def get_messages_since(self, seq : int, channel_id : int = None, limit : int = None) -> List[Message]:
+        return self.server.get_messages_since(seq, channel_id, limit)
+
+    def get_messages_between(self, start : float, end : float, channel_id : int = None, limit : int = None) -> List[Message]:
+        return self.server.get_messages_between(start, end, channel_id, limit)
+
+    def subscribe(self, channel_id : int, since : int = None, **kwargs):
+        return self.server.subscribe(channel_id, since, **kwargs)
+
+    def post_message(self, channel_id : int, sender_name : str, content : str) -> Message:
+        return self.server.post_message(channel_id, sender_name, content)
+
+    def post_messages(self, messages : List[tuple]) -> List[Message]:
+        return self.server.post_messages(messages)
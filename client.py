@@ -1,5 +1,5 @@
 import os
-from server import Server, RemoteServer
+from datetime import datetime
 
 class Client:  # MessengerApp
 
@@ -147,22 +147,61 @@ class Client:  # MessengerApp
                 if isinstance(message, dict):  
                     print(f"\033[34m[{message['reception_date']}] (Canal {message['channel_id']}) Sender {message['sender_name']} : {message['content']}\033[0m")
                 else:
-                    print(f"\033[34m(Canal {message.channel_id}) Sender {message.sender_name} : {message.content}\033[0m")
+                    date = f"[{datetime.fromtimestamp(message.reception_date):%Y-%m-%d %H:%M:%S}] " if message.reception_date else ""
+                    print(f"\033[34m{date}(Canal {message.channel_id}) Sender {self.server.get_user_name(message.sender_id)} : {message.content}\033[0m")
 
 
-    def display_messages(self, channel_id):
-        """Affiche tous les messages d'un canal spécifique."""
-        messages = self.server.get_messages(channel_id)  
-        if not messages:
+    def display_messages(self, channel_id, page_size=20):
+        """
+        Affiche les messages d'un canal spécifique, page par page.
+        Les messages les plus récents sont affichés en premier ; l'utilisateur
+        peut ensuite remonter vers les messages plus anciens.
+        """
+        page = self.server.get_messages_page(channel_id, limit=page_size)
+        if not page.messages:
             print(f"\033[31mPas de message dans le canal {channel_id}.\033[0m")
-        else:
-            print(f"\033[32mMessages dans le canal {channel_id} : \033[0m")
-            for message in messages:
-                if isinstance(message, dict):  
+            return
+
+        print(f"\033[32mMessages dans le canal {channel_id} : \033[0m")
+        while True:
+            for message in page.messages:
+                if isinstance(message, dict):
                     sender_name = message.get('sender_name', "Unknown")
                     print(f"\033[34mSender {sender_name} : {message['content']}\033[0m")
                 else:
-                    print(f"\033[34mSender {message.sender_name} : {message.content}\033[0m")
+                    print(f"\033[34mSender {self.server.get_user_name(message.sender_id)} : {message.content}\033[0m")
+
+            if page.before is None:
+                break
+            choice = input("\033[33mEntrée pour les messages plus anciens, x pour revenir : \033[0m")
+            if choice == "x":
+                break
+            page = self.server.get_messages_page(channel_id, limit=page_size, before=page.before)
+            self.clearConsole()
+
+    def follow_channel(self):
+        """
+        Affiche en continu les nouveaux messages d'un canal, sans recharger l'historique.
+        Ctrl+C pour revenir au menu.
+        """
+        self.clearConsole()
+        self.display_channels()
+        channel_id = int(input("\033[33m👀 ID du canal à suivre : \033[0m"))
+        if channel_id not in [channel.id for channel in self.server.get_channels()]:
+            self.clearConsole()
+            print("\033[31mCanal invalide.\033[0m")
+            return
+
+        self.clearConsole()
+        print(f"\033[32mSuivi du canal {channel_id} (Ctrl+C pour arrêter)\033[0m")
+        try:
+            for message in self.server.subscribe(channel_id):
+                if isinstance(message, dict):
+                    print(f"\033[34mSender {message.get('sender_name', 'Unknown')} : {message['content']}\033[0m")
+                else:
+                    print(f"\033[34mSender {self.server.get_user_name(message.sender_id)} : {message.content}\033[0m")
+        except KeyboardInterrupt:
+            print()
 
     def post_message_menu(self):
         """
@@ -189,6 +228,76 @@ class Client:  # MessengerApp
         self.server.post_message(channel_id, sender_name, content)
 
 
+    def search_messages_menu(self, page_size=20):
+        """
+        Recherche des messages par mots-clés (sans tenir compte des accents ni de la casse).
+        Le canal et l'expéditeur sont des filtres facultatifs ; les résultats
+        sont affichés par pages, les plus pertinents d'abord.
+        """
+        self.clearConsole()
+        query = input("\033[33mMots recherchés : \033[0m")
+        channel = input("\033[33mID du canal (Entrée pour tous) : \033[0m")
+        sender_name = input("\033[33mNom de l'expéditeur (Entrée pour tous) : \033[0m")
+        channel_id = int(channel) if channel else None
+
+        self.clearConsole()
+        offset = 0
+        while True:
+            messages = self.server.search_messages(query, channel_id=channel_id, sender_name=sender_name or None, limit=page_size, offset=offset)
+            if not messages:
+                if not offset:
+                    print(f"\033[31mAucun message ne correspond à \"{query}\".\033[0m")
+                return
+            for message in messages:
+                if isinstance(message, dict):
+                    print(f"\033[34m(Canal {message['channel_id']}) Sender {message.get('sender_name', 'Unknown')} : {message['content']}\033[0m")
+                else:
+                    print(f"\033[34m(Canal {message.channel_id}) Sender {self.server.get_user_name(message.sender_id)} : {message.content}\033[0m")
+            if len(messages) < page_size:
+                return
+            if input("\033[33mEntrée pour les résultats suivants, x pour revenir : \033[0m") == "x":
+                return
+            offset += page_size
+
+    def display_stats(self):
+        """Affiche les métriques du serveur instrumenté (option --metrics)."""
+        self.clearConsole()
+        if hasattr(self.server, "cache_stats"):
+            print("\033[35m---- Caches ----\033[0m")
+            self._display_cache_stats(self.server.cache_stats())
+        if hasattr(self.server, "sync_status"):
+            status = self.server.sync_status()
+            state = {True: "en ligne", False: "hors ligne", None: "jamais synchronisée"}[status["online"]]
+            print("\033[35m---- Réplique ----\033[0m")
+            print(f"\033[34m{state}, {status['pending']} écritures en attente, {status['conflicts']} conflits, dernier message reçu n°{status['checkpoint']}\033[0m")
+        metrics = getattr(self.server, "metrics", None)
+        if metrics is None:
+            print("\033[31mInstrumentation désactivée : relancez avec --metrics.\033[0m")
+            return
+
+        stats = metrics.snapshot()
+        print("\033[35m---- Appels ----\033[0m")
+        for method, data in sorted(stats["methods"].items()):
+            p99 = f"{data['p99_ms']} ms" if data['p99_ms'] is not None else "> 10 s"
+            print(f"\033[34m{method} : {data['calls']} appels, moyenne {data['mean_ms']} ms, p50 ≤ {data['p50_ms']} ms, p99 ≤ {p99}, erreurs {data['errors']}\033[0m")
+        if stats["bytes_written"]:
+            print("\033[35m---- Octets écrits ----\033[0m")
+            for target, count in sorted(stats["bytes_written"].items()):
+                print(f"\033[34m{target} : {count} octets\033[0m")
+        if stats["round_trips"]:
+            print("\033[35m---- Requêtes HTTP par opération ----\033[0m")
+            for operation, count in sorted(stats["round_trips"].items()):
+                calls = stats["methods"].get(operation, {}).get("calls")
+                per_call = f" ({count / calls:.1f} par appel)" if calls else ""
+                print(f"\033[34m{operation} : {count}{per_call}\033[0m")
+
+    def _display_cache_stats(self, stats, prefix=""):
+        if "hits" in stats:
+            print(f"\033[34m{prefix or 'cache'} : {stats['hits']} succès, {stats['misses']} échecs, taux {stats['hit_rate']:.0%}, {stats['size']} entrées\033[0m")
+            return
+        for name, value in stats.items():
+            self._display_cache_stats(value, f"{prefix}{name} " if prefix else name)
+
     # ---Main menu---
     def main_menu(self):
      while True:
@@ -213,6 +322,12 @@ class Client:  # MessengerApp
         print("\033[34m9. 📨 Lister les messages\033[0m")
         print("\033[34m10. 📜 Lire les messages d'un canal\033[0m")
         print("\033[34m11. ✉️ Envoyer un message\033[0m")
+        print("\033[34m12. 🔎 Rechercher des messages\033[0m")
+        print("\033[34m13. 👀 Suivre un canal en direct\033[0m")
+        print()
+
+        print("\033[35m---- Diagnostic ----\033[0m")
+        print("\033[34m14. 📊 Statistiques du serveur\033[0m")
         print()
 
         print("\033[31mx. Quitter\033[0m")
@@ -249,6 +364,12 @@ class Client:  # MessengerApp
                 self.display_messages(channel_id)
         elif choice == "11":
             self.post_message_menu()
+        elif choice == "12":
+            self.search_messages_menu()
+        elif choice == "13":
+            self.follow_channel()
+        elif choice == "14":
+            self.display_stats()
         elif choice == "x":
             print("\033[31m👋 Au revoir !\033[0m")
             break
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import zlib
+from cache import TTLCache
+
+class Segment:
+    """Bloc immuable de messages consécutifs d'un canal, compressé dans un fichier."""
+    __slots__ = ("file", "start", "count", "senders", "deleted", "ids", "dates")
+
+    def __init__(self, file : str, start : int, count : int, senders : set, ids : tuple = None, dates : tuple = None):
+        self.file = file
+        self.start = start  # position du premier message dans le canal
+        self.count = count
+        self.senders = senders  # id des expéditeurs présents, pour les bannissements
+        self.deleted = set()  # positions supprimées depuis l'écriture du fichier
+        # Premiers et derniers numéros de séquence et dates de réception, pour
+        # ne lire que les segments utiles ; None pour un segment sans numéros.
+        self.ids = ids
+        self.dates = dates
+
+    def to_dict(self) -> dict:
+        return {"file": self.file, "start": self.start, "count": self.count, "senders": sorted(self.senders), "deleted": sorted(self.deleted),
+                "ids": self.ids and list(self.ids), "dates": self.dates and list(self.dates)}
+
+class ColdStore:
+    """Historique froid des canaux : segments compressés (zlib) dans un répertoire.
+
+    Les plus anciens messages de chaque canal sont scellés dans des segments
+    immuables ; un petit index (positions, expéditeurs, intervalles de numéros
+    de séquence et de dates) reste en mémoire et
+    est enregistré dans le snapshot. Les segments ne sont décompressés qu'à la
+    lecture, et les derniers lus sont gardés en cache. Un message supprimé
+    devient null dans son segment, réécrit au scellement suivant : les
+    positions ne changent jamais.
+    """
+    def __init__(self, directory : str, cache_size : int = 16):
+        self.directory = directory
+        self.channels = {}  # id du canal -> segments, dans l'ordre
+        self.cache = TTLCache(ttl=float("inf"), maxsize=cache_size)  # fichier -> [[sender_id, content, id, date]]
+        self.cache_lock = threading.Lock()
+
+    def count(self, channel_id : int) -> int:
+        segments = self.channels.get(channel_id)
+        return segments[-1].start + segments[-1].count if segments else 0
+
+    def _path(self, file : str) -> str:
+        return os.path.join(self.directory, file)
+
+    def _write(self, channel_id : int, start : int, messages : list) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        file = f"{channel_id}-{start}-{os.urandom(4).hex()}.seg"
+        with open(self._path(file), "wb") as f:
+            f.write(zlib.compress(json.dumps(messages).encode("utf-8")))
+        return file
+
+    def _read(self, segment : Segment) -> list:
+        with self.cache_lock:
+            messages = self.cache.get(segment.file)
+        if messages is None:
+            with open(self._path(segment.file), "rb") as f:
+                messages = json.loads(zlib.decompress(f.read()))
+            with self.cache_lock:
+                self.cache.set(segment.file, messages)
+        return messages
+
+    @staticmethod
+    def _entry(entry : list) -> tuple:
+        """(sender_id, content, id, date) ; les segments écrits avant les numéros de séquence n'ont que les deux premiers."""
+        return (entry[0], entry[1], entry[2], entry[3]) if len(entry) > 2 else (entry[0], entry[1], None, 0.0)
+
+    def seal(self, channel_id : int, messages : list):
+        """Ajoute un segment à la fin de l'historique froid du canal ; messages : [[sender_id, content ou None, id, date]]."""
+        start = self.count(channel_id)
+        file = self._write(channel_id, start, messages)
+        senders = {entry[0] for entry in messages if entry[1] is not None}
+        ids = (messages[0][2], messages[-1][2])
+        dates = (messages[0][3], messages[-1][3])
+        self.channels.setdefault(channel_id, []).append(Segment(file, start, len(messages), senders, ids, dates))
+
+    def _iter_segment(self, segment : Segment):
+        for offset, entry in enumerate(self._read(segment)):
+            if entry[1] is not None and segment.start + offset not in segment.deleted:
+                yield (segment.start + offset,) + self._entry(entry)
+
+    def iter_channel(self, channel_id : int):
+        """Itère sur les (position, sender_id, content, id, date) non supprimés du canal."""
+        for segment in self.channels.get(channel_id, ()):
+            yield from self._iter_segment(segment)
+
+    def iter_since(self, channel_id : int, seq : int):
+        """Comme iter_channel, limité aux messages de numéro de séquence supérieur à seq."""
+        for segment in self.channels.get(channel_id, ()):
+            if segment.ids is not None and segment.ids[1] > seq:
+                yield from (message for message in self._iter_segment(segment) if message[3] > seq)
+
+    def iter_before(self, channel_id : int, seq : int):
+        """Itère à rebours (du plus récent au plus ancien) sur les messages de numéro de séquence inférieur à seq."""
+        for segment in reversed(self.channels.get(channel_id, ())):
+            if segment.ids is not None and segment.ids[0] < seq:
+                yield from (message for message in reversed(list(self._iter_segment(segment))) if message[3] < seq)
+
+    def last_id(self, channel_id : int) -> int:
+        """Numéro de séquence du dernier message scellé du canal (0 s'il n'y en a pas)."""
+        segments = self.channels.get(channel_id)
+        return segments[-1].ids[1] if segments and segments[-1].ids is not None else 0
+
+    def iter_between(self, channel_id : int, start : float, end : float):
+        """Comme iter_channel, limité aux messages reçus dans [start, end[."""
+        for segment in self.channels.get(channel_id, ()):
+            if segment.dates is not None and segment.dates[1] >= start and segment.dates[0] < end:
+                yield from (message for message in self._iter_segment(segment) if start <= message[4] < end)
+
+    def drop_channel(self, channel_id : int):
+        """Oublie l'historique froid d'un canal (fichiers supprimés au prochain collect_garbage)."""
+        self.channels.pop(channel_id, None)
+
+    def delete_sender(self, sender_id : int) -> int:
+        """Marque supprimés les messages d'un expéditeur ; seuls les segments qui en contiennent sont lus.
+
+        Renvoie le nombre de messages supprimés.
+        """
+        count = 0
+        for segments in self.channels.values():
+            for segment in segments:
+                if sender_id in segment.senders:
+                    segment.senders.discard(sender_id)
+                    for offset, entry in enumerate(self._read(segment)):
+                        if entry[0] == sender_id and entry[1] is not None and segment.start + offset not in segment.deleted:
+                            segment.deleted.add(segment.start + offset)
+                            count += 1
+        return count
+
+    def rewrite_deleted(self):
+        """Réécrit dans de nouveaux fichiers les segments ayant des messages supprimés."""
+        for channel_id, segments in self.channels.items():
+            for segment in segments:
+                if segment.deleted:
+                    messages = [[entry[0], None if segment.start + offset in segment.deleted else entry[1], *entry[2:]]
+                                for offset, entry in enumerate(self._read(segment))]
+                    segment.file = self._write(channel_id, segment.start, messages)
+                    segment.deleted = set()
+
+    def collect_garbage(self):
+        """Supprime les fichiers de segments qui ne sont plus référencés par l'index."""
+        if not os.path.isdir(self.directory):
+            return
+        referenced = {segment.file for segments in self.channels.values() for segment in segments}
+        for file in os.listdir(self.directory):
+            if file.endswith(".seg") and file not in referenced:
+                os.remove(self._path(file))
+
+    def to_dict(self, snapshot_path : str) -> dict:
+        """Index à enregistrer dans le snapshot (répertoire relatif à celui du snapshot)."""
+        directory = os.path.relpath(self.directory, os.path.dirname(os.path.abspath(snapshot_path)))
+        return {"directory": directory, "channels": {str(channel_id): [segment.to_dict() for segment in segments]
+                                                     for channel_id, segments in self.channels.items() if segments}}
+
+    @classmethod
+    def from_dict(cls, data : dict, snapshot_path : str, cache_size : int = 16):
+        store = cls(os.path.join(os.path.dirname(os.path.abspath(snapshot_path)), data["directory"]), cache_size)
+        for channel_id, segments in data["channels"].items():
+            store.channels[int(channel_id)] = channel_segments = []
+            for data_segment in segments:
+                ids, dates = data_segment.get("ids"), data_segment.get("dates")
+                segment = Segment(data_segment["file"], data_segment["start"], data_segment["count"], set(data_segment["senders"]),
+                                  ids and tuple(ids), dates and tuple(dates))
+                segment.deleted = set(data_segment.get("deleted", ()))
+                channel_segments.append(segment)
+        return store
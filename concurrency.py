@@ -0,0 +1,124 @@
+import threading
+import time
+from contextlib import contextmanager
+
+class RWLock:
+    """Verrou lecteurs/rédacteur (non réentrant) pour les threads.
+
+    Plusieurs lecteurs peuvent tenir le verrou en même temps ; un rédacteur
+    l'obtient seul. Un rédacteur en attente bloque les nouveaux lecteurs
+    (priorité aux rédacteurs) : un thread qui reprend read() alors qu'il tient
+    déjà le verrou se bloque dès qu'un rédacteur attend, et write() pris sous
+    read() ou write() se bloque toujours. Les méthodes appelées sous le verrou
+    ne doivent donc pas le reprendre (voir les variantes _xxx du Server).
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.writer and not self.waiting_writers)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            self.condition.wait_for(lambda: not self.writer and not self.readers)
+            self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+class GroupCommitWriter:
+    """Regroupe les écritures soumises dans une même fenêtre en un seul flush.
+
+    submit() renvoie un ticket ; wait(ticket) bloque jusqu'à ce que le lot
+    contenant l'écriture ait été persisté par flush(lot), appelé depuis un
+    thread dédié.
+    """
+    def __init__(self, flush, window : float = 0.005):
+        self.flush = flush
+        self.window = window
+        self.condition = threading.Condition()
+        self.pending = []
+        self.submitted = 0
+        self.flushed = 0
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self.thread.start()
+
+    def submit(self, item) -> int:
+        with self.condition:
+            self.pending.append(item)
+            self.submitted += 1
+            self.condition.notify_all()
+            return self.submitted
+
+    def wait(self, ticket : int):
+        with self.condition:
+            self.condition.wait_for(lambda: self.flushed >= ticket or self.error is not None)
+            if self.error is not None:
+                raise self.error
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closed)
+                if self.closed and not self.pending:
+                    return
+            # Laisse le temps aux écritures concurrentes de rejoindre le lot.
+            if self.window and not self.closed:
+                time.sleep(self.window)
+            with self.condition:
+                batch, self.pending = self.pending, []
+                last = self.submitted
+            try:
+                self.flush(batch)
+            except Exception as error:
+                with self.condition:
+                    self.error = error
+                    self.condition.notify_all()
+                return
+            with self.condition:
+                self.flushed = last
+                self.condition.notify_all()
+
+    def close(self):
+        """Persiste les écritures en attente puis arrête le thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+class Sequence:
+    """Compteur strictement croissant, partageable entre plusieurs serveurs (partitions)."""
+    def __init__(self, last : int = 0):
+        self.last = last
+        self.lock = threading.Lock()
+
+    def next(self) -> int:
+        with self.lock:
+            self.last += 1
+            return self.last
+
+    def advance(self, value : int):
+        """Garantit que les prochains numéros seront supérieurs à value."""
+        with self.lock:
+            self.last = max(self.last, value)
@@ -0,0 +1,255 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from aiohttp import web
+from cache import TTLCache
+from server import Server
+
+class MessengerHTTPServer:
+    """Expose un Server local sur les routes REST consommées par RemoteServer.
+
+    La boucle d'événements ne fait que les entrées/sorties : les lectures
+    s'exécutent dans un pool de reader_threads threads, les écritures sont
+    sérialisées dans un unique thread dédié. La cohérence repose sur le verrou
+    lecteurs/rédacteur du Server, jamais tenu pendant l'envoi d'une réponse :
+    un client lent ne bloque ni les écritures ni les autres connexions.
+    """
+    STREAM_CHUNK = 1000  # éléments par écriture lors de l'envoi des grandes listes
+    RECENT_POSTS = 10000  # identifiants d'envoi mémorisés pour écarter les doublons
+
+    def __init__(self, server : Server, reader_threads : int = 8):
+        self.server = server
+        self.readers = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix="http-read")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="http-write")
+        # Incrémenté à chaque message posté ; réveille les requêtes en long polling.
+        self.posted = 0
+        self.posted_condition = asyncio.Condition()
+        # request_id -> message des derniers envois : un envoi rejoué (réponse
+        # perdue, délai dépassé) renvoie le message déjà posté au lieu d'un doublon.
+        self.recent_posts = TTLCache(ttl=float("inf"), maxsize=self.RECENT_POSTS)
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/users", self.get_users),
+            web.get("/users/{id}", self.get_user),
+            web.post("/users/create", self.create_user),
+            web.post("/users/create_many", self.create_users),
+            web.get("/channels", self.get_channels),
+            web.post("/channels/create", self.create_channel),
+            web.get("/channels/{id}/members", self.get_channel_members),
+            web.post("/channels/{id}/join", self.join_channel),
+            web.post("/channels/{id}/join_many", self.join_channel_many),
+            web.get("/messages", self.get_all_messages),
+            web.get("/messages/search", self.search_messages),
+            web.get("/messages/since", self.get_messages_since),
+            web.get("/messages/range", self.get_messages_between),
+            web.get("/channels/{id}/messages", self.get_messages),
+            web.post("/channels/{id}/messages/post", self.post_message),
+            web.post("/messages/post_many", self.post_messages),
+            web.get("/metrics", self.get_metrics),
+        ])
+        self.app.on_cleanup.append(self._shutdown)
+
+    async def _shutdown(self, app):
+        self.readers.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+
+    async def _read(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, function, *args)
+
+    async def _write(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.writer, function, *args)
+
+    async def _stream(self, request, items : list, convert):
+        """Envoie une liste JSON par morceaux, sérialisés dans le pool de lecture.
+
+        items est une copie déjà lue sous le verrou du Server : aucun verrou
+        n'est tenu pendant l'écriture sur la socket.
+        """
+        def encode(start):
+            return ", ".join(json.dumps(convert(item)) for item in items[start:start + self.STREAM_CHUNK])
+
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        await response.write(b"[")
+        for start in range(0, len(items), self.STREAM_CHUNK):
+            chunk = await self._read(encode, start)
+            await response.write((", " + chunk if start else chunk).encode("utf-8"))
+        await response.write(b"]")
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    def _message_dict(message) -> dict:
+        # Date de réception au format ISO 8601 (UTC), None pour les messages d'anciens fichiers.
+        date = message.reception_date
+        return {"id": message.id, "sender_id": message.sender_id, "channel_id": message.channel_id, "content": message.content,
+                "reception_date": datetime.fromtimestamp(date, timezone.utc).isoformat(timespec="milliseconds") if date else None}
+
+    async def _json(self, build):
+        """Lit et sérialise la réponse dans le pool : une longue liste de messages ne bloque pas la boucle."""
+        body = await self._read(lambda: json.dumps(build()))
+        return web.Response(text=body, content_type="application/json")
+
+    def _messages(self, function, *args):
+        return lambda: [self._message_dict(message) for message in function(*args)]
+
+    @staticmethod
+    def _error(text : str, status : int = 400):
+        return web.json_response({"detail": text}, status=status)
+
+    # Utilisateurs
+    async def get_users(self, request):
+        users = await self._read(lambda: [user.to_dict() for user in self.server.get_users()])
+        return web.json_response(users)
+
+    async def get_user(self, request):
+        user = await self._read(self.server.users_by_id.get, int(request.match_info["id"]))
+        return web.json_response(user.to_dict() if user else None)
+
+    async def create_user(self, request):
+        data = await request.json()
+        user = await self._write(self.server.create_user, data["name"])
+        if user is None:
+            return self._error(f"L'utilisateur {data['name']} existe déjà.")
+        return web.json_response(user.to_dict())
+
+    async def create_users(self, request):
+        data = await request.json()
+        users = await self._write(self.server.create_users, data["names"])
+        if users is None:
+            return self._error("Utilisateurs déjà existants ou en double : aucun utilisateur créé.")
+        return web.json_response([user.to_dict() for user in users])
+
+    # Canaux
+    async def get_channels(self, request):
+        channels = await self._read(lambda: [{"id": channel.id, "name": channel.name} for channel in self.server.get_channels()])
+        return web.json_response(channels)
+
+    async def create_channel(self, request):
+        data = await request.json()
+        channel = await self._write(self.server.create_channel, data["name"])
+        if channel is None:
+            return self._error(f"Le canal {data['name']} existe déjà.")
+        return web.json_response({"id": channel.id, "name": channel.name})
+
+    async def get_channel_members(self, request):
+        channel_id = int(request.match_info["id"])
+        if channel_id not in self.server.channels_by_id:
+            return self._error("Canal introuvable.", 404)
+        members = await self._read(lambda: [user.to_dict() for user in self.server.get_channel_members(channel_id)])
+        return web.json_response(members)
+
+    async def join_channel(self, request):
+        channel_id = int(request.match_info["id"])
+        data = await request.json()
+        user = self.server.users_by_id.get(data["user_id"])
+        if channel_id not in self.server.channels_by_id or user is None:
+            return self._error("Canal ou utilisateur introuvable.", 404)
+        await self._write(self.server.join_channel, channel_id, user.name)
+        return web.json_response({"channel_id": channel_id, "user_id": user.id})
+
+    async def join_channel_many(self, request):
+        channel_id = int(request.match_info["id"])
+        data = await request.json()
+        if channel_id not in self.server.channels_by_id or any(name not in self.server.users_by_name for name in data["names"]):
+            return self._error("Canal ou utilisateur introuvable.", 404)
+        await self._write(self.server.join_channel_many, channel_id, data["names"])
+        return web.json_response({"channel_id": channel_id})
+
+    # Messages
+    async def get_all_messages(self, request):
+        messages = await self._read(self.server.get_all_messages)
+        return await self._stream(request, messages, self._message_dict)
+
+    async def get_messages(self, request):
+        channel_id = int(request.match_info["id"])
+        query = request.query
+        if "limit" not in query and "before" not in query and "after" not in query:
+            def build():
+                messages = self.server.get_messages(channel_id)
+                return {"messages": [self._message_dict(message) for message in messages], "before": None, "after": messages[-1].id if messages else 0}
+            return await self._json(build)
+
+        def cursor(name):
+            return int(query[name]) if name in query else None
+        posted = self.posted
+        page = await self._read(self.server.get_messages_page, channel_id, int(query.get("limit", 50)), cursor("before"), cursor("after"))
+        wait = float(query.get("wait", 0))
+        if wait and not page.messages and "after" in query:
+            # Long polling : attend un nouveau message (ou l'expiration) avant de relire.
+            try:
+                async with self.posted_condition:
+                    await asyncio.wait_for(self.posted_condition.wait_for(lambda: self.posted != posted), wait)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                page = await self._read(self.server.get_messages_page, channel_id, int(query.get("limit", 50)), None, cursor("after"))
+        return web.json_response({"messages": [self._message_dict(message) for message in page.messages], "before": page.before, "after": page.after})
+
+    async def search_messages(self, request):
+        query = request.query
+        channel_id = int(query["channel_id"]) if "channel_id" in query else None
+        return await self._json(self._messages(self.server.search_messages, query.get("q", ""), channel_id, query.get("sender"),
+                                               int(query.get("limit", 20)), int(query.get("offset", 0))))
+
+    async def get_messages_since(self, request):
+        query = request.query
+        channel_id = int(query["channel_id"]) if "channel_id" in query else None
+        limit = int(query["limit"]) if "limit" in query else None
+        return await self._json(self._messages(self.server.get_messages_since, int(query.get("seq", 0)), channel_id, limit))
+
+    async def get_messages_between(self, request):
+        query = request.query
+        if "start" not in query or "end" not in query:
+            return self._error("Paramètres start et end obligatoires.")
+        channel_id = int(query["channel_id"]) if "channel_id" in query else None
+        limit = int(query["limit"]) if "limit" in query else None
+        return await self._json(self._messages(self.server.get_messages_between, float(query["start"]), float(query["end"]), channel_id, limit))
+
+    async def _notify_posted(self):
+        async with self.posted_condition:
+            self.posted += 1
+            self.posted_condition.notify_all()
+
+    async def post_messages(self, request):
+        data = await request.json()
+        messages = [(message["channel_id"], message["sender_name"], message["content"]) for message in data["messages"]]
+        posted = await self._write(self.server.post_messages, messages)
+        if posted is None:
+            return self._error("Lot refusé : canal, utilisateur ou adhésion invalide. Aucun message envoyé.")
+        await self._notify_posted()
+        return web.json_response([self._message_dict(message) for message in posted])
+
+    async def post_message(self, request):
+        channel_id = int(request.match_info["id"])
+        data = await request.json()
+        user = self.server.users_by_id.get(data["sender_id"])
+        if channel_id not in self.server.channels_by_id or user is None:
+            return self._error("Canal ou utilisateur introuvable.", 404)
+        request_id = data.get("request_id")
+
+        def post():
+            # Dans le thread d'écriture : vérification et envoi sans entrelacement.
+            message = self.recent_posts.get(request_id) if request_id else None
+            if message is None:
+                message = self.server.post_message(channel_id, user.name, data["content"])
+                if message is not None and request_id:
+                    self.recent_posts.set(request_id, message)
+            return message
+        message = await self._write(post)
+        if message is None:
+            return self._error(f"{user.name} doit rejoindre le canal {channel_id} avant d'envoyer des messages.", 403)
+        await self._notify_posted()
+        return web.json_response(self._message_dict(message))
+
+    # Diagnostic
+    async def get_metrics(self, request):
+        metrics = getattr(self.server, "metrics", None)
+        if metrics is None:
+            return self._error("Instrumentation désactivée (--metrics).", 404)
+        return web.Response(text=metrics.prometheus(), content_type="text/plain")
+
+def serve(server : Server, host : str = "127.0.0.1", port : int = 8000):
+    """Lance le service HTTP (bloquant)."""
+    web.run_app(MessengerHTTPServer(server).app, host=host, port=port)
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+
+class Journal:
+    """Journal en ajout seul (write-ahead log) des mutations du serveur local.
+
+    Chaque mutation est écrite sur une ligne JSON terminée par un saut de ligne.
+    Une dernière ligne incomplète (écriture interrompue) est ignorée au rejeu
+    puis tronquée.
+    """
+    def __init__(self, path : str):
+        self.path = path
+        self.records = 0
+        self._file = None
+        self.lock = threading.Lock()
+
+    def replay(self, repair : bool = True):
+        """Renvoie les enregistrements valides du journal, dans l'ordre d'écriture.
+
+        Sans repair, une dernière ligne incomplète est ignorée mais le fichier
+        n'est pas modifié (lecture par un autre processus que le rédacteur).
+        """
+        records = []
+        if not os.path.exists(self.path):
+            return records
+
+        valid_size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_size += len(line)
+
+        if repair and valid_size != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_size)
+
+        self.records = len(records)
+        return records
+
+    def append(self, record : dict):
+        """Ajoute un enregistrement à la fin du journal et le force sur le disque."""
+        self.append_many([record])
+
+    def append_many(self, records : list):
+        """Ajoute plusieurs enregistrements en une seule écriture et un seul fsync."""
+        data = b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records)
+        with self.lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.records += len(records)
+
+    def size(self) -> int:
+        """Taille du journal en octets."""
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def truncate(self):
+        """Vide le journal (après compaction dans le snapshot)."""
+        with self.lock:
+            self._close()
+            with open(self.path, "wb"):
+                pass
+            self.records = 0
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
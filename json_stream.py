@@ -0,0 +1,91 @@
+import json
+
+class JsonStream:
+    """Lecteur JSON incrémental pour les gros fichiers du serveur local.
+
+    Le fichier est lu par blocs : seules les valeurs demandées (un élément de
+    tableau, une clé) sont décodées, jamais le document entier.
+    """
+    WHITESPACE = " \t\n\r"
+
+    def __init__(self, f, chunk_size : int = 1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Ajoute un bloc au tampon. Renvoie False en fin de fichier."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Renvoie le prochain caractère significatif sans le consommer (None en fin de fichier)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, char : str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"JSON invalide : '{char}' attendu, '{found}' trouvé.")
+        self.pos += 1
+
+    def value(self):
+        """Décode la prochaine valeur JSON complète."""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Un nombre coupé par la fin du tampon ("2." de "2.5") est décodé sans
+            # erreur : la valeur n'est complète que si un délimiteur la suit.
+            following = end
+            while following < len(self.buffer) and self.buffer[following] in self.WHITESPACE:
+                following += 1
+            if (following == len(self.buffer) or self.buffer[following] not in ",:]}") and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_object(self):
+        """Itère sur les clés d'un objet. L'appelant doit consommer la valeur de chaque clé."""
+        self._expect("{")
+        while True:
+            char = self._peek()
+            if char == "}":
+                self.pos += 1
+                return
+            if char == ",":
+                self.pos += 1
+            key = self.value()
+            self._expect(":")
+            yield key
+
+    def iter_array(self):
+        """Itère sur les éléments d'un tableau, décodés un par un."""
+        self._expect("[")
+        while True:
+            char = self._peek()
+            if char == "]":
+                self.pos += 1
+                return
+            if char == ",":
+                self.pos += 1
+            yield self.value()
@@ -1,21 +1,102 @@
 import argparse
-from server import Server, RemoteServer
-from client import Client
+import sys
+
+# Les modules des serveurs et leurs dépendances (requests, aiohttp, sqlite3...)
+# sont importés par le mode choisi seulement : le démarrage reste rapide.
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('-s', '--server', help='Chemin du fichier JSON du serveur local')
+    parser.add_argument('--shards', metavar='REPERTOIRE', help="Répertoire d'un serveur local partitionné par canal (un fichier par partition)")
+    parser.add_argument('--shard-count', type=int, default=4, help="Nombre de partitions à la création de --shards (ensuite fixé par le répertoire)")
+    parser.add_argument('--shard-processes', action='store_true', help="Avec --shards : répartit la recherche plein texte sur un processus par partition")
     parser.add_argument('--url', help='URL du serveur distant')
+    parser.add_argument('--sqlite', help='Chemin de la base SQLite du serveur local')
+    parser.add_argument('--import-json', help="Importe un fichier au format messenger2.json dans la base --sqlite avant de démarrer")
+    parser.add_argument('--journal', action='store_true', help="Journalise les mutations dans <fichier>.log au lieu de réécrire le fichier JSON à chaque modification")
+    parser.add_argument('--format', choices=('json', 'binary'), help="Format du fichier local (par défaut : binary pour l'extension .bin, json sinon)")
+    parser.add_argument('--convert', metavar='DESTINATION', help="Écrit le serveur local (--server) dans DESTINATION, au format déduit de son extension, puis quitte")
+    parser.add_argument('--lazy', action='store_true', help="Affiche le menu sans attendre le chargement des messages, poursuivi en arrière-plan (démarrage plus rapide)")
+    parser.add_argument('--hot-messages', type=int, help="Nombre de messages gardés en mémoire par canal ; les plus anciens sont compressés sur disque (<fichier>.segments/)")
+    parser.add_argument('--segment-size', type=int, default=1000, help="Nombre de messages par segment compressé de l'historique froid")
+    parser.add_argument('--compact-every', type=int, default=1000, help="Nombre d'enregistrements du journal avant compaction dans le snapshot")
+    parser.add_argument('--durability', choices=('sync', 'batch'), default='sync', help="sync : chaque écriture est persistée avant de rendre la main ; batch : les écritures proches sont regroupées en un seul fsync")
+    parser.add_argument('--commit-window', type=float, default=5.0, help="Fenêtre de regroupement des écritures en mode batch (millisecondes)")
+    parser.add_argument('--replica', metavar='FICHIER', help="Avec --url : réplique locale du serveur distant ; lectures locales, écritures mises en file hors ligne")
+    parser.add_argument('--sync-interval', type=float, default=30.0, help="Intervalle de synchronisation de la réplique (secondes)")
+    parser.add_argument('--pool-size', type=int, default=10, help="Nombre de connexions HTTP persistantes vers le serveur distant")
+    parser.add_argument('--connect-timeout', type=float, default=3.05, help="Délai de connexion au serveur distant (secondes)")
+    parser.add_argument('--read-timeout', type=float, default=10.0, help="Délai de lecture d'une réponse du serveur distant (secondes)")
+    parser.add_argument('--retries', type=int, default=3, help="Nombre de nouvelles tentatives des requêtes distantes en échec")
+    parser.add_argument('--client-cache', type=float, default=5.0, metavar='SECONDES', help="Durée de vie du cache des utilisateurs, canaux et membres utilisé par le menu (0 pour le désactiver)")
+    parser.add_argument('--metrics', action='store_true', help="Mesure les appels au serveur (menu Statistiques, route /metrics avec --serve)")
+    parser.add_argument('--import-messages', metavar='FICHIER', help="Importe un fichier JSON lines de messages (channel_id, sender_name, content) puis quitte")
+    parser.add_argument('--batch', nargs='?', const='-', metavar='FICHIER', help="Exécute les commandes JSON lines de FICHIER (par défaut : entrée standard) sans menu ; un résultat JSON par ligne sur la sortie standard")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Nombre maximal d'écritures consécutives regroupées en un appel en mode --batch")
+    parser.add_argument('--serve', metavar='[HOTE:]PORT', help="Expose le serveur local (--server) en HTTP au lieu de lancer le menu")
     args = parser.parse_args()
 
+    results = sys.stdout
+    if args.batch:
+        # Sortie standard réservée aux résultats JSON : les messages de chargement vont sur stderr.
+        sys.stdout = sys.stderr
+
     if args.server:
+        from server import Server
         print(f"Chargement du serveur local : {args.server}")
-        server = Server(args.server)
+        server = Server(args.server, journal=args.journal, compact_every=args.compact_every, lazy_messages=args.lazy, durability=args.durability, commit_window=args.commit_window / 1000, snapshot_format=args.format, hot_messages=args.hot_messages, segment_size=args.segment_size)
+        if args.lazy:
+            server.preload()
+    elif args.shards:
+        from sharded_server import ShardedServer
+        print(f"Chargement du serveur partitionné : {args.shards}")
+        server = ShardedServer(args.shards, shards=args.shard_count, parallel=args.shard_processes, journal=args.journal, compact_every=args.compact_every, durability=args.durability, commit_window=args.commit_window / 1000, snapshot_format=args.format, hot_messages=args.hot_messages, segment_size=args.segment_size)
+    elif args.sqlite:
+        from sqlite_server import SqliteServer
+        print(f"Chargement de la base SQLite : {args.sqlite}")
+        server = SqliteServer(args.sqlite)
+        if args.import_json:
+            server.import_json(args.import_json)
     elif args.url:
+        from server import RemoteServer
         print(f"Connexion au serveur distant : {args.url}")
-        server = RemoteServer(args.url)
+        server = RemoteServer(args.url, pool_size=args.pool_size, connect_timeout=args.connect_timeout, read_timeout=args.read_timeout, retries=args.retries)
+        if args.replica:
+            from replicated_server import ReplicatedServer
+            print(f"Réplique locale : {args.replica}")
+            server = ReplicatedServer(server, args.replica, sync_interval=args.sync_interval)
     else:
-        raise ValueError("Vous devez spécifier un fichier JSON local (--server) ou une URL distante (--url).")
+        raise ValueError("Vous devez spécifier un fichier JSON local (--server), un répertoire partitionné (--shards), une base SQLite (--sqlite) ou une URL distante (--url).")
 
-    app = Client(server)
-    app.main_menu()
+    if args.metrics:
+        from metrics import instrument
+        instrument(server)
+
+    if args.convert:
+        if not args.server:
+            raise ValueError("--convert nécessite un fichier local (--server).")
+        server.save_as(args.convert)
+        print(f"\033[32m{args.server} converti dans {args.convert}.\033[0m")
+    elif args.import_messages:
+        from bulk_import import import_messages
+        count = import_messages(server, args.import_messages)
+        print(f"\033[32m{count} messages importés.\033[0m")
+    elif args.batch:
+        from batch import run_batch
+        failures = run_batch(server, args.batch, results, batch_size=args.batch_size)
+        if hasattr(server, "close"):
+            server.close()
+        sys.exit(1 if failures else 0)
+    elif args.serve:
+        if not args.server:
+            raise ValueError("--serve nécessite un fichier JSON local (--server).")
+        from http_server import serve
+        host, _, port = args.serve.rpartition(":")
+        serve(server, host=host or "127.0.0.1", port=int(port))
+    else:
+        if args.client_cache > 0:
+            from cached_server import CachedServer
+            server = CachedServer(server, ttl=args.client_cache)
+        from client import Client
+        app = Client(server)
+        app.main_menu()
@@ -0,0 +1,157 @@
+import functools
+import inspect
+import os
+import threading
+import time
+
+# Bornes supérieures (secondes) des classes de l'histogramme de latence.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    """Compteurs d'instrumentation d'un serveur : appels, latences, octets écrits, requêtes HTTP.
+
+    Rempli par instrument() ; un serveur non instrumenté n'a aucun surcoût.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # méthode -> nombre d'appels
+        self.errors = {}  # méthode -> nombre d'exceptions
+        self.histograms = {}  # méthode -> [effectifs par classe (+Inf en dernier), somme des durées]
+        self.bytes_written = {}  # "snapshot" / "journal" -> octets
+        self.round_trips = {}  # opération -> requêtes HTTP émises
+
+    def observe(self, method : str, duration : float, failed : bool = False):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            if failed:
+                self.errors[method] = self.errors.get(method, 0) + 1
+            histogram = self.histograms.get(method)
+            if histogram is None:
+                histogram = self.histograms[method] = [[0] * (len(BUCKETS) + 1), 0.0]
+            index = next((i for i, bound in enumerate(BUCKETS) if duration <= bound), len(BUCKETS))
+            histogram[0][index] += 1
+            histogram[1] += duration
+
+    def add_bytes(self, target : str, count : int):
+        with self.lock:
+            self.bytes_written[target] = self.bytes_written.get(target, 0) + count
+
+    def add_round_trip(self, operation : str):
+        with self.lock:
+            self.round_trips[operation] = self.round_trips.get(operation, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            for counters in (self.calls, self.errors, self.histograms, self.bytes_written, self.round_trips):
+                counters.clear()
+
+    def snapshot(self) -> dict:
+        """Copie cohérente des compteurs, latences en millisecondes."""
+        with self.lock:
+            methods = {}
+            for method, (counts, total) in self.histograms.items():
+                calls = self.calls[method]
+                methods[method] = {
+                    "calls": calls,
+                    "errors": self.errors.get(method, 0),
+                    "mean_ms": round(total / calls * 1000, 3),
+                    "p50_ms": self._quantile(counts, calls, 0.5),
+                    "p99_ms": self._quantile(counts, calls, 0.99),
+                    "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"], counts)),
+                }
+            return {"methods": methods, "bytes_written": dict(self.bytes_written), "round_trips": dict(self.round_trips)}
+
+    @staticmethod
+    def _quantile(counts : list, total : int, q : float):
+        """Borne supérieure (ms) de la classe contenant le quantile q ; None au-delà de la dernière borne."""
+        seen = 0
+        for bound, count in zip(BUCKETS, counts):
+            seen += count
+            if seen >= q * total:
+                return bound * 1000
+        return None
+
+    def prometheus(self) -> str:
+        """Export au format texte de Prometheus."""
+        with self.lock:
+            lines = ["# HELP messenger_calls_total Appels des méthodes du serveur.", "# TYPE messenger_calls_total counter"]
+            lines += [f'messenger_calls_total{{method="{method}"}} {count}' for method, count in sorted(self.calls.items())]
+            lines += ["# HELP messenger_errors_total Exceptions levées par les méthodes du serveur.", "# TYPE messenger_errors_total counter"]
+            lines += [f'messenger_errors_total{{method="{method}"}} {count}' for method, count in sorted(self.errors.items())]
+            lines += ["# HELP messenger_call_duration_seconds Durée des appels des méthodes du serveur.", "# TYPE messenger_call_duration_seconds histogram"]
+            for method, (counts, total) in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip([str(bound) for bound in BUCKETS] + ["+Inf"], counts):
+                    cumulative += count
+                    lines.append(f'messenger_call_duration_seconds_bucket{{method="{method}",le="{bound}"}} {cumulative}')
+                lines.append(f'messenger_call_duration_seconds_sum{{method="{method}"}} {total}')
+                lines.append(f'messenger_call_duration_seconds_count{{method="{method}"}} {cumulative}')
+            lines += ["# HELP messenger_bytes_written_total Octets écrits sur disque.", "# TYPE messenger_bytes_written_total counter"]
+            lines += [f'messenger_bytes_written_total{{target="{target}"}} {count}' for target, count in sorted(self.bytes_written.items())]
+            lines += ["# HELP messenger_http_requests_total Requêtes HTTP émises par opération du client distant.", "# TYPE messenger_http_requests_total counter"]
+            lines += [f'messenger_http_requests_total{{operation="{operation}"}} {count}' for operation, count in sorted(self.round_trips.items())]
+            return "\n".join(lines) + "\n"
+
+def _timed(metrics : Metrics, name : str, function, current : threading.local):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        # Seule l'opération la plus externe est retenue pour attribuer les requêtes HTTP.
+        outer = getattr(current, "operation", None) is None
+        if outer:
+            current.operation = name
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = function(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            metrics.observe(name, time.perf_counter() - start, failed)
+            if outer:
+                current.operation = None
+    return wrapper
+
+def instrument(server, metrics : Metrics = None) -> Metrics:
+    """Instrumente les méthodes publiques d'un serveur (BaseServer) et renvoie ses métriques.
+
+    Les méthodes sont remplacées sur l'instance seulement : les autres serveurs
+    et la classe ne sont pas modifiés. Les générateurs (subscribe) ne sont pas
+    chronométrés. Les métriques restent accessibles via server.metrics.
+    """
+    metrics = metrics or Metrics()
+    current = threading.local()
+    for name, function in inspect.getmembers(type(server), inspect.isfunction):
+        if name.startswith("_") or name in ("close", "cache_stats") or inspect.isgeneratorfunction(function):
+            continue
+        setattr(server, name, _timed(metrics, name, getattr(server, name), current))
+
+    # Octets écrits par le serveur local : snapshot complet et journal.
+    if hasattr(server, "_save"):
+        save = server._save
+
+        def _save(path=None, snapshot_format=None):
+            save(path, snapshot_format)
+            metrics.add_bytes("snapshot", os.path.getsize(path or server.file_path))
+        server._save = _save
+    journal = getattr(server, "journal", None)
+    if journal:
+        append_many = journal.append_many
+
+        def journal_append_many(records):
+            before = journal.size()
+            append_many(records)
+            metrics.add_bytes("journal", journal.size() - before)
+        journal.append_many = journal_append_many
+
+    # Requêtes HTTP du client distant, attribuées à l'opération en cours.
+    for name in ("_get", "_post"):
+        if hasattr(server, name) and hasattr(server, "session"):
+            request = getattr(server, name)
+
+            def counted(*args, request=request, **kwargs):
+                metrics.add_round_trip(getattr(current, "operation", None) or "other")
+                return request(*args, **kwargs)
+            setattr(server, name, counted)
+
+    server.metrics = metrics
+    return metrics
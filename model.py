@@ -1,7 +1,10 @@
 import json
+from array import array
 
 class Entité: 
     """Classe de base représentant une entité avec un ID et un nom."""
+    __slots__ = ("id", "name")
+
     def __init__(self, id, name):
        self.id=id
        self.name=name
@@ -11,12 +14,16 @@ class Entité:
 
 class User(Entité):
     """Représente un utilisateur."""
+    __slots__ = ()
+
     def to_dict(self):
         """Convertit l'utilisateur en dictionnaire."""
         return {"id": self.id, "name": self.name}
 
 class Channel(Entité):
     """Représente un canal avec des membres."""
+    __slots__ = ("members",)
+
     def __init__(self, id, name):
         super().__init__(id, name)
         self.members = []
@@ -26,16 +33,122 @@ class Channel(Entité):
         return {"id": self.id, "name": self.name, "members": [{"id": member.id, "name": member.name} for member in self.members]}
 
 class Message():
-    """Représente un message envoyé dans un canal."""
-    def __init__(self, sender_id, channel_id, content):
+    """Représente un message envoyé dans un canal.
+
+    Le nom de l'expéditeur n'est pas stocké : il est résolu à l'affichage
+    via BaseServer.get_user_name(sender_id). id est le numéro de séquence
+    attribué par le serveur (croissant dans l'ordre de réception),
+    reception_date l'horodatage de réception en secondes depuis l'epoch ;
+    tous deux valent None pour les messages d'anciens fichiers qui n'en ont pas.
+    """
+    __slots__ = ("sender_id", "channel_id", "content", "id", "reception_date")
+
+    def __init__(self, sender_id, channel_id, content, id=None, reception_date=None):
         self.sender_id = sender_id
         self.channel_id = channel_id
         self.content = content
-        self.sender_name = None  
+        self.id = id
+        self.reception_date = reception_date
 
     def __repr__(self):
-        return f"(Canal {self.channel_id}) {self.sender_name or 'Unknown'} : {self.content}"
+        return f"(Canal {self.channel_id}) Utilisateur {self.sender_id} : {self.content}"
 
     def to_dict(self):
         """Convertit le message en dictionnaire."""
-        return {"sender_id": self.sender_id, "channel": self.channel_id, "content": self.content}
\ No newline at end of file
+        return {"id": self.id, "sender_id": self.sender_id, "channel": self.channel_id, "content": self.content, "date": self.reception_date}
+
+class MessageLog():
+    """Historique des messages stocké en colonnes.
+
+    Les id d'expéditeur et de canal sont rangés dans des tableaux d'entiers C
+    plutôt que dans un objet Message par ligne ; les Message ne sont créés qu'à
+    la lecture d'une ligne. Un message supprimé est seulement marqué
+    (tombstone) et son contenu libéré : les numéros de ligne restent stables
+    jusqu'à compact().
+
+    Les lignes sont ajoutées dans l'ordre de réception : les colonnes ids et
+    dates sont triées et servent d'index pour les recherches par numéro de
+    séquence ou par date (bisect). Une date inconnue vaut 0.
+    """
+    __slots__ = ("sender_ids", "channel_ids", "contents", "ids", "dates", "deleted", "tombstones")
+
+    def __init__(self):
+        self.sender_ids = array("l")
+        self.channel_ids = array("l")
+        self.contents = []
+        self.ids = array("q")
+        self.dates = array("d")
+        self.deleted = bytearray()  # 1 si la ligne est supprimée
+        self.tombstones = 0
+
+    def append(self, sender_id, channel_id, content, id=0, date=0.0) -> int:
+        """Ajoute un message et renvoie le numéro de sa ligne."""
+        self.sender_ids.append(sender_id)
+        self.channel_ids.append(channel_id)
+        self.contents.append(content)
+        self.ids.append(id)
+        self.dates.append(date)
+        self.deleted.append(0)
+        return len(self.contents) - 1
+
+    def delete(self, row):
+        """Marque une ligne comme supprimée."""
+        if not self.deleted[row]:
+            self.deleted[row] = 1
+            self.contents[row] = None
+            self.tombstones += 1
+
+    def is_live(self, row) -> bool:
+        return not self.deleted[row]
+
+    def compact(self) -> array:
+        """Supprime physiquement les lignes marquées.
+
+        Renvoie la table ancienne ligne -> nouvelle ligne (-1 pour une ligne supprimée).
+        """
+        mapping = array("l", [-1]) * len(self.contents)
+        kept = [row for row, deleted in enumerate(self.deleted) if not deleted]
+        for new_row, row in enumerate(kept):
+            mapping[row] = new_row
+        self.sender_ids = array("l", (self.sender_ids[row] for row in kept))
+        self.channel_ids = array("l", (self.channel_ids[row] for row in kept))
+        self.contents = [self.contents[row] for row in kept]
+        self.ids = array("q", (self.ids[row] for row in kept))
+        self.dates = array("d", (self.dates[row] for row in kept))
+        self.deleted = bytearray(len(kept))
+        self.tombstones = 0
+        return mapping
+
+    def rows(self):
+        """Itère sur les lignes non supprimées (sender_id, channel_id, content, id, date) sans créer de Message."""
+        columns = (self.sender_ids, self.channel_ids, self.contents, self.ids, self.dates)
+        if not self.tombstones:
+            return zip(*columns)
+        return (row[:5] for row in zip(*columns, self.deleted) if not row[5])
+
+    def __getitem__(self, row):
+        return Message(self.sender_ids[row], self.channel_ids[row], self.contents[row], self.ids[row], self.dates[row] or None)
+
+    def __iter__(self):
+        return (Message(sender_id, channel_id, content, id, date or None) for sender_id, channel_id, content, id, date in self.rows())
+
+    def __len__(self):
+        """Nombre de lignes, supprimées comprises (numéro de la prochaine ligne)."""
+        return len(self.contents)
+
+class MessagePage():
+    """Page de messages d'un canal avec ses curseurs de pagination.
+
+    before permet de demander la page précédente (None s'il n'y a pas de messages
+    plus anciens), after de demander les messages postés après cette page.
+    """
+    def __init__(self, messages, before, after):
+        self.messages = messages
+        self.before = before
+        self.after = after
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __len__(self):
+        return len(self.messages)
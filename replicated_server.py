@@ -0,0 +1,318 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List
+import requests
+from model import User, Channel, Message, MessagePage
+from server import BaseServer, Server, RemoteServer
+
+class ReplicatedServer(BaseServer):
+    """RemoteServer doublé d'une réplique locale, utilisable hors ligne.
+
+    Les utilisateurs, canaux, adhésions et messages du serveur distant sont
+    copiés dans un Server local journalisé (path) : toutes les lectures sont
+    servies localement, sans aller-retour réseau. Un thread synchronise la
+    réplique toutes les sync_interval secondes : il envoie d'abord les
+    écritures en attente, puis ne télécharge que les messages de numéro de
+    séquence supérieur au dernier reçu (route /messages/since).
+
+    create_user, join_channel et post_message sont validés sur la réplique puis
+    mis en file dans <path>.outbox, persistée, et rejoués dans l'ordre dès que
+    le serveur répond. Une écriture refusée par le serveur (conflit : nom déjà
+    pris, adhésion manquante...) est retirée de la file et consignée dans
+    conflicts ; une erreur réseau ou serveur (5xx) arrête le rejeu, repris à la
+    synchronisation suivante. Les écritures en attente ne sont visibles dans
+    les lectures qu'une fois synchronisées.
+
+    Une écriture dont la réponse est perdue (délai dépassé alors que le
+    serveur l'avait acceptée) reste en file et est rejouée. Chaque message
+    porte un request_id : http_server reconnaît le rejeu et ne poste pas de
+    doublon, tant que l'id figure parmi ses derniers envois (en mémoire,
+    perdus au redémarrage). Un create_user rejoué est alors refusé (nom
+    déjà pris) et consigné dans conflicts bien qu'il ait abouti ; un
+    join_channel rejoué est sans effet.
+    """
+    PAGE_SIZE = 1000  # messages téléchargés par requête
+
+    def __init__(self, remote : RemoteServer, path : str, sync_interval : float = 30.0):
+        self.remote = remote
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"users": [], "channels": [], "messages": []}, f)
+        self.replica = Server(path, journal=True)
+        self.outbox_path = path + ".outbox"
+        self.outbox = self._read_outbox()
+        self.outbox_lock = threading.Lock()
+        self.sync_lock = threading.Lock()  # une seule synchronisation à la fois
+        self.conflicts = []  # (écriture, motif du refus)
+        self.online = None  # inconnu avant la première synchronisation
+        self.last_sync = None
+        # Le thread de synchronisation se réveille à chaque écriture mise en file.
+        self.wake = threading.Event()
+        self.closed = False
+        self.thread = None
+        if sync_interval:
+            self.thread = threading.Thread(target=self._run, args=(sync_interval,), name="replica-sync", daemon=True)
+            self.thread.start()
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        if self.thread:
+            self.thread.join()
+        self.replica.close()
+        self.remote.close()
+
+    def cache_stats(self) -> dict:
+        return self.remote.cache_stats()
+
+    def sync_status(self) -> dict:
+        with self.outbox_lock:
+            pending = len(self.outbox)
+        return {"online": self.online, "last_sync": self.last_sync, "pending": pending, "conflicts": len(self.conflicts), "checkpoint": self.replica.sequence.last}
+
+    # File des écritures
+    def _read_outbox(self) -> list:
+        if not os.path.exists(self.outbox_path):
+            return []
+        with open(self.outbox_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.endswith("\n")]
+
+    def _write_outbox(self):
+        # Réécriture complète puis renommage : la file n'est jamais à moitié écrite.
+        tmp_path = self.outbox_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(operation) + "\n" for operation in self.outbox)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.outbox_path)
+
+    def _queue(self, operation : dict):
+        with self.outbox_lock:
+            self.outbox.append(operation)
+            self._write_outbox()
+        self.wake.set()
+
+    def _pending(self, op : str) -> list:
+        with self.outbox_lock:
+            return [operation for operation in self.outbox if operation["op"] == op]
+
+    # Synchronisation
+    def _run(self, interval : float):
+        while not self.closed:
+            self.sync()
+            self.wake.wait(interval)
+            self.wake.clear()
+
+    def sync(self) -> bool:
+        """Envoie les écritures en attente puis télécharge les changements ; renvoie False si le serveur est injoignable."""
+        with self.sync_lock:
+            try:
+                self._push()
+                self._pull()
+            except (requests.RequestException, ValueError) as error:
+                if self.online is not False:
+                    print(f"\033[31mServeur distant injoignable, lectures servies par la réplique locale : {error}\033[0m")
+                self.online = False
+                return False
+            self.online = True
+            self.last_sync = time.time()
+            return True
+
+    def _send(self, operation : dict):
+        """Rejoue une écriture ; renvoie None si elle est acceptée, sinon le motif du refus."""
+        op = operation["op"]
+        if op == "create_user":
+            response = self.remote._post("/users/create", {"name": operation["name"]})
+        else:
+            user_id = self.remote._user_id(operation["user_name"])
+            if user_id is None:
+                return f"utilisateur {operation['user_name']} introuvable"
+            if op == "join_channel":
+                response = self.remote._post(f"/channels/{operation['channel_id']}/join", {"user_id": user_id, "name": operation["user_name"]})
+            else:
+                payload = {"sender_id": user_id, "content": operation["content"]}
+                if "request_id" in operation:
+                    payload["request_id"] = operation["request_id"]
+                response = self.remote._post(f"/channels/{operation['channel_id']}/messages/post", payload)
+        if response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code != 200:
+            try:
+                return response.json()["detail"]
+            except (ValueError, KeyError, TypeError):
+                return response.text
+        return None
+
+    def _push(self):
+        while True:
+            with self.outbox_lock:
+                if not self.outbox:
+                    return
+                operation = self.outbox[0]
+            error = self._send(operation)
+            if error is not None:
+                self.conflicts.append((operation, error))
+                print(f"\033[31mÉcriture hors ligne refusée par le serveur ({operation['op']}) : {error}\033[0m")
+            with self.outbox_lock:
+                self.outbox.pop(0)
+                self._write_outbox()
+
+    def _apply(self, records : list):
+        """Applique et persiste dans la réplique des mutations venues du serveur distant."""
+        if not records:
+            return
+        replica = self.replica
+        with replica.lock.write():
+            for record in records:
+                replica._apply(record)
+            ticket = replica._commit({'op': 'batch', 'records': records})
+            replica._schedule_reclaim()
+        replica._sync(ticket)
+
+    @staticmethod
+    def _timestamp(date) -> float:
+        try:
+            return datetime.fromisoformat(date).timestamp() if date else 0.0
+        except ValueError:
+            return 0.0
+
+    def _pull(self):
+        replica = self.replica
+        # Utilisateurs et canaux : listes complètes (petites), comparées à la réplique.
+        users = {user["id"]: user["name"] for user in self.remote._refresh_users()}
+        records = []
+        for user in replica.get_users():
+            if users.get(user.id) != user.name:
+                records.append({'op': 'ban_user', 'id': user.id})
+        for user_id, name in users.items():
+            user = replica.users_by_id.get(user_id)
+            if user is None or user.name != name:
+                records.append({'op': 'create_user', 'id': user_id, 'name': name})
+
+        channels = {channel["id"]: channel["name"] for channel in self.remote._refresh_channels()}
+        for channel in replica.get_channels():
+            if channels.get(channel.id) != channel.name:
+                records.append({'op': 'ban_channel', 'id': channel.id})
+        for channel_id, name in channels.items():
+            channel = replica.channels_by_id.get(channel_id)
+            if channel is None or channel.name != name:
+                records.append({'op': 'create_channel', 'id': channel_id, 'name': name})
+        self._apply(records)
+
+        records = []
+        for channel_id in channels:
+            members = replica.members.get(channel_id, ())
+            for member in self.remote.get_channel_members(channel_id):
+                if member["id"] not in members:
+                    records.append({'op': 'join_channel', 'channel_id': channel_id, 'user_id': member["id"]})
+        self._apply(records)
+
+        # Messages : seulement ceux postés depuis le dernier reçu, par pages.
+        while True:
+            checkpoint = replica.sequence.last
+            response = self.remote._get("/messages/since", params={"seq": checkpoint, "limit": self.PAGE_SIZE})
+            response.raise_for_status()
+            messages = response.json()
+            self._apply([{'op': 'post_message', 'sender_id': message["sender_id"], 'channel': message["channel_id"], 'content': message["content"],
+                          'id': message["id"], 'date': self._timestamp(message.get("reception_date"))} for message in messages])
+            if len(messages) < self.PAGE_SIZE:
+                return
+
+    # Lectures : servies par la réplique
+    def get_users(self) -> List[User]:
+        return self.replica.get_users()
+
+    def get_user_name(self, user_id : int) -> str:
+        return self.replica.get_user_name(user_id)
+
+    def get_channels(self) -> List[Channel]:
+        return self.replica.get_channels()
+
+    def get_channel_members(self, channel_id : int) -> List[User]:
+        return self.replica.get_channel_members(channel_id)
+
+    def get_all_messages(self) -> List[Message]:
+        return self.replica.get_all_messages()
+
+    def get_messages(self, channel_id : int) -> List[Message]:
+        return self.replica.get_messages(channel_id)
+
+    def get_messages_page(self, channel_id : int, limit : int = 50, before : int = None, after : int = None) -> MessagePage:
+        return self.replica.get_messages_page(channel_id, limit, before, after)
+
+    def get_messages_since(self, seq : int, channel_id : int = None, limit : int = None) -> List[Message]:
+        return self.replica.get_messages_since(seq, channel_id, limit)
+
+    def get_messages_between(self, start : float, end : float, channel_id : int = None, limit : int = None) -> List[Message]:
+        return self.replica.get_messages_between(start, end, channel_id, limit)
+
+    def search_messages(self, query : str, channel_id : int = None, sender_name : str = None, limit : int = 20, offset : int = 0) -> List[Message]:
+        return self.replica.search_messages(query, channel_id, sender_name, limit, offset)
+
+    def subscribe(self, channel_id : int, since : int = None, poll_interval : float = 1.0):
+        # Les messages arrivent dans la réplique à chaque synchronisation.
+        return self.replica.subscribe(channel_id, since, poll_interval)
+
+    # Écritures mises en file
+    def create_user(self, name : str) -> User:
+        if name in self.replica.users_by_name or any(operation["name"] == name for operation in self._pending("create_user")):
+            print(f"\033[31mL'utilisateur {name} existe déjà.\033[0m")
+            return
+        self._queue({"op": "create_user", "name": name})
+        print(f"\033[32mL'utilisateur {name} sera créé à la prochaine synchronisation.\033[0m")
+        # Id attribué par le serveur distant à la synchronisation.
+        return User(None, name)
+
+    def join_channel(self, channel_id : int, user_name : str):
+        if channel_id not in self.replica.channels_by_id:
+            print(f"\033[31mCanal {channel_id} introuvable.\033[0m")
+            return
+        user = self.replica.users_by_name.get(user_name)
+        if user is None and not any(operation["name"] == user_name for operation in self._pending("create_user")):
+            print("\033[31mUtilisateur introuvable.\033[0m")
+            return
+        if (user is not None and user.id in self.replica.members[channel_id]) or any(
+                operation["channel_id"] == channel_id and operation["user_name"] == user_name for operation in self._pending("join_channel")):
+            print(f"\033[34m{user_name} est déjà dans le canal {channel_id}.\033[0m")
+            return
+        self._queue({"op": "join_channel", "channel_id": channel_id, "user_name": user_name})
+        print(f"\033[32m{user_name} rejoindra le canal {channel_id} à la prochaine synchronisation.\033[0m")
+
+    def post_message(self, channel_id : int, sender_name : str, content : str) -> Message:
+        if channel_id not in self.replica.channels_by_id:
+            print(f"\033[31mCanal {channel_id} introuvable.\033[0m")
+            return None
+        user = self.replica.users_by_name.get(sender_name)
+        if not ((user is not None and user.id in self.replica.members[channel_id]) or any(
+                operation["channel_id"] == channel_id and operation["user_name"] == sender_name for operation in self._pending("join_channel"))):
+            print(f"\033[31m{sender_name} doit rejoindre le canal {channel_id} avant d'envoyer des messages.\033[0m")
+            return None
+        self._queue({"op": "post_message", "channel_id": channel_id, "user_name": sender_name, "content": content, "request_id": os.urandom(8).hex()})
+        print(f"\033[32mMessage de {sender_name} mis en file, envoyé à la prochaine synchronisation.\033[0m")
+        # Numéro de séquence et date seront attribués par le serveur distant.
+        return Message(user.id if user else None, channel_id, content)
+
+    # Autres écritures : transmises directement (les id sont attribués par le serveur).
+    def _forward(self, method : str, *args):
+        try:
+            result = getattr(self.remote, method)(*args)
+        except requests.RequestException as error:
+            print(f"\033[31mServeur distant injoignable : {error}\033[0m")
+            return None
+        self.wake.set()
+        return result
+
+    def create_channel(self, name : str) -> Channel:
+        return self._forward("create_channel", name)
+
+    def create_users(self, names : List[str]) -> List[User]:
+        return self._forward("create_users", names)
+
+    def join_channel_many(self, channel_id : int, user_names : List[str]):
+        return self._forward("join_channel_many", channel_id, user_names)
+
+    def post_messages(self, messages : List[tuple]) -> List[Message]:
+        return self._forward("post_messages", messages)
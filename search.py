@@ -0,0 +1,82 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+TOKEN = re.compile(r"\w+")
+
+def normalize(text : str) -> str:
+    """Met en minuscules et retire les accents ("Honoré" -> "honore")."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def tokenize(text : str) -> list:
+    return TOKEN.findall(normalize(text))
+
+class InvertedIndex:
+    """Index inversé terme -> {id de document: nombre d'occurrences}, mis à jour à chaque ajout."""
+    def __init__(self):
+        self.postings = {}
+        self.lengths = {}  # id de document -> nombre de termes
+
+    def add(self, document_id : int, text : str):
+        tokens = tokenize(text)
+        self.lengths[document_id] = len(tokens)
+        for term, count in Counter(tokens).items():
+            self.postings.setdefault(term, {})[document_id] = count
+
+    def remove(self, document_id : int, text : str):
+        self.lengths.pop(document_id, None)
+        for term in set(tokenize(text)):
+            documents = self.postings.get(term)
+            if documents is not None:
+                documents.pop(document_id, None)
+                if not documents:
+                    del self.postings[term]
+
+    def remap(self, mapping):
+        """Renumérote les documents (mapping[ancien id] = nouvel id, -1 pour un document supprimé)."""
+        self.lengths = {mapping[document_id]: length for document_id, length in self.lengths.items() if mapping[document_id] >= 0}
+        for term, documents in list(self.postings.items()):
+            documents = {mapping[document_id]: count for document_id, count in documents.items() if mapping[document_id] >= 0}
+            if documents:
+                self.postings[term] = documents
+            else:
+                del self.postings[term]
+
+    def statistics(self, query : str) -> tuple:
+        """(nombre de documents, {terme: nombre de documents le contenant}) pour les termes de query."""
+        return len(self.lengths), {term: len(self.postings.get(term, ())) for term in set(tokenize(query))}
+
+    def search(self, query : str, accept=None, with_scores : bool = False, statistics : tuple = None) -> list:
+        """Renvoie les id des documents contenant tous les termes de query.
+
+        Classement par score TF-IDF décroissant, puis du plus récent (id le plus
+        grand) au plus ancien à score égal. accept(id) permet de filtrer les documents (canal, expéditeur) avant le classement.
+        Avec with_scores, renvoie des couples (score, id). statistics, au
+        format de statistics(), remplace celles de l'index dans le calcul de
+        l'IDF : des index distincts (partitions) donnent alors des scores comparables.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Intersection en partant du terme le plus rare.
+        postings = sorted((self.postings.get(term, {}) for term in set(terms)), key=len)
+        candidates = set(postings[0])
+        for documents in postings[1:]:
+            candidates.intersection_update(documents)
+        if accept is not None:
+            candidates = {document_id for document_id in candidates if accept(document_id)}
+
+        document_count, frequencies = statistics or self.statistics(query)
+        idf = {term: math.log(1 + document_count / (1 + frequencies.get(term, 0))) for term in set(terms)}
+        scored = []
+        for document_id in candidates:
+            score = 0.0
+            for term in terms:
+                score += self.postings[term][document_id] / self.lengths[document_id] * idf[term]
+            scored.append((-score, -document_id))
+        scored.sort()
+        if with_scores:
+            return [(-score, -document_id) for score, document_id in scored]
+        return [-document_id for _, document_id in scored]
@@ -1,8 +1,21 @@
 from abc import ABC, abstractmethod
 from typing import List
+import bisect
+import heapq
+import itertools
 import json
-import requests
-from model import User, Channel, Message
+import os
+import threading
+import time
+from array import array
+from model import User, Channel, Message, MessageLog, MessagePage
+from cache import TTLCache
+from concurrency import RWLock, GroupCommitWriter, Sequence
+import binary_snapshot
+from cold_storage import ColdStore
+from journal import Journal
+from json_stream import JsonStream
+from search import InvertedIndex
 
 class BaseServer(ABC):
     @abstractmethod
@@ -45,19 +58,158 @@ class BaseServer(ABC):
         """Récupère tous les messages d'un canal."""
         pass
 
+    @abstractmethod
+    def get_messages_page(self, channel_id : int, limit : int = 50, before : int = None, after : int = None) -> MessagePage:
+        """Récupère une page d'au plus limit messages d'un canal.
+
+        Sans curseur, renvoie les messages les plus récents. before renvoie les
+        messages plus anciens que ce curseur, after les messages plus récents.
+        """
+        pass
+
     @abstractmethod
     def post_message(self, channel_id : int, sender_name : str, content : str) -> Message:
         """Poste un message dans un canal."""
         pass
 
+    def get_user_name(self, user_id : int) -> str:
+        """Renvoie le nom d'un utilisateur ("Unknown" s'il n'existe plus)."""
+        user = next((user for user in self.get_users() if user.id == user_id), None)
+        return user.name if user else "Unknown"
+
+    def search_messages(self, query : str, channel_id : int = None, sender_name : str = None, limit : int = 20, offset : int = 0) -> List[Message]:
+        """Recherche les messages contenant tous les mots de query, les plus pertinents d'abord.
+
+        La recherche ignore la casse et les accents. Implémentation par défaut :
+        indexe à la volée les messages candidats.
+        """
+        messages = self.get_all_messages() if channel_id is None else self.get_messages(channel_id)
+        sender_id = None
+        if sender_name is not None:
+            sender = next((user for user in self.get_users() if user.name == sender_name), None)
+            if sender is None:
+                return []
+            sender_id = sender.id
+
+        index = InvertedIndex()
+        for i, message in enumerate(messages):
+            if sender_id is None or message.sender_id == sender_id:
+                index.add(i, message.content)
+        return [messages[i] for i in index.search(query)[offset:offset + limit]]
+
+    # Opérations groupées. Implémentations par défaut : une opération unitaire
+    # par élément, sans atomicité ; les serveurs les redéfinissent pour valider
+    # puis appliquer et persister le lot en une fois.
+    def create_users(self, names : List[str]) -> List[User]:
+        """Crée plusieurs utilisateurs."""
+        return [self.create_user(name) for name in names]
+
+    def join_channel_many(self, channel_id : int, user_names : List[str]):
+        """Ajoute plusieurs utilisateurs à un canal."""
+        for user_name in user_names:
+            self.join_channel(channel_id, user_name)
+
+    def post_messages(self, messages : List[tuple]) -> List[Message]:
+        """Poste plusieurs messages, donnés sous forme de tuples (channel_id, sender_name, content)."""
+        return [self.post_message(channel_id, sender_name, content) for channel_id, sender_name, content in messages]
+
+    def get_messages_since(self, seq : int, channel_id : int = None, limit : int = None) -> List[Message]:
+        """Récupère les messages de numéro de séquence supérieur à seq, dans l'ordre de réception.
+
+        Sert à la synchronisation incrémentale : seq est le plus grand id déjà
+        reçu. Implémentation par défaut : parcourt tous les messages.
+        """
+        messages = self.get_all_messages() if channel_id is None else self.get_messages(channel_id)
+        return sorted((message for message in messages if message.id is not None and message.id > seq), key=lambda message: message.id)[:limit]
+
+    def get_messages_between(self, start : float, end : float, channel_id : int = None, limit : int = None) -> List[Message]:
+        """Récupère les messages reçus entre les dates start (incluse) et end (exclue), en secondes depuis l'epoch.
+
+        Implémentation par défaut : parcourt tous les messages.
+        """
+        messages = self.get_all_messages() if channel_id is None else self.get_messages(channel_id)
+        return sorted((message for message in messages if message.reception_date is not None and start <= message.reception_date < end),
+                      key=lambda message: message.id)[:limit]
+
+    def subscribe(self, channel_id : int, since : int = None, poll_interval : float = 1.0):
+        """Itère sans fin sur les nouveaux messages d'un canal, au fur et à mesure de leur envoi.
+
+        since est un curseur after (MessagePage.after) ; sans curseur, seuls les
+        messages postés après l'appel sont renvoyés. Implémentation par défaut :
+        interroge get_messages_page toutes les poll_interval secondes.
+        """
+        cursor = since if since is not None else self.get_messages_page(channel_id, limit=1).after
+        while True:
+            page = self.get_messages_page(channel_id, limit=100, after=cursor)
+            yield from page.messages
+            cursor = page.after
+            if not page.messages:
+                time.sleep(poll_interval)
+
 
 
 class Server(BaseServer) :
-    def __init__(self, file_path : str):
+    RECLAIM_MIN = 1000  # nombre minimal de messages supprimés avant une récupération en arrière-plan
+
+    def __init__(self, file_path : str, journal : bool = False, compact_every : int = 1000, compact_bytes : int = 4 * 1024 * 1024, lazy_messages : bool = False, durability : str = "sync", commit_window : float = 0.005, reclaim_ratio : float = 0.25, snapshot_format : str = None, hot_messages : int = None, segment_size : int = 1000, sequence : Sequence = None, read_only : bool = False):
         self.file_path = file_path
-        self.users = []
-        self.channels = []
-        self.messages = []
+        # "json" ou "binary" (voir binary_snapshot) ; par défaut d'après l'extension du fichier.
+        self.snapshot_format = snapshot_format or binary_snapshot.format_for(file_path or "")
+        self.messages = MessageLog()
+        # Index maintenus à jour par load() et _apply()
+        self.users_by_id = {}  # dans l'ordre de création
+        self.users_by_name = {}
+        self.channels_by_id = {}  # dans l'ordre de création
+        self.channels_by_name = {}
+        self.members = {}  # id du canal -> ensemble des id des membres
+        self.user_channels = {}  # id de l'utilisateur -> ensemble des id de ses canaux
+        self.channel_messages = {}  # id du canal -> lignes de self.messages, dans l'ordre
+        self.user_messages = {}  # id de l'expéditeur -> lignes de self.messages, dans l'ordre
+        self.search_index = None  # index inversé des contenus, construit à la première recherche
+        # Numéros de séquence des messages, partagés entre partitions (ShardedServer)
+        # pour rester uniques ; les dates de réception ne décroissent jamais.
+        self.sequence = sequence or Sequence()
+        self.last_date = 0.0
+        # Les bannissements marquent les messages supprimés (tombstones) ; leurs
+        # lignes sont récupérées en arrière-plan quand elles dépassent
+        # reclaim_ratio de l'historique.
+        self.reclaim_ratio = reclaim_ratio
+        self.reclaiming = False
+        # Historique froid : au-delà de hot_messages messages en mémoire par
+        # canal, les plus anciens sont scellés par blocs de segment_size dans
+        # des segments compressés (<fichier>.segments/) lors de l'écriture du
+        # snapshot. Désactivé si hot_messages vaut None.
+        self.hot_messages = hot_messages
+        self.segment_size = segment_size
+        self.cold = None
+        # Mode journalisé : les mutations sont ajoutées à <fichier>.log et
+        # repliées dans le snapshot tous les compact_every enregistrements
+        # ou dès que le journal dépasse compact_bytes octets.
+        self.journal = Journal(file_path + ".log") if journal and file_path else None
+        self.compact_every = compact_every
+        self.compact_bytes = compact_bytes
+        self.lsn = 0
+        # Lecture seule (processus de lecture de ShardedServer) : le journal est
+        # rejoué sans être réparé ni replié dans le snapshot.
+        self.read_only = read_only
+        # Chargement paresseux : les messages ne sont lus qu'au premier accès.
+        self.lazy_messages = lazy_messages
+        self.messages_loaded = False
+        self.load_lock = threading.Lock()
+        # Utilisateurs du snapshot, pour écarter les messages orphelins chargés en différé.
+        self.snapshot_user_ids = None
+        # Réveille les abonnés (subscribe) à chaque nouveau message ; last_posted
+        # (id du canal -> numéro du dernier message posté) est lu sans le verrou.
+        self.message_posted = threading.Condition()
+        self.last_posted = {}
+        # Lectures concurrentes, écritures exclusives sur l'état en mémoire.
+        self.lock = RWLock()
+        # Durabilité : "sync" persiste chaque mutation avant de rendre la main,
+        # "batch" regroupe les mutations arrivant dans une fenêtre de
+        # commit_window secondes en une seule écriture (un seul fsync).
+        if durability not in ("sync", "batch"):
+            raise ValueError(f"Mode de durabilité inconnu : {durability}")
+        self.committer = GroupCommitWriter(self._flush_batch, commit_window) if durability == "batch" else None
         self.load()
      
     # Méthodes spécifiques au serveur local
@@ -65,234 +217,1090 @@ class Server(BaseServer) :
         if not self.file_path:
             raise ValueError("Le chemin du fichier JSON est manquant. Utilisez l'argument --server pour spécifier un fichier.")
     
-        with open(self.file_path, "r") as f:
-            server = json.load(f)
-        
-            self.users = [User(id=user['id'], name=user['name']) for user in server.get('users', [])]
-        
-            self.channels = []
-            for channel_data in server.get('channels', []):
-                channel = Channel(id=channel_data['id'], name=channel_data['name'])
-            
-                for member_data in channel_data.get('members', []):
-                    user = next((u for u in self.users if u.id == member_data['id']), None)
-                    if user:
-                        channel.members.append(user)
-            
-                self.channels.append(channel)
-        
-            self.messages = [Message(sender_id=message['sender_id'], channel_id=message['channel'], content=message['content']) for message in server.get('messages', [])]
+        self.users_by_id = {}
+        self.users_by_name = {}
+        self.channels_by_id = {}
+        self.channels_by_name = {}
+        self.members = {}
+        self.user_channels = {}
+        self.messages = MessageLog()
+        self.channel_messages = {}
+        self.user_messages = {}
+        self.search_index = None
+        self.messages_loaded = False
+        self.lsn = 0
+        self.last_date = 0.0
+        self.cold = ColdStore(self.file_path + ".segments") if self.hot_messages is not None else None
+
+        if self.snapshot_format == "binary":
+            self._load_binary()
+        else:
+            self._load_json()
+        # Avant le rejeu : un utilisateur créé par le journal peut reprendre l'id d'un expéditeur disparu.
+        self.snapshot_user_ids = set(self.users_by_id)
+        self._drop_orphans()
+
+        # Le journal est rejoué même hors mode journalisé : une session lancée
+        # avec journal=True peut avoir laissé des mutations non compactées.
+        journal = self.journal or Journal(self.file_path + ".log")
+        replayed = False
+        for record in journal.replay(repair=not self.read_only):
+            if record['lsn'] > self.lsn:
+                self._apply(record)
+                self.lsn = record['lsn']
+                replayed = True
+        self._reclaim()
+        if not self.journal and not self.read_only and os.path.exists(journal.path):
+            # Sans journal, chaque écriture réécrit le snapshot : les mutations
+            # rejouées y sont repliées et le journal supprimé, pour qu'une session
+            # journalisée ultérieure ne les rejoue pas par-dessus.
+            if replayed:
+                self._save()
+            os.remove(journal.path)
+
+    def _load_json(self):
+        # Lecture incrémentale : les tableaux sont décodés élément par élément.
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            stream = JsonStream(f)
+            for key in stream.iter_object():
+                if key == 'users':
+                    for user_data in stream.iter_array():
+                        self._add_user(User(id=user_data['id'], name=user_data['name']))
+                elif key == 'channels':
+                    for channel_data in stream.iter_array():
+                        channel = Channel(id=channel_data['id'], name=channel_data['name'])
+                        self._add_channel(channel)
+                        for member_data in channel_data.get('members', []):
+                            user = self.users_by_id.get(member_data['id'])
+                            if user:
+                                self._add_member(channel, user)
+                elif key == 'messages':
+                    if self.lazy_messages:
+                        break
+                    self._load_messages(stream)
+                elif key == 'lsn':
+                    self.lsn = stream.value()
+                elif key == 'seq':
+                    self.sequence.advance(stream.value())
+                elif key == 'cold':
+                    self.cold = ColdStore.from_dict(stream.value(), self.file_path)
+                else:
+                    stream.value()
+            else:
+                self.messages_loaded = True
+
+    def _load_binary(self):
+        snapshot = binary_snapshot.load(self.file_path)
+        self.lsn = snapshot.lsn
+        self.sequence.advance(snapshot.extra.get('seq', 0))
+        if 'cold' in snapshot.extra:
+            self.cold = ColdStore.from_dict(snapshot.extra['cold'], self.file_path)
+        for user_id, name in snapshot.users:
+            self._add_user(User(user_id, name))
+        for channel_id, name, member_ids in snapshot.channels:
+            channel = Channel(channel_id, name)
+            self._add_channel(channel)
+            for member_id in member_ids:
+                user = self.users_by_id.get(member_id)
+                if user:
+                    self._add_member(channel, user)
+
+        # Colonnes reprises telles quelles ; les contenus restent dans le fichier projeté.
+        self.messages.sender_ids = snapshot.sender_ids
+        self.messages.channel_ids = snapshot.channel_ids
+        self.messages.contents = snapshot.contents
+        if snapshot.ids is None:
+            # Snapshot antérieur aux numéros de séquence : numérotés dans l'ordre du fichier, dates inconnues.
+            self.messages.ids = array("q", (self.sequence.next() for _ in range(len(snapshot.contents))))
+            self.messages.dates = array("d", bytes(8 * len(snapshot.contents)))
+        else:
+            self.messages.ids = snapshot.ids
+            self.messages.dates = snapshot.dates
+        if self.messages.ids:
+            self.sequence.advance(self.messages.ids[-1])
+            self.last_date = self.messages.dates[-1]
+        self.messages.deleted = bytearray(len(snapshot.contents))
+        if not self.lazy_messages:
+            self._index_rows()
+
+    def _index_rows(self):
+        """Construit les seaux par canal et par expéditeur des colonnes chargées d'un snapshot binaire."""
+        for row, (sender_id, channel_id) in enumerate(zip(self.messages.sender_ids, self.messages.channel_ids)):
+            self.channel_messages.setdefault(channel_id, array("l")).append(row)
+            self.user_messages.setdefault(sender_id, array("l")).append(row)
+        self.messages_loaded = True
+
+    @property
+    def users(self) -> List[User]:
+        return list(self.users_by_id.values())
+
+    @property
+    def channels(self) -> List[Channel]:
+        return list(self.channels_by_id.values())
+
+    def _load_messages(self, stream : JsonStream):
+        for message_data in stream.iter_array():
+            # Les anciens fichiers n'ont ni numéro de séquence ni date : numérotés dans l'ordre du fichier.
+            message_id = message_data.get('id') or self.sequence.next()
+            self._add_message(message_data['sender_id'], message_data['channel'], message_data['content'], message_id, message_data.get('date') or 0.0)
+        if self.messages.ids:
+            self.sequence.advance(self.messages.ids[-1])
+        self.messages_loaded = True
+
+    def _ensure_messages(self):
+        """Charge les messages du snapshot s'ils ont été différés."""
+        if self.messages_loaded:
+            return
+        # Plusieurs lecteurs peuvent arriver ici en même temps : un seul charge.
+        with self.load_lock:
+            if self.messages_loaded:
+                return
+            if self.snapshot_format == "binary":
+                self._index_rows()
+            else:
+                with open(self.file_path, "r", encoding="utf-8") as f:
+                    stream = JsonStream(f)
+                    for key in stream.iter_object():
+                        if key == 'messages':
+                            self._load_messages(stream)
+                            break
+                        stream.value()
+                self.messages_loaded = True
+            self._drop_orphans()
+
+    def _drop_orphans(self):
+        """Supprime les messages du snapshot dont l'expéditeur n'existe plus.
+
+        Les anciens fichiers en contiennent (bannissements antérieurs à la
+        suppression des messages) ; les id d'utilisateurs libérés étant
+        réattribués, ces messages seraient sinon attribués au nouvel utilisateur.
+        La suppression est signalée : elle devient définitive à la prochaine sauvegarde.
+        """
+        user_ids = self.snapshot_user_ids
+        if self.cold is not None:
+            for sender_id in {sender_id for segments in self.cold.channels.values() for segment in segments for sender_id in segment.senders} - user_ids:
+                self._report_orphans(sender_id, self.cold.delete_sender(sender_id), "de l'historique froid")
+        if not self.messages_loaded:
+            return  # repris par _ensure_messages
+        for sender_id in [sender_id for sender_id in self.user_messages if sender_id not in user_ids]:
+            rows = [row for row in self.user_messages.pop(sender_id) if self.messages.is_live(row)]
+            for row in rows:
+                self._delete_message(row)
+            self._report_orphans(sender_id, len(rows), "")
+        self.snapshot_user_ids = None
+
+    def _report_orphans(self, sender_id : int, count : int, where : str):
+        if count and not self.read_only:
+            print(f"\033[33m{self.file_path} : {count} message(s) {where + ' ' if where else ''}de l'utilisateur inexistant {sender_id} "
+                  f"ignorés ; ils seront supprimés du fichier à la prochaine sauvegarde.\033[0m")
+
+    def preload(self):
+        """Charge en arrière-plan les messages différés (lazy_messages).
+
+        Le menu peut s'afficher aussitôt ; une lecture des messages avant la
+        fin du chargement attend simplement qu'il se termine.
+        """
+        def run():
+            with self.lock.read():
+                self._ensure_messages()
+        threading.Thread(target=run, name="preload", daemon=True).start()
 
     def save(self):
-        with open(self.file_path, "w") as f:
-            json.dump({
-                'users': [user.to_dict() for user in self.users],
-                'channels': [channel.to_dict() for channel in self.channels],
-                'messages': [message.to_dict() for message in self.messages]
-            }, f)
+        with self.lock.read():
+            self._save()
+
+    def save_as(self, path : str, snapshot_format : str = None):
+        """Écrit le snapshot dans un autre fichier, au format déduit de son extension par défaut."""
+        with self.lock.read():
+            self._save(path, snapshot_format or binary_snapshot.format_for(path))
+
+    def _save(self, path : str = None, snapshot_format : str = None):
+        self._ensure_messages()
+        path = path or self.file_path
+        # Écriture dans un fichier temporaire puis renommage : le snapshot
+        # n'est jamais laissé à moitié écrit. Les messages sont sérialisés un
+        # par un pour ne pas dupliquer tout l'historique en mémoire.
+        tmp_path = path + ".tmp"
+        cold = self.cold.to_dict(path) if self.cold is not None and self.cold.channels else None
+        if (snapshot_format or self.snapshot_format) == "binary":
+            extra = {'seq': self.sequence.last}
+            if cold:
+                extra['cold'] = cold
+            binary_snapshot.save(tmp_path, self.lsn, self.users, self.channels, self.messages.rows(), extra)
+            self._release_mapping(path)
+            os.replace(tmp_path, path)
+            self._collect_segments()
+            return
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            if self.journal:
+                f.write(f'{{"lsn": {self.lsn}, ')
+            else:
+                f.write('{')
+            f.write('"users": ' + json.dumps([user.to_dict() for user in self.users]))
+            f.write(', "channels": ' + json.dumps([channel.to_dict() for channel in self.channels]))
+            f.write(f', "seq": {self.sequence.last}')
+            if cold:
+                f.write(', "cold": ' + json.dumps(cold))
+            f.write(', "messages": [')
+            for i, (sender_id, channel_id, content, message_id, date) in enumerate(self.messages.rows()):
+                if i:
+                    f.write(', ')
+                f.write(json.dumps({"id": message_id, "sender_id": sender_id, "channel": channel_id, "content": content, "date": date or None}))
+            f.write(']}')
+        self._release_mapping(path)
+        os.replace(tmp_path, path)
+        self._collect_segments()
+
+    def _release_mapping(self, path : str):
+        # Le snapshot binaire chargé reste projeté en mémoire : ses contenus sont
+        # copiés avant que le fichier soit remplacé.
+        if path == self.file_path and isinstance(self.messages.contents, binary_snapshot.MappedContents):
+            self.messages.contents = self.messages.contents.materialize()
+
+    def _collect_segments(self):
+        # Les segments remplacés ne sont supprimés qu'une fois le snapshot qui les référençait remplacé.
+        if self.cold is not None:
+            self.cold.collect_garbage()
+
+    def seal(self):
+        """Scelle dans l'historique froid les messages anciens des canaux dépassant hot_messages."""
+        with self.lock.write():
+            self._seal()
+
+    def _seal(self):
+        if self.hot_messages is None or self.cold is None:
+            return
+        self._ensure_messages()
+        self.cold.rewrite_deleted()
+        sealed = False
+        for channel_id, bucket in self.channel_messages.items():
+            while len(bucket) >= self.hot_messages + self.segment_size:
+                rows = bucket[:self.segment_size]
+                # Les messages supprimés gardent leur position (null dans le segment).
+                self.cold.seal(channel_id, [[self.messages.sender_ids[row], self.messages.contents[row], self.messages.ids[row], self.messages.dates[row]]
+                                            for row in rows])
+                for row in rows:
+                    self._delete_message(row)
+                bucket = self.channel_messages[channel_id] = bucket[self.segment_size:]
+                sealed = True
+        if sealed:
+            # Les lignes scellées ne sont plus dans aucun seau de canal : la récupération ne décale pas les positions.
+            self._reclaim()
+
+    def compact(self):
+        """Replie le journal dans le snapshot puis le vide."""
+        self.seal()
+        with self.lock.read():
+            self._compact()
+
+    def _compact(self):
+        self._save()
+        if self.journal:
+            self.journal.truncate()
+
+    def _needs_compaction(self) -> bool:
+        return self.journal.records >= self.compact_every or self.journal.size() >= self.compact_bytes
+
+    def close(self):
+        """Persiste les écritures en attente et ferme le journal."""
+        if self.committer:
+            self.committer.close()
+        if self.journal:
+            self.journal.close()
+
+    def _commit(self, record : dict):
+        """Persiste une mutation déjà appliquée en mémoire (appelé sous le verrou d'écriture).
+
+        En mode "batch", renvoie un ticket à passer à _sync() une fois le verrou relâché.
+        """
+        if self.journal:
+            self.lsn += 1
+            record['lsn'] = self.lsn
+
+        if self.committer:
+            return self.committer.submit(record)
+
+        if not self.journal:
+            self._seal()
+            self._save()
+        else:
+            self.journal.append(record)
+            if self._needs_compaction():
+                self._seal()
+                self._compact()
+        return None
+
+    def _sync(self, ticket):
+        """Attend que la mutation correspondant au ticket soit sur disque."""
+        if ticket is not None:
+            self.committer.wait(ticket)
+
+    def _flush_batch(self, records : list):
+        """Persiste un lot de mutations (thread de group commit)."""
+        if not self.journal:
+            self.seal()
+            self.save()
+            return
+
+        self.journal.append_many(records)
+        if self._needs_compaction():
+            self.compact()
+
+    def _add_user(self, user : User):
+        self.users_by_id[user.id] = user
+        self.users_by_name[user.name] = user
+
+    def _add_channel(self, channel : Channel):
+        self.channels_by_id[channel.id] = channel
+        self.channels_by_name[channel.name] = channel
+        self.members[channel.id] = set()
+
+    def _add_member(self, channel : Channel, user : User):
+        channel.members.append(user)
+        self.members[channel.id].add(user.id)
+        self.user_channels.setdefault(user.id, set()).add(channel.id)
+
+    def _add_message(self, sender_id : int, channel_id : int, content : str, message_id : int, date : float) -> int:
+        row = self.messages.append(sender_id, channel_id, content, message_id, date)
+        if date > self.last_date:
+            self.last_date = date
+        self.channel_messages.setdefault(channel_id, array("l")).append(row)
+        self.user_messages.setdefault(sender_id, array("l")).append(row)
+        if self.search_index is not None:
+            self.search_index.add(row, content)
+        return row
+
+    def _ensure_search_index(self):
+        if self.search_index is not None:
+            return
+        self._ensure_messages()
+        with self.load_lock:
+            if self.search_index is None:
+                index = InvertedIndex()
+                for row, content in enumerate(self.messages.contents):
+                    if content is not None:
+                        index.add(row, content)
+                self.search_index = index
+
+    def _delete_message(self, row : int):
+        if self.search_index is not None and self.messages.is_live(row):
+            self.search_index.remove(row, self.messages.contents[row])
+        self.messages.delete(row)
+
+    def reclaim(self):
+        """Supprime physiquement les messages supprimés et renumérote les index.
+
+        Les curseurs de pagination (numéros de séquence) ne sont pas affectés.
+        """
+        with self.lock.write():
+            self._reclaim()
+
+    def _reclaim(self):
+        if not self.messages.tombstones:
+            return
+        mapping = self.messages.compact()
+        for index in (self.channel_messages, self.user_messages):
+            for key, rows in index.items():
+                index[key] = array("l", (mapping[row] for row in rows if mapping[row] >= 0))
+        if self.search_index is not None:
+            self.search_index.remap(mapping)
+
+    def _schedule_reclaim(self):
+        """Lance la récupération en arrière-plan si assez de messages sont supprimés (sous le verrou d'écriture)."""
+        tombstones = self.messages.tombstones
+        if self.reclaiming or tombstones < max(self.RECLAIM_MIN, self.reclaim_ratio * len(self.messages)):
+            return
+        self.reclaiming = True
+
+        def run():
+            try:
+                self.reclaim()
+            finally:
+                self.reclaiming = False
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_user_name(self, user_id : int) -> str:
+        user = self.users_by_id.get(user_id)
+        return user.name if user else "Unknown"
+
+    def _apply(self, record : dict):
+        """Applique une mutation (issue d'une méthode publique ou du journal) à l'état en mémoire."""
+        op = record['op']
+        if op == 'create_user':
+            self._add_user(User(record['id'], record['name']))
+        elif op == 'ban_user':
+            # Coût proportionnel aux canaux et aux messages de l'utilisateur :
+            # il quitte ses canaux et ses messages sont supprimés.
+            self._ensure_messages()
+            user = self.users_by_id.pop(record['id'], None)
+            if user:
+                del self.users_by_name[user.name]
+                for channel_id in self.user_channels.pop(user.id, ()):
+                    self.members[channel_id].discard(user.id)
+                    self.channels_by_id[channel_id].members.remove(user)
+            for row in self.user_messages.pop(record['id'], ()):
+                self._delete_message(row)
+            if self.cold is not None:
+                self.cold.delete_sender(record['id'])
+        elif op == 'create_channel':
+            self._add_channel(Channel(record['id'], record['name']))
+        elif op == 'ban_channel':
+            self._ensure_messages()
+            channel = self.channels_by_id.pop(record['id'], None)
+            if channel:
+                del self.channels_by_name[channel.name]
+                for user_id in self.members.pop(channel.id):
+                    self.user_channels[user_id].discard(channel.id)
+            # Les lignes restent dans user_messages jusqu'à la récupération.
+            for row in self.channel_messages.pop(record['id'], ()):
+                self._delete_message(row)
+            if self.cold is not None:
+                self.cold.drop_channel(record['id'])
+        elif op == 'join_channel':
+            user = self.users_by_id.get(record['user_id'])
+            channel = self.channels_by_id.get(record['channel_id'])
+            if user and channel and user.id not in self.members[channel.id]:
+                self._add_member(channel, user)
+        elif op == 'batch':
+            for sub_record in record['records']:
+                self._apply(sub_record)
+        elif op == 'post_message':
+            self._ensure_messages()
+            # Numéro et date sont fixés à la première application puis
+            # enregistrés avec la mutation : le rejeu redonne les mêmes.
+            if 'id' in record:
+                self.sequence.advance(record['id'])
+            else:
+                record['id'] = self.sequence.next()
+            if record.get('date'):
+                record['date'] = max(record['date'], self.last_date)
+            self._add_message(record['sender_id'], record['channel'], record['content'], record['id'], record.get('date') or 0.0)
+            with self.message_posted:
+                self.last_posted[record['channel']] = record['id']
+                self.message_posted.notify_all()
+        else:
+            raise ValueError(f"Enregistrement de journal inconnu : {op}")
     
     # Méthodes abstraites implémentées (+ ban_user et ban_channel)
     def get_users(self) -> List[User]:
-        return self.users
+        with self.lock.read():
+            return self.users
 
     def create_user(self, name : str) -> User:
-        if any(user.name == name for user in self.users):
-            print(f"\033[31mL'utilisateur {name} existe déjà.\033[0m")
-            return
+        with self.lock.write():
+            if name in self.users_by_name:
+                print(f"\033[31mL'utilisateur {name} existe déjà.\033[0m")
+                return
     
-        used_ids = {user.id for user in self.users}
-        new_id = 1
-        while new_id in used_ids:
-            new_id += 1
+            new_id = 1
+            while new_id in self.users_by_id:
+                new_id += 1
     
-        user = User(new_id, name)
-        self.users.append(user)
+            record = {'op': 'create_user', 'id': new_id, 'name': name}
+            self._apply(record)
+            user = self.users_by_id[new_id]
+            ticket = self._commit(record)
+        self._sync(ticket)
         print(f"\033[32mL'utilisateur {name} a été créé avec succès.\033[0m")
-        self.save()
         return user
     
     def ban_user(self, name : str):
-        user_to_ban = next((user for user in self.users if user.name == name), None)
-        if not user_to_ban:
-            print("\033[31mUtilisateur introuvable.\033[0m")
-            return  
+        with self.lock.write():
+            user_to_ban = self.users_by_name.get(name)
+            if not user_to_ban:
+                print("\033[31mUtilisateur introuvable.\033[0m")
+                return  
 
-        self.users.remove(user_to_ban)
-        self.save()
+            record = {'op': 'ban_user', 'id': user_to_ban.id}
+            self._apply(record)
+            ticket = self._commit(record)
+            self._schedule_reclaim()
+        self._sync(ticket)
         print(f"\033[32mL'utilisateur {name} a été banni avec succès.\033[0m")
 
+    def create_users(self, names : List[str]) -> List[User]:
+        with self.lock.write():
+            errors = [name for name in names if name in self.users_by_name]
+            errors += [name for name in set(names) if names.count(name) > 1]
+            if errors:
+                print(f"\033[31mUtilisateurs déjà existants ou en double : {', '.join(sorted(set(errors)))}. Aucun utilisateur créé.\033[0m")
+                return None
+
+            records = []
+            new_id = 0
+            for name in names:
+                new_id += 1
+                while new_id in self.users_by_id:
+                    new_id += 1
+                record = {'op': 'create_user', 'id': new_id, 'name': name}
+                self._apply(record)
+                records.append(record)
+            users = [self.users_by_id[record['id']] for record in records]
+            # Un seul enregistrement pour tout le lot : rejoué entièrement ou pas du tout.
+            ticket = self._commit({'op': 'batch', 'records': records})
+        self._sync(ticket)
+        print(f"\033[32m{len(users)} utilisateurs créés avec succès.\033[0m")
+        return users
+
     def get_channels(self) -> List[Channel]:
-        return self.channels
+        with self.lock.read():
+            return self.channels
     
     def create_channel(self, name : str) -> Channel:
-        channel = next((channel for channel in self.channels if channel.name == name), None)
-        if channel:
-            print(f"\033[31mLe canal {name} existe déjà.\033[0m")
-            return
+        with self.lock.write():
+            if name in self.channels_by_name:
+                print(f"\033[31mLe canal {name} existe déjà.\033[0m")
+                return
         
-        new_id = max((c.id for c in self.channels), default=0) + 1
-        channel = Channel(new_id, name)
+            new_id = max(self.channels_by_id, default=0) + 1
+            record = {'op': 'create_channel', 'id': new_id, 'name': name}
+            self._apply(record)
+            channel = self.channels_by_id[new_id]
+            ticket = self._commit(record)
+        self._sync(ticket)
         print(f"\033[32mLe canal {name} a été crée avec succès.\033[0m")
-        self.channels.append(channel)
-        self.save()
         return channel
 
     def ban_channel(self, name : str):
-        channel_to_ban = next((channel for channel in self.channels if channel.name == name), None)
-        if not channel_to_ban:
-            print(f"\033[31mCanal introuvable.\033[0m")
-            return
+        with self.lock.write():
+            channel_to_ban = self.channels_by_name.get(name)
+            if not channel_to_ban:
+                print(f"\033[31mCanal introuvable.\033[0m")
+                return
     
-        self.channels.remove(channel_to_ban)
-        self.messages = [message for message in self.messages if message.channel_id != channel_to_ban.id]
-        self.save()
+            record = {'op': 'ban_channel', 'id': channel_to_ban.id}
+            self._apply(record)
+            ticket = self._commit(record)
+            self._schedule_reclaim()
+        self._sync(ticket)
         print(f"\033[32mLe canal {name} a été banni avec succès.\033[0m")
 
     def get_channel_members(self, channel_id : int) -> List[User]:
-        channel = next((channel for channel in self.channels if channel.id == channel_id), None)
-        return channel.members
+        with self.lock.read():
+            return list(self.channels_by_id[channel_id].members)
 
     def join_channel(self, channel_id : int, user_name : str):
-        user = next((user for user in self.users if user.name == user_name), None)
-        channel = next((channel for channel in self.channels if channel.id == channel_id), None)
+        with self.lock.write():
+            user = self.users_by_name.get(user_name)
 
-        if user in channel.members:
-            print(f"\033[34m{user_name} est déjà dans le canal {channel_id}.\033[0m")
-            return
+            if user.id in self.members[channel_id]:
+                print(f"\033[34m{user_name} est déjà dans le canal {channel_id}.\033[0m")
+                return
 
-        channel.members.append(user)
+            record = {'op': 'join_channel', 'channel_id': channel_id, 'user_id': user.id}
+            self._apply(record)
+            ticket = self._commit(record)
+        self._sync(ticket)
         print(f"\033[32m{user_name} (ID: {user.id}) a rejoint le canal {channel_id}.\033[0m")
-        self.save()
+
+    def join_channel_many(self, channel_id : int, user_names : List[str]):
+        with self.lock.write():
+            if channel_id not in self.channels_by_id:
+                print(f"\033[31mCanal {channel_id} introuvable.\033[0m")
+                return
+            unknown = [name for name in user_names if name not in self.users_by_name]
+            if unknown:
+                print(f"\033[31mUtilisateurs introuvables : {', '.join(unknown)}. Aucun ajout au canal {channel_id}.\033[0m")
+                return
+
+            records = []
+            joining = set()
+            for name in user_names:
+                user = self.users_by_name[name]
+                if user.id in self.members[channel_id] or user.id in joining:
+                    continue
+                joining.add(user.id)
+                records.append({'op': 'join_channel', 'channel_id': channel_id, 'user_id': user.id})
+            if not records:
+                return
+            for record in records:
+                self._apply(record)
+            ticket = self._commit({'op': 'batch', 'records': records})
+        self._sync(ticket)
+        print(f"\033[32m{len(records)} utilisateurs ont rejoint le canal {channel_id}.\033[0m")
+
+    def iter_messages(self):
+        """Itère sur tous les messages, historique froid compris, par numéro de séquence croissant.
+
+        À appeler sous le verrou de lecture.
+        """
+        self._ensure_messages()
+        if self.cold is None or not self.cold.channels:
+            yield from self.messages
+            return
+        # Chaque canal froid et les messages en mémoire sont déjà triés : fusion
+        # paresseuse. Les anciens segments sans numéro de séquence viennent en premier.
+        sources = [self._iter_cold(channel_id) for channel_id in list(self.cold.channels)]
+        yield from heapq.merge(*sources, self.messages, key=lambda message: message.id or 0)
+
+    def _iter_cold(self, channel_id : int):
+        for message in self.cold.iter_channel(channel_id):
+            yield self._cold_message(channel_id, message)
+
+    @staticmethod
+    def _cold_message(channel_id : int, message : tuple) -> Message:
+        _, sender_id, content, message_id, date = message
+        return Message(sender_id, channel_id, content, message_id, date or None)
 
     def get_all_messages(self) -> List[Message]:
-        for message in self.messages:
-            user = next((user for user in self.users if user.id == message.sender_id), None)
-            message.sender_name = user.name if user else "Unknown"
-        return self.messages
+        with self.lock.read():
+            return list(self.iter_messages())
 
     def get_messages(self, channel_id : int) -> List[Message]:
-        messages = [message for message in self.messages if message.channel_id == channel_id]
-        for message in messages:
-            user = next((user for user in self.users if user.id == message.sender_id), None)
-            message.sender_name = user.name if user else "Unknown"
-        return messages    
+        with self.lock.read():
+            self._ensure_messages()
+            messages = []
+            if self.cold is not None:
+                messages = [self._cold_message(channel_id, message) for message in self.cold.iter_channel(channel_id)]
+            deleted = self.messages.deleted
+            return messages + [self.messages[row] for row in self.channel_messages.get(channel_id, []) if not deleted[row]]
+
+    def _last_id(self, channel_id : int) -> int:
+        """Numéro de séquence du dernier message du canal, supprimé ou non (0 si le canal est vide)."""
+        bucket = self.channel_messages.get(channel_id)
+        if bucket:
+            return self.messages.ids[bucket[-1]]
+        return self.cold.last_id(channel_id) if self.cold is not None else 0
+
+    def get_messages_page(self, channel_id : int, limit : int = 50, before : int = None, after : int = None) -> MessagePage:
+        # Les curseurs sont des numéros de séquence (Message.id), croissants dans
+        # chaque canal : ils restent valides après un bannissement, la
+        # récupération des lignes supprimées ou le scellement dans l'historique
+        # froid. Les segments froids antérieurs aux numéros de séquence n'y figurent pas.
+        with self.lock.read():
+            self._ensure_messages()
+            if after is not None:
+                messages = self._sorted_range(self.messages.ids, after + 1, float("inf"), channel_id,
+                                              lambda cold_channel_id: self.cold.iter_since(cold_channel_id, after), limit)
+                first = messages[0].id if messages else after + 1
+                # Page incomplète : tout le canal a été parcouru, messages supprimés compris.
+                last = messages[-1].id if len(messages) == limit else max(after, self._last_id(channel_id))
+                return MessagePage(messages, before=first if first > 1 else None, after=last)
+
+            upper = before if before is not None else float("inf")
+            bucket = self.channel_messages.get(channel_id, [])
+            ids = self.messages.ids
+            deleted = self.messages.deleted
+            # Un message de plus que demandé indique s'il reste des messages plus anciens.
+            messages = []
+            i = bisect.bisect_left(bucket, upper, key=ids.__getitem__)
+            while i > 0 and len(messages) <= limit:
+                i -= 1
+                if not deleted[bucket[i]]:
+                    messages.append(self.messages[bucket[i]])
+            if len(messages) <= limit and self.cold is not None:
+                for message in itertools.islice(self.cold.iter_before(channel_id, upper), limit + 1 - len(messages)):
+                    messages.append(self._cold_message(channel_id, message))
+            has_older = len(messages) > limit
+            messages = messages[:limit][::-1]
+            if before is None:
+                last = self._last_id(channel_id)
+            else:
+                last = messages[-1].id if messages else before - 1
+        return MessagePage(messages, before=messages[0].id if has_older else None, after=last)
+
+    def _sorted_range(self, column : array, low, high, channel_id : int, cold_messages, limit : int) -> List[Message]:
+        """Messages dont la valeur de column (colonne triée : ids ou dates) est dans [low, high[, par numéro de séquence.
+
+        Les lignes en mémoire sont trouvées par dichotomie ; cold_messages(canal)
+        itère sur les messages correspondants de l'historique froid. À appeler sous le verrou de lecture.
+        """
+        self._ensure_messages()
+        if channel_id is None:
+            rows = range(bisect.bisect_left(column, low), bisect.bisect_left(column, high))
+            cold_channel_ids = list(self.cold.channels) if self.cold is not None else []
+        else:
+            bucket = self.channel_messages.get(channel_id, [])
+            rows = bucket[bisect.bisect_left(bucket, low, key=column.__getitem__):bisect.bisect_left(bucket, high, key=column.__getitem__)]
+            cold_channel_ids = [channel_id] if self.cold is not None else []
+        deleted = self.messages.deleted
+        hot = (self.messages[row] for row in rows if not deleted[row])
+        cold = [(self._cold_message(cold_channel_id, message) for message in cold_messages(cold_channel_id)) for cold_channel_id in cold_channel_ids]
+        return list(itertools.islice(heapq.merge(*cold, hot, key=lambda message: message.id), limit))
+
+    def get_messages_since(self, seq : int, channel_id : int = None, limit : int = None) -> List[Message]:
+        with self.lock.read():
+            return self._sorted_range(self.messages.ids, seq + 1, float("inf"), channel_id, lambda cold_channel_id: self.cold.iter_since(cold_channel_id, seq), limit)
+
+    def get_messages_between(self, start : float, end : float, channel_id : int = None, limit : int = None) -> List[Message]:
+        with self.lock.read():
+            return self._sorted_range(self.messages.dates, start, end, channel_id, lambda cold_channel_id: self.cold.iter_between(cold_channel_id, start, end), limit)
+
+    def search_messages(self, query : str, channel_id : int = None, sender_name : str = None, limit : int = 20, offset : int = 0) -> List[Message]:
+        return [message for _, _, message in self.ranked_search(query, channel_id, sender_name, offset + limit)[offset:]]
+
+    def term_statistics(self, query : str) -> tuple:
+        """Statistiques des termes de query dans l'index des messages en mémoire (voir InvertedIndex.statistics)."""
+        with self.lock.read():
+            self._ensure_search_index()
+            return self.search_index.statistics(query)
+
+    def ranked_search(self, query : str, channel_id : int = None, sender_name : str = None, count : int = 20, statistics : tuple = None) -> list:
+        """Renvoie les count premiers résultats de search_messages sous forme de triplets (niveau, score, Message).
+
+        Le niveau vaut 0 pour les messages en mémoire, 1 pour l'historique
+        froid, toujours classé après. statistics : voir InvertedIndex.search.
+        """
+        with self.lock.read():
+            self._ensure_search_index()
+            sender = self.users_by_name.get(sender_name) if sender_name is not None else None
+            if sender_name is not None and sender is None:
+                return []
+
+            def accept(row):
+                return ((channel_id is None or self.messages.channel_ids[row] == channel_id)
+                        and (sender is None or self.messages.sender_ids[row] == sender.id))
+            results = [(0, score, self.messages[row]) for score, row in self.search_index.search(query, accept, with_scores=True, statistics=statistics)[:count]]
+            if len(results) == count or self.cold is None or not self.cold.channels:
+                return results
+
+            # L'historique froid n'est pas indexé : il est parcouru seulement si
+            # les messages en mémoire ne suffisent pas, et classé après eux.
+            cold = []
+            index = InvertedIndex()
+            for cold_channel_id in ([channel_id] if channel_id is not None else list(self.cold.channels)):
+                for message in self.cold.iter_channel(cold_channel_id):
+                    if sender is None or message[1] == sender.id:
+                        index.add(len(cold), message[2])
+                        cold.append(self._cold_message(cold_channel_id, message))
+            # Mêmes statistiques que les messages en mémoire si elles sont fournies (partitions).
+            return results + [(1, score, cold[i]) for score, i in index.search(query, with_scores=True, statistics=statistics)[:count - len(results)]]
+
+    def post_messages(self, messages : List[tuple]) -> List[Message]:
+        with self.lock.write():
+            records = []
+            errors = []
+            now = time.time()
+            for channel_id, sender_name, content in messages:
+                user = self.users_by_name.get(sender_name)
+                if channel_id not in self.channels_by_id or user is None:
+                    errors.append(f"canal {channel_id} ou utilisateur {sender_name} introuvable")
+                elif user.id not in self.members[channel_id]:
+                    errors.append(f"{sender_name} n'est pas membre du canal {channel_id}")
+                else:
+                    records.append({'op': 'post_message', 'sender_id': user.id, 'channel': channel_id, 'content': content, 'date': now})
+            if errors:
+                print(f"\033[31mAucun message envoyé : {'; '.join(errors)}.\033[0m")
+                return None
+
+            first_row = len(self.messages)
+            for record in records:
+                self._apply(record)
+            posted = [self.messages[row] for row in range(first_row, len(self.messages))]
+            ticket = self._commit({'op': 'batch', 'records': records})
+        self._sync(ticket)
+        print(f"\033[32m{len(posted)} messages envoyés avec succès.\033[0m")
+        return posted
+
+    def subscribe(self, channel_id : int, since : int = None, poll_interval : float = 1.0):
+        # Attente sur une condition notifiée par _apply : pas d'interrogation périodique.
+        # poll_interval borne seulement chaque attente pour rester interruptible.
+        with self.lock.read():
+            self._ensure_messages()
+            cursor = since if since is not None else self._last_id(channel_id)
+        while True:
+            with self.lock.read():
+                if channel_id not in self.channels_by_id:
+                    return
+            # last_posted plutôt que _last_id : les lignes peuvent être renumérotées
+            # (récupération en arrière-plan) et le verrou ne peut pas être pris ici.
+            with self.message_posted:
+                self.message_posted.wait_for(lambda: self.last_posted.get(channel_id, 0) > cursor, poll_interval)
+            posted = self.last_posted.get(channel_id, 0)
+            page = self.get_messages_page(channel_id, limit=100, after=cursor)
+            yield from page.messages
+            # Page incomplète : les messages postés depuis ont pu être supprimés et récupérés.
+            cursor = page.after if len(page.messages) == 100 else max(page.after, posted)
 
     def post_message(self, channel_id : int, sender_name : str, content : str) -> Message:
-        user = next((user for user in self.users if user.name == sender_name), None)
+        with self.lock.write():
+            user = self.users_by_name.get(sender_name)
 
-        channel = next((channel for channel in self.channels if channel.id == channel_id), None)
-        if user.id not in [m.id for m in channel.members]:
-            print(f"\033[31m{sender_name} doit rejoindre le canal {channel_id} avant d'envoyer des messages.\033[0m")
-            return None
+            channel = self.channels_by_id[channel_id]
+            if user.id not in self.members[channel_id]:
+                print(f"\033[31m{sender_name} doit rejoindre le canal {channel_id} avant d'envoyer des messages.\033[0m")
+                return None
         
-        message = Message(user.id, channel_id, content)
-        self.messages.append(message)
+            record = {'op': 'post_message', 'sender_id': user.id, 'channel': channel_id, 'content': content, 'date': time.time()}
+            self._apply(record)
+            message = self.messages[-1]
+            ticket = self._commit(record)
+        self._sync(ticket)
         print(f"\033[32m{sender_name} a envoyé un message avec succès dans le canal {channel.name}.\033[0m")
-        self.save()
         return message
     
     
 
 class RemoteServer(BaseServer):
-    def __init__(self, url):
+    def __init__(self, url, user_cache_ttl : float = 60.0, pool_size : int = 10, connect_timeout : float = 3.05, read_timeout : float = 10.0, retries : int = 3, backoff : float = 0.2):
         self.url = url
+        # Session HTTP partagée : connexions persistantes (keep-alive) réutilisées
+        # depuis un pool, délais d'attente et nouvelles tentatives avec backoff
+        # exponentiel sur les requêtes idempotentes.
+        self.timeout = (connect_timeout, read_timeout)
+        # Importé ici : le serveur local et le client n'ont pas besoin de requests (~100 ms au démarrage).
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Cache id -> nom des utilisateurs, alimenté par des GET /users groupés
+        self.user_cache = TTLCache(ttl=user_cache_ttl)
+        self.user_ids = TTLCache(ttl=user_cache_ttl)  # nom -> id
+        self.channel_names = TTLCache(ttl=user_cache_ttl)  # id -> nom
+        # Vrai si le serveur ne sert pas GET /channels/{id}/messages (anciens
+        # déploiements) : get_messages filtre alors GET /messages.
+        self.legacy_messages = False
+
+    def _get(self, path : str, timeout : tuple = None, **kwargs):
+        return self.session.get(self.url + path, timeout=timeout or self.timeout, **kwargs)
+
+    def _post(self, path : str, payload : dict):
+        return self.session.post(self.url + path, json=payload, timeout=self.timeout)
+
+    def close(self):
+        """Ferme les connexions du pool."""
+        self.session.close()
+
+    # Cache des utilisateurs
+    def _refresh_users(self) -> list:
+        """Télécharge tous les utilisateurs en une requête et remplit le cache."""
+        users = self._get("/users").json()
+        for user in users:
+            self.user_cache.set(user['id'], user['name'])
+            self.user_ids.set(user['name'], user['id'])
+        return users
+
+    def _user_id(self, name : str):
+        """Id d'un utilisateur à partir de son nom (None s'il n'existe pas)."""
+        user_id = self.user_ids.get(name)
+        if user_id is None:
+            self._refresh_users()
+            user_id = self.user_ids.get(name)
+        return user_id
+
+    def _refresh_channels(self) -> list:
+        channels = self._get("/channels").json()
+        for channel in channels:
+            self.channel_names.set(channel['id'], channel['name'])
+        return channels
+
+    def _channel_name(self, channel_id : int):
+        name = self.channel_names.get(channel_id)
+        if name is None:
+            self._refresh_channels()
+            name = self.channel_names.get(channel_id)
+        return name
+
+    def _resolve_sender_names(self, messages : list):
+        """Renseigne sender_name sur des messages distants avec au plus un GET /users."""
+        names = {}
+        missing = set()
+        for sender_id in {message['sender_id'] for message in messages}:
+            name = self.user_cache.get(sender_id)
+            if name is None:
+                missing.add(sender_id)
+            else:
+                names[sender_id] = name
+
+        if missing:
+            self._refresh_users()
+            for sender_id in missing:
+                name = self.user_cache.get(sender_id)
+                if name is None:
+                    # Utilisateur supprimé : mémorisé pour ne pas relancer le téléchargement
+                    name = "Unknown"
+                    self.user_cache.set(sender_id, name)
+                names[sender_id] = name
+
+        for message in messages:
+            message['sender_name'] = names[message['sender_id']]
+        return messages
+
+    def cache_stats(self) -> dict:
+        """Compteurs de succès/échecs du cache des utilisateurs."""
+        return self.user_cache.stats()
+
+    def get_user_name(self, user_id : int) -> str:
+        name = self.user_cache.get(user_id)
+        if name is None:
+            self._refresh_users()
+            name = self.user_cache.get(user_id, "Unknown")
+        return name
 
     # Méthodes abstraites implémentées
     def get_users(self) -> List[User]:
-        response = requests.get(self.url + "/users")  
-        users = response.json()  
+        users = self._refresh_users()
         return [User(id=user['id'], name=user['name']) for user in users]
     
     def create_user(self, name : str) -> User:
-        users_response = requests.get(self.url + "/users")  
-        users = users_response.json()
+        users = self._refresh_users()
         if any(user["name"] == name for user in users):
             print(f"\033[31mL'utilisateur {name} existe déjà.\033[0m")
             return
 
-        response = requests.post(self.url + "/users/create", json={"name": name})
-        if response.status_code == 200:
-            print(f"\033[32mL'utilisateur {name} a été créé avec succès.\033[0m")
-        else:
-            print(f"\033[31mErreur lors de la création de l'utilisateur {name}.\033[0m")   
+        response = self._post("/users/create", {"name": name})
+        if response.status_code != 200:
+            print(f"\033[31mErreur lors de la création de l'utilisateur {name}.\033[0m")
+            return None
+        user = response.json()
+        self.user_cache.set(user['id'], user['name'])
+        self.user_ids.set(user['name'], user['id'])
+        print(f"\033[32mL'utilisateur {name} a été créé avec succès.\033[0m")
+        return User(id=user['id'], name=user['name'])
 
     def get_channels(self) -> List[Channel]:
-        response = requests.get(self.url + "/channels")
-        channels = response.json()
+        channels = self._refresh_channels()
         return [Channel(id=channel['id'], name=channel['name']) for channel in channels]
     
     def create_channel(self, name : str) -> Channel:
-        channels_response = requests.get(f"{self.url}/channels")
-        channels = channels_response.json()
+        channels = self._refresh_channels()
 
         channel = next((channel for channel in channels if channel["name"] == name), None)
         if channel:
             print(f"\033[31mLe canal {name} existe déjà.\033[0m")
             return
         
-        response = requests.post(self.url + "/channels/create", json={"name":name})
+        response = self._post("/channels/create", {"name":name})
+        if response.status_code != 200:
+            print(f"\033[31mErreur lors de la création du canal {name} : {response.text}\033[0m")
+            return None
+        channel = response.json()
+        self.channel_names.set(channel['id'], channel['name'])
         print(f"\033[32mLe canal {name} a été crée avec succès.\033[0m")
+        return Channel(id=channel['id'], name=channel['name'])
 
     def get_channel_members(self, channel_id : int) -> List[User]:
-        response = requests.get(f"{self.url}/channels/{channel_id}/members")
+        response = self._get(f"/channels/{channel_id}/members")
         return response.json()
 
     def join_channel(self, channel_id : int, user_name : str):
-        users_response = requests.get(self.url + "/users")
-        users = users_response.json()
-        user = next((user for user in users if user["name"] == user_name), None)
-    
-        user_id = user["id"]
+        user_id = self._user_id(user_name)
 
         members = self.get_channel_members(channel_id)
         if any(member.get("id") == user_id for member in members):
             print(f"\033[34m{user_name} est déjà dans le canal {channel_id}.\033[0m")
             return
 
-        response = requests.post(f"{self.url}/channels/{channel_id}/join", json={"user_id": user_id, "name": user_name})
+        response = self._post(f"/channels/{channel_id}/join", {"user_id": user_id, "name": user_name})
         if response.status_code == 200:
-            print(f"\033[32m{user_name} (ID: {user.id}) a rejoint le canal {channel_id}.")
+            print(f"\033[32m{user_name} (ID: {user_id}) a rejoint le canal {channel_id}.")
         else:
             print(f"\033[31mErreur lors de la jonction au canal : {response.text}\033[0m")
 
     def get_all_messages(self) -> List[Message]:
-        response = requests.get(f"{self.url}/messages", headers={"accept": "application/json"})
-        messages = response.json()
-        for message in messages:
-            user_response = requests.get(f"{self.url}/users/{message['sender_id']}")
-            user = user_response.json()
-            message['sender_name'] = user['name'] if user else "Unknown"
-        return messages
+        response = self._get("/messages", headers={"accept": "application/json"})
+        return self._resolve_sender_names(response.json())
 
     def get_messages(self, channel_id : int) -> List[Message]:
-        response = requests.get(f"{self.url}/messages")
-        messages = response.json()
-        for message in messages:
-            if message['channel_id'] == channel_id:
-                user_response = requests.get(f"{self.url}/users/{message['sender_id']}")
-                user = user_response.json()
-                message['sender_name'] = user['name'] if user else "Unknown"
-        return [message for message in messages if message['channel_id'] == channel_id]
+        # Sans limit, la route renvoie tous les messages du canal (et seulement eux).
+        if not self.legacy_messages:
+            response = self._get(f"/channels/{channel_id}/messages")
+            if response.status_code != 404:
+                return self._resolve_sender_names(response.json()['messages'])
+            # Serveur distant antérieur à cette route : mémorisé pour les appels suivants.
+            self.legacy_messages = True
+        messages = self._get("/messages", headers={"accept": "application/json"}).json()
+        return self._resolve_sender_names([message for message in messages if message['channel_id'] == channel_id])
 
-    def post_message(self, channel_id : int, sender_name : str, content : str) -> Message:
-        users_response = requests.get(self.url + "/users")
-        users = users_response.json()
-        user = next((user for user in users if user['name'] == sender_name), None)
+    def get_messages_page(self, channel_id : int, limit : int = 50, before : int = None, after : int = None, wait : float = 0) -> MessagePage:
+        """wait > 0 : si la page after est vide, le serveur garde la requête
+        ouverte jusqu'à wait secondes en attendant un nouveau message (long polling)."""
+        params = {"limit": limit}
+        if before is not None:
+            params["before"] = before
+        if after is not None:
+            params["after"] = after
+        timeout = self.timeout
+        if wait:
+            params["wait"] = wait
+            timeout = (self.timeout[0], self.timeout[1] + wait)
+        response = self._get(f"/channels/{channel_id}/messages", timeout=timeout, params=params)
+        page = response.json()
+        self._resolve_sender_names(page['messages'])
+        return MessagePage(page['messages'], before=page.get('before'), after=page.get('after'))
 
-        members = requests.get(f"{self.url}/channels/{channel_id}/members").json()
-        if not any(m['id'] == user['id'] for m in members):
-            print(f"\033[31m{sender_name} doit rejoindre le canal {channel_id} avant d'envoyer des messages.\033[0m")
+    def create_users(self, names : List[str]) -> List[User]:
+        response = self._post("/users/create_many", {"names": names})
+        if response.status_code != 200:
+            print(f"\033[31mErreur lors de la création des utilisateurs : {response.text}\033[0m")
             return None
-        
-        channels_response = requests.get(f"{self.url}/channels")
-        channels = channels_response.json()
-        channel = next((c for c in channels if c['id'] == channel_id), None)
-        channel_name = channel['name']
-        response = requests.post(f"{self.url}/channels/{channel_id}/messages/post", json={"sender_id": user['id'],"content": content})
+        users = response.json()
+        for user in users:
+            self.user_cache.set(user['id'], user['name'])
+            self.user_ids.set(user['name'], user['id'])
+        print(f"\033[32m{len(users)} utilisateurs créés avec succès.\033[0m")
+        return [User(id=user['id'], name=user['name']) for user in users]
+
+    def join_channel_many(self, channel_id : int, user_names : List[str]):
+        response = self._post(f"/channels/{channel_id}/join_many", {"names": user_names})
         if response.status_code == 200:
-            print(f"\033[32m{sender_name} a envoyé un message avec succès dans le canal {channel_name}.\033[0m")
+            print(f"\033[32mLes utilisateurs ont rejoint le canal {channel_id}.\033[0m")
         else:
-            print(f"\033[31mErreur lors de l'envoi du message.\033[0m")
+            print(f"\033[31mErreur lors de la jonction au canal : {response.text}\033[0m")
+
+    def post_messages(self, messages : List[tuple]) -> List[Message]:
+        payload = [{"channel_id": channel_id, "sender_name": sender_name, "content": content} for channel_id, sender_name, content in messages]
+        response = self._post("/messages/post_many", {"messages": payload})
+        if response.status_code != 200:
+            print(f"\033[31mErreur lors de l'envoi des messages : {response.text}\033[0m")
+            return None
+        print(f"\033[32m{len(messages)} messages envoyés avec succès.\033[0m")
+        return response.json()
+
+    def get_messages_since(self, seq : int, channel_id : int = None, limit : int = None) -> List[Message]:
+        params = {"seq": seq}
+        if channel_id is not None:
+            params["channel_id"] = channel_id
+        if limit is not None:
+            params["limit"] = limit
+        response = self._get("/messages/since", params=params)
+        return self._resolve_sender_names(response.json())
 
+    def get_messages_between(self, start : float, end : float, channel_id : int = None, limit : int = None) -> List[Message]:
+        params = {"start": start, "end": end}
+        if channel_id is not None:
+            params["channel_id"] = channel_id
+        if limit is not None:
+            params["limit"] = limit
+        response = self._get("/messages/range", params=params)
+        return self._resolve_sender_names(response.json())
 
-  
\ No newline at end of file
+    def subscribe(self, channel_id : int, since : int = None, poll_interval : float = 25.0):
+        # Long polling : chaque requête reste ouverte jusqu'à poll_interval secondes.
+        cursor = since if since is not None else self.get_messages_page(channel_id, limit=1).after
+        while True:
+            page = self.get_messages_page(channel_id, limit=100, after=cursor, wait=poll_interval)
+            yield from page.messages
+            cursor = page.after
+
+    def search_messages(self, query : str, channel_id : int = None, sender_name : str = None, limit : int = 20, offset : int = 0) -> List[Message]:
+        params = {"q": query, "limit": limit, "offset": offset}
+        if channel_id is not None:
+            params["channel_id"] = channel_id
+        if sender_name is not None:
+            params["sender"] = sender_name
+        response = self._get("/messages/search", params=params)
+        return self._resolve_sender_names(response.json())
+
+    def post_message(self, channel_id : int, sender_name : str, content : str) -> Message:
+        # Utilisateur et nom du canal viennent du cache : seuls la vérification
+        # d'appartenance et l'envoi font un aller-retour réseau.
+        user_id = self._user_id(sender_name)
+
+        members = self.get_channel_members(channel_id)
+        if not any(m['id'] == user_id for m in members):
+            print(f"\033[31m{sender_name} doit rejoindre le canal {channel_id} avant d'envoyer des messages.\033[0m")
+            return None
+        
+        channel_name = self._channel_name(channel_id)
+        response = self._post(f"/channels/{channel_id}/messages/post", {"sender_id": user_id, "content": content})
+        if response.status_code != 200:
+            print(f"\033[31mErreur lors de l'envoi du message.\033[0m")
+            return None
+        print(f"\033[32m{sender_name} a envoyé un message avec succès dans le canal {channel_name}.\033[0m")
+        return self._resolve_sender_names([response.json()])[0]
@@ -0,0 +1,328 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List
+import binary_snapshot
+from concurrency import Sequence
+from model import User, Channel, Message, MessagePage
+from server import BaseServer, Server
+
+class ShardedServer(BaseServer):
+    """Serveur local partitionné par canal sur plusieurs fichiers.
+
+    Le canal d'id c est rangé dans la partition c % shards, avec ses membres et
+    ses messages ; chaque partition est un Server (journal, snapshot binaire,
+    historique froid... selon les options). Les partitions partagent le
+    compteur des numéros de séquence des messages. La table des utilisateurs est
+    répliquée dans toutes les partitions, la première faisant foi ; elle est
+    réconciliée au démarrage si une écriture a été interrompue.
+
+    Les lectures qui parcourent tous les canaux s'exécutent dans le processus
+    courant. Avec parallel=True, la recherche plein texte est répartie sur un
+    processus par partition, qui relit la partition depuis le disque (snapshot
+    + journal) quand elle a changé et ne renvoie que ses meilleurs résultats ;
+    get_all_messages reste local, renvoyer tous les messages par pickle
+    coûtant plus cher que de les lire.
+    """
+    MANIFEST = "shards.json"
+
+    def __init__(self, directory : str, shards : int = 4, parallel : bool = False, **server_options):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Le nombre de partitions est fixé à la création : le changer déplacerait les canaux.
+        manifest_path = os.path.join(directory, self.MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                shards = json.load(f)["shards"]
+        else:
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump({"shards": shards}, f)
+
+        self.server_options = server_options
+        extension = binary_snapshot.EXTENSION if server_options.get("snapshot_format") == "binary" else ".json"
+        self.paths = [os.path.join(directory, f"shard-{i}{extension}") for i in range(shards)]
+        for path in self.paths:
+            if not os.path.exists(path):
+                binary_snapshot.save(path, 0, [], [], ()) if extension == binary_snapshot.EXTENSION else self._write_empty(path)
+        self.sequence = Sequence()
+        self.shards = [Server(path, sequence=self.sequence, **server_options) for path in self.paths]
+        # Sérialise les opérations qui touchent plusieurs partitions.
+        self.lock = threading.Lock()
+        self.parallel = parallel
+        self.executors = None
+        self._reconcile_users()
+
+    @staticmethod
+    def _write_empty(path : str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"users": [], "channels": [], "messages": []}, f)
+
+    def _shard(self, channel_id : int) -> Server:
+        return self.shards[channel_id % len(self.shards)]
+
+    def close(self):
+        if self.executors:
+            for executor in self.executors:
+                executor.shutdown()
+            self.executors = None
+        for shard in self.shards:
+            shard.close()
+
+    def save(self):
+        for shard in self.shards:
+            shard.save()
+
+    def compact(self):
+        for shard in self.shards:
+            shard.compact()
+
+    # Réplication de la table des utilisateurs
+    def _write_all(self, records : list, shards : list = None):
+        """Applique et persiste des mutations sur les partitions données (toutes par défaut), la première d'abord."""
+        tickets = []
+        for shard in shards or self.shards:
+            with shard.lock.write():
+                for record in records:
+                    record = dict(record)  # chaque partition numérote ses enregistrements (lsn)
+                    shard._apply(record)
+                    tickets.append((shard, shard._commit(record)))
+                shard._schedule_reclaim()
+        for shard, ticket in tickets:
+            shard._sync(ticket)
+
+    def _reconcile_users(self):
+        users = self.shards[0].users_by_id
+        for shard in self.shards[1:]:
+            records = [{'op': 'ban_user', 'id': user.id} for user in shard.users
+                       if user.id not in users or users[user.id].name != user.name]
+            records += [{'op': 'create_user', 'id': user.id, 'name': user.name} for user in users.values()
+                        if user.id not in shard.users_by_id or shard.users_by_id[user.id].name != user.name]
+            if records:
+                self._write_all(records, [shard])
+
+    # Utilisateurs
+    def get_users(self) -> List[User]:
+        return self.shards[0].get_users()
+
+    def get_user_name(self, user_id : int) -> str:
+        return self.shards[0].get_user_name(user_id)
+
+    def _new_user_ids(self, count : int) -> list:
+        ids = []
+        new_id = 0
+        while len(ids) < count:
+            new_id += 1
+            if new_id not in self.shards[0].users_by_id:
+                ids.append(new_id)
+        return ids
+
+    def create_user(self, name : str) -> User:
+        with self.lock:
+            if name in self.shards[0].users_by_name:
+                print(f"\033[31mL'utilisateur {name} existe déjà.\033[0m")
+                return
+            new_id = self._new_user_ids(1)[0]
+            self._write_all([{'op': 'create_user', 'id': new_id, 'name': name}])
+        print(f"\033[32mL'utilisateur {name} a été créé avec succès.\033[0m")
+        return self.shards[0].users_by_id[new_id]
+
+    def create_users(self, names : List[str]) -> List[User]:
+        with self.lock:
+            errors = [name for name in names if name in self.shards[0].users_by_name]
+            errors += [name for name in set(names) if names.count(name) > 1]
+            if errors:
+                print(f"\033[31mUtilisateurs déjà existants ou en double : {', '.join(sorted(set(errors)))}. Aucun utilisateur créé.\033[0m")
+                return None
+            new_ids = self._new_user_ids(len(names))
+            records = [{'op': 'create_user', 'id': new_id, 'name': name} for new_id, name in zip(new_ids, names)]
+            self._write_all([{'op': 'batch', 'records': records}])
+        print(f"\033[32m{len(names)} utilisateurs créés avec succès.\033[0m")
+        return [self.shards[0].users_by_id[new_id] for new_id in new_ids]
+
+    def ban_user(self, name : str):
+        with self.lock:
+            user = self.shards[0].users_by_name.get(name)
+            if not user:
+                print("\033[31mUtilisateur introuvable.\033[0m")
+                return
+            # Chaque partition retire l'utilisateur de ses canaux et supprime ses messages.
+            self._write_all([{'op': 'ban_user', 'id': user.id}])
+        print(f"\033[32mL'utilisateur {name} a été banni avec succès.\033[0m")
+
+    # Canaux
+    def get_channels(self) -> List[Channel]:
+        return sorted((channel for shard in self.shards for channel in shard.get_channels()), key=lambda channel: channel.id)
+
+    def create_channel(self, name : str) -> Channel:
+        with self.lock:
+            if any(name in shard.channels_by_name for shard in self.shards):
+                print(f"\033[31mLe canal {name} existe déjà.\033[0m")
+                return
+            new_id = max((max(shard.channels_by_id, default=0) for shard in self.shards), default=0) + 1
+            shard = self._shard(new_id)
+            self._write_all([{'op': 'create_channel', 'id': new_id, 'name': name}], [shard])
+        print(f"\033[32mLe canal {name} a été crée avec succès.\033[0m")
+        return shard.channels_by_id[new_id]
+
+    def ban_channel(self, name : str):
+        with self.lock:
+            shard = next((shard for shard in self.shards if name in shard.channels_by_name), None)
+            if shard is None:
+                print(f"\033[31mCanal introuvable.\033[0m")
+                return
+        shard.ban_channel(name)
+
+    def get_channel_members(self, channel_id : int) -> List[User]:
+        return self._shard(channel_id).get_channel_members(channel_id)
+
+    def join_channel(self, channel_id : int, user_name : str):
+        return self._shard(channel_id).join_channel(channel_id, user_name)
+
+    def join_channel_many(self, channel_id : int, user_names : List[str]):
+        return self._shard(channel_id).join_channel_many(channel_id, user_names)
+
+    # Messages
+    def get_messages(self, channel_id : int) -> List[Message]:
+        return self._shard(channel_id).get_messages(channel_id)
+
+    def get_messages_page(self, channel_id : int, limit : int = 50, before : int = None, after : int = None) -> MessagePage:
+        return self._shard(channel_id).get_messages_page(channel_id, limit, before, after)
+
+    def get_messages_since(self, seq : int, channel_id : int = None, limit : int = None) -> List[Message]:
+        if channel_id is not None:
+            return self._shard(channel_id).get_messages_since(seq, channel_id, limit)
+        # Recherches par dichotomie dans chaque partition, fusionnées par numéro de séquence.
+        results = [shard.get_messages_since(seq, None, limit) for shard in self.shards]
+        return list(heapq.merge(*results, key=lambda message: message.id))[:limit]
+
+    def get_messages_between(self, start : float, end : float, channel_id : int = None, limit : int = None) -> List[Message]:
+        if channel_id is not None:
+            return self._shard(channel_id).get_messages_between(start, end, channel_id, limit)
+        results = [shard.get_messages_between(start, end, None, limit) for shard in self.shards]
+        return list(heapq.merge(*results, key=lambda message: message.id))[:limit]
+
+    def subscribe(self, channel_id : int, since : int = None, poll_interval : float = 1.0):
+        return self._shard(channel_id).subscribe(channel_id, since, poll_interval)
+
+    def post_message(self, channel_id : int, sender_name : str, content : str) -> Message:
+        return self._shard(channel_id).post_message(channel_id, sender_name, content)
+
+    def post_messages(self, messages : List[tuple]) -> List[Message]:
+        # Validation de tout le lot avant d'écrire dans la moindre partition.
+        with self.lock:
+            errors = []
+            for channel_id, sender_name, _ in messages:
+                shard = self._shard(channel_id)
+                user = shard.users_by_name.get(sender_name)
+                if channel_id not in shard.channels_by_id or user is None:
+                    errors.append(f"canal {channel_id} ou utilisateur {sender_name} introuvable")
+                elif user.id not in shard.members[channel_id]:
+                    errors.append(f"{sender_name} n'est pas membre du canal {channel_id}")
+            if errors:
+                print(f"\033[31mAucun message envoyé : {'; '.join(errors)}.\033[0m")
+                return None
+
+            by_shard = {}
+            for i, message in enumerate(messages):
+                by_shard.setdefault(message[0] % len(self.shards), []).append(i)
+            posted = [None] * len(messages)
+            for shard_index, indexes in by_shard.items():
+                shard_posted = self.shards[shard_index].post_messages([messages[i] for i in indexes])
+                for i, message in zip(indexes, shard_posted or ()):
+                    posted[i] = message
+        return posted
+
+    # Lectures réparties sur les partitions
+    def _fan_out(self, function, *args) -> list:
+        """Exécute function(chemin, options, *args) pour chaque partition ; renvoie les résultats dans l'ordre des partitions."""
+        if not self.parallel:
+            return [function(shard, None, *args) for shard in self.shards]
+        if self.executors is None:
+            context = get_context("spawn")
+            self.executors = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in self.shards]
+        # Les écritures en attente de group commit doivent être sur disque avant la lecture.
+        for shard in self.shards:
+            if shard.committer:
+                shard.committer.wait(shard.committer.submitted)
+        futures = [executor.submit(function, path, self.server_options, *args) for executor, path in zip(self.executors, self.paths)]
+        return [future.result() for future in futures]
+
+    def get_all_messages(self) -> List[Message]:
+        # Ordre stable : par id de canal, puis par position dans le canal.
+        channels = [channel for shard in self.shards for channel in _shard_messages(shard, None)]
+        channels.sort(key=lambda channel: channel[0])
+        return [message for _, messages in channels for message in messages]
+
+    def search_messages(self, query : str, channel_id : int = None, sender_name : str = None, limit : int = 20, offset : int = 0) -> List[Message]:
+        if channel_id is not None:
+            return self._shard(channel_id).search_messages(query, channel_id, sender_name, limit, offset)
+        # Deux passes : les fréquences des termes sont sommées sur toutes les
+        # partitions pour que chacune calcule ses scores avec le même IDF, puis
+        # chaque partition renvoie ses offset + limit meilleurs résultats,
+        # fusionnés par niveau (historique froid après), score décroissant puis
+        # du plus récent au plus ancien (numéros de séquence partagés).
+        document_count = 0
+        frequencies = {}
+        for shard_count, shard_frequencies in self._fan_out(_shard_statistics, query):
+            document_count += shard_count
+            for term, frequency in shard_frequencies.items():
+                frequencies[term] = frequencies.get(term, 0) + frequency
+        results = self._fan_out(_shard_search, query, sender_name, offset + limit, (document_count, frequencies))
+        merged = heapq.merge(*results, key=lambda result: (result[0], -result[1], -result[2].id))
+        return [message for _, _, message in itertools.islice(merged, offset, offset + limit)]
+
+# Fonctions exécutées dans les processus de partition. Chaque processus garde
+# sa partition en mémoire tant que ses fichiers ne changent pas.
+_loaded_shards = {}  # chemin -> (signature des fichiers, Server)
+LOAD_ATTEMPTS = 5  # lectures tentées avant d'abandonner une partition qui change ou reste illisible
+
+def _signature(path : str):
+    signature = []
+    for file in (path, path + ".log"):
+        try:
+            stat = os.stat(file)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def _load_shard(path : str, options : dict) -> Server:
+    cached = _loaded_shards.get(path)
+    options = {key: value for key, value in options.items() if key in ("snapshot_format", "hot_messages", "segment_size")}
+    for attempt in range(LOAD_ATTEMPTS):
+        signature = _signature(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        try:
+            # Lecture seule : le journal est rejoué sans être réparé ni modifié.
+            server = Server(path, read_only=True, **options)
+        except (FileNotFoundError, ValueError):
+            if attempt == LOAD_ATTEMPTS - 1:
+                raise  # fichier absent ou corrompu, pas seulement remplacé pendant la lecture
+            continue  # fichier remplacé pendant la lecture (compaction)
+        # Une compaction pendant la lecture rendrait l'état incohérent : on relit.
+        if _signature(path) == signature:
+            cached = _loaded_shards[path] = (signature, server)
+            return server
+    # Partition modifiée à chaque lecture : la dernière lecture, un préfixe
+    # valide du journal, est utilisée sans être gardée en mémoire.
+    return server
+
+def _server(shard, options) -> Server:
+    return shard if options is None else _load_shard(shard, options)
+
+def _shard_messages(shard, options) -> list:
+    server = _server(shard, options)
+    with server.lock.read():
+        channel_ids = sorted(server.channels_by_id)
+    return [(channel_id, server.get_messages(channel_id)) for channel_id in channel_ids]
+
+def _shard_statistics(shard, options, query : str) -> tuple:
+    return _server(shard, options).term_statistics(query)
+
+def _shard_search(shard, options, query : str, sender_name : str, count : int, statistics : tuple) -> list:
+    return _server(shard, options).ranked_search(query, None, sender_name, count, statistics)
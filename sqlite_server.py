@@ -0,0 +1,257 @@
+import sqlite3
+import threading
+import time
+from typing import List
+from json_stream import JsonStream
+from model import User, Channel, Message, MessagePage
+from server import BaseServer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS channels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS memberships (
+    channel_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (channel_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS memberships_user ON memberships (user_id);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id INTEGER NOT NULL,
+    sender_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    reception_date REAL
+);
+CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel_id, id);
+CREATE INDEX IF NOT EXISTS messages_sender ON messages (sender_id);
+"""
+
+# Index créé après la migration des bases antérieures aux dates de réception.
+DATE_INDEX = "CREATE INDEX IF NOT EXISTS messages_date ON messages (reception_date)"
+
+MAX_ID = 2 ** 63 - 1
+
+# Plus petit id libre à partir de 1, comme Server.create_user.
+FREE_USER_ID = """
+SELECT CASE WHEN NOT EXISTS (SELECT 1 FROM users WHERE id = 1) THEN 1
+ELSE (SELECT MIN(u.id) + 1 FROM users u WHERE NOT EXISTS (SELECT 1 FROM users v WHERE v.id = u.id + 1)) END
+"""
+
+class SqliteServer(BaseServer):
+    """Serveur local stocké dans une base SQLite (mode WAL).
+
+    Même comportement que Server ; les tables sont indexées et les requêtes
+    paramétrées sont préparées une fois puis réutilisées par le cache de
+    requêtes de sqlite3. Les curseurs de pagination sont les id des messages,
+    qui servent aussi de numéros de séquence.
+    """
+    def __init__(self, db_path : str):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        if "reception_date" not in [column[1] for column in self.connection.execute("PRAGMA table_info(messages)")]:
+            self.connection.execute("ALTER TABLE messages ADD COLUMN reception_date REAL")
+        self.connection.execute(DATE_INDEX)
+        # Une connexion partagée : les accès sont sérialisés.
+        self.lock = threading.Lock()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def _query(self, sql : str, params=()) -> list:
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def import_json(self, json_path : str):
+        """Importe en une transaction un fichier au format de messenger2.json."""
+        with self.lock, self.connection, open(json_path, "r", encoding="utf-8") as f:
+            stream = JsonStream(f)
+            for key in stream.iter_object():
+                if key == 'users':
+                    self.connection.executemany("INSERT OR REPLACE INTO users (id, name) VALUES (?, ?)",
+                        ((user['id'], user['name']) for user in stream.iter_array()))
+                elif key == 'channels':
+                    for channel in stream.iter_array():
+                        self.connection.execute("INSERT OR REPLACE INTO channels (id, name) VALUES (?, ?)", (channel['id'], channel['name']))
+                        self.connection.executemany("INSERT OR IGNORE INTO memberships (channel_id, user_id) VALUES (?, ?)",
+                            ((channel['id'], member['id']) for member in channel.get('members', [])))
+                elif key == 'messages':
+                    self.connection.executemany("INSERT INTO messages (id, channel_id, sender_id, content, reception_date) VALUES (?, ?, ?, ?, ?)",
+                        ((message.get('id'), message['channel'], message['sender_id'], message['content'], message.get('date')) for message in stream.iter_array()))
+                else:
+                    stream.value()
+
+    def get_user_name(self, user_id : int) -> str:
+        rows = self._query("SELECT name FROM users WHERE id = ?", (user_id,))
+        return rows[0][0] if rows else "Unknown"
+
+    # Méthodes abstraites implémentées (+ ban_user et ban_channel)
+    def get_users(self) -> List[User]:
+        return [User(id, name) for id, name in self._query("SELECT id, name FROM users ORDER BY rowid")]
+
+    def create_user(self, name : str) -> User:
+        with self.lock, self.connection:
+            if self.connection.execute("SELECT 1 FROM users WHERE name = ?", (name,)).fetchone():
+                print(f"\033[31mL'utilisateur {name} existe déjà.\033[0m")
+                return
+            new_id = self.connection.execute(FREE_USER_ID).fetchone()[0]
+            self.connection.execute("INSERT INTO users (id, name) VALUES (?, ?)", (new_id, name))
+        print(f"\033[32mL'utilisateur {name} a été créé avec succès.\033[0m")
+        return User(new_id, name)
+
+    def ban_user(self, name : str):
+        # Les adhésions et les messages de l'utilisateur sont supprimés avec lui.
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT id FROM users WHERE name = ?", (name,)).fetchone()
+            if not row:
+                print("\033[31mUtilisateur introuvable.\033[0m")
+                return
+            self.connection.execute("DELETE FROM memberships WHERE user_id = ?", row)
+            self.connection.execute("DELETE FROM messages WHERE sender_id = ?", row)
+            self.connection.execute("DELETE FROM users WHERE id = ?", row)
+        print(f"\033[32mL'utilisateur {name} a été banni avec succès.\033[0m")
+
+    def create_users(self, names : List[str]) -> List[User]:
+        with self.lock, self.connection:
+            existing = [name for name in names if self.connection.execute("SELECT 1 FROM users WHERE name = ?", (name,)).fetchone()]
+            if existing or len(set(names)) != len(names):
+                print(f"\033[31mUtilisateurs déjà existants ou en double : {', '.join(existing) or 'doublons'}. Aucun utilisateur créé.\033[0m")
+                return None
+            users = []
+            for name in names:
+                new_id = self.connection.execute(FREE_USER_ID).fetchone()[0]
+                self.connection.execute("INSERT INTO users (id, name) VALUES (?, ?)", (new_id, name))
+                users.append(User(new_id, name))
+        print(f"\033[32m{len(users)} utilisateurs créés avec succès.\033[0m")
+        return users
+
+    def get_channels(self) -> List[Channel]:
+        channels = {id: Channel(id, name) for id, name in self._query("SELECT id, name FROM channels ORDER BY rowid")}
+        for channel_id, user_id, name in self._query(
+                "SELECT m.channel_id, u.id, u.name FROM memberships m JOIN users u ON u.id = m.user_id ORDER BY m.rowid"):
+            channels[channel_id].members.append(User(user_id, name))
+        return list(channels.values())
+
+    def create_channel(self, name : str) -> Channel:
+        with self.lock, self.connection:
+            if self.connection.execute("SELECT 1 FROM channels WHERE name = ?", (name,)).fetchone():
+                print(f"\033[31mLe canal {name} existe déjà.\033[0m")
+                return
+            new_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM channels").fetchone()[0]
+            self.connection.execute("INSERT INTO channels (id, name) VALUES (?, ?)", (new_id, name))
+        print(f"\033[32mLe canal {name} a été crée avec succès.\033[0m")
+        return Channel(new_id, name)
+
+    def ban_channel(self, name : str):
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT id FROM channels WHERE name = ?", (name,)).fetchone()
+            if not row:
+                print(f"\033[31mCanal introuvable.\033[0m")
+                return
+            self.connection.execute("DELETE FROM memberships WHERE channel_id = ?", row)
+            self.connection.execute("DELETE FROM messages WHERE channel_id = ?", row)
+            self.connection.execute("DELETE FROM channels WHERE id = ?", row)
+        print(f"\033[32mLe canal {name} a été banni avec succès.\033[0m")
+
+    def get_channel_members(self, channel_id : int) -> List[User]:
+        rows = self._query("SELECT u.id, u.name FROM memberships m JOIN users u ON u.id = m.user_id WHERE m.channel_id = ? ORDER BY m.rowid", (channel_id,))
+        return [User(id, name) for id, name in rows]
+
+    def join_channel(self, channel_id : int, user_name : str):
+        with self.lock, self.connection:
+            user_id = self.connection.execute("SELECT id FROM users WHERE name = ?", (user_name,)).fetchone()[0]
+            inserted = self.connection.execute("INSERT OR IGNORE INTO memberships (channel_id, user_id) VALUES (?, ?)", (channel_id, user_id)).rowcount
+        if not inserted:
+            print(f"\033[34m{user_name} est déjà dans le canal {channel_id}.\033[0m")
+            return
+        print(f"\033[32m{user_name} (ID: {user_id}) a rejoint le canal {channel_id}.\033[0m")
+
+    def join_channel_many(self, channel_id : int, user_names : List[str]):
+        with self.lock, self.connection:
+            user_ids = [self.connection.execute("SELECT id FROM users WHERE name = ?", (name,)).fetchone() for name in user_names]
+            if None in user_ids or not self.connection.execute("SELECT 1 FROM channels WHERE id = ?", (channel_id,)).fetchone():
+                print(f"\033[31mCanal ou utilisateur introuvable. Aucun ajout au canal {channel_id}.\033[0m")
+                return
+            self.connection.executemany("INSERT OR IGNORE INTO memberships (channel_id, user_id) VALUES (?, ?)",
+                                        ((channel_id, row[0]) for row in user_ids))
+        print(f"\033[32mLes utilisateurs ont rejoint le canal {channel_id}.\033[0m")
+
+    def get_all_messages(self) -> List[Message]:
+        rows = self._query("SELECT sender_id, channel_id, content, id, reception_date FROM messages ORDER BY id")
+        return [Message(*row) for row in rows]
+
+    def get_messages(self, channel_id : int) -> List[Message]:
+        rows = self._query("SELECT sender_id, channel_id, content, id, reception_date FROM messages WHERE channel_id = ? ORDER BY id", (channel_id,))
+        return [Message(*row) for row in rows]
+
+    def get_messages_since(self, seq : int, channel_id : int = None, limit : int = None) -> List[Message]:
+        channel_filter = "" if channel_id is None else " AND channel_id = ?"
+        params = (seq,) + (() if channel_id is None else (channel_id,)) + (-1 if limit is None else limit,)
+        rows = self._query(f"SELECT sender_id, channel_id, content, id, reception_date FROM messages WHERE id > ?{channel_filter} ORDER BY id LIMIT ?", params)
+        return [Message(*row) for row in rows]
+
+    def get_messages_between(self, start : float, end : float, channel_id : int = None, limit : int = None) -> List[Message]:
+        channel_filter = "" if channel_id is None else " AND channel_id = ?"
+        params = (start, end) + (() if channel_id is None else (channel_id,)) + (-1 if limit is None else limit,)
+        rows = self._query("SELECT sender_id, channel_id, content, id, reception_date FROM messages "
+                           f"WHERE reception_date >= ? AND reception_date < ?{channel_filter} ORDER BY id LIMIT ?", params)
+        return [Message(*row) for row in rows]
+
+    def get_messages_page(self, channel_id : int, limit : int = 50, before : int = None, after : int = None) -> MessagePage:
+        # Requêtes par intervalle sur l'index (channel_id, id) ; une ligne de plus
+        # que demandé indique s'il reste des messages au-delà de la page.
+        if after is not None:
+            rows = self._query("SELECT id, sender_id, channel_id, content, reception_date FROM messages WHERE channel_id = ? AND id > ? ORDER BY id LIMIT ?",
+                               (channel_id, after, limit))
+            first = rows[0][0] if rows else after + 1
+            has_older = bool(self._query("SELECT 1 FROM messages WHERE channel_id = ? AND id < ? LIMIT 1", (channel_id, first)))
+        else:
+            upper = before if before is not None else MAX_ID
+            rows = self._query("SELECT id, sender_id, channel_id, content, reception_date FROM messages WHERE channel_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                               (channel_id, upper, limit + 1))
+            has_older = len(rows) > limit
+            rows = rows[:limit][::-1]
+            first = rows[0][0] if rows else None
+
+        messages = [Message(sender_id, channel, content, id, date) for id, sender_id, channel, content, date in rows]
+        last = rows[-1][0] if rows else (after if after is not None else 0)
+        return MessagePage(messages, before=first if has_older else None, after=last)
+
+    def post_messages(self, messages : List[tuple]) -> List[Message]:
+        with self.lock, self.connection:
+            rows = []
+            now = time.time()
+            for channel_id, sender_name, content in messages:
+                user = self.connection.execute("SELECT id FROM users WHERE name = ?", (sender_name,)).fetchone()
+                if user is None or not self.connection.execute("SELECT 1 FROM memberships WHERE channel_id = ? AND user_id = ?", (channel_id, user[0])).fetchone():
+                    print(f"\033[31mAucun message envoyé : {sender_name} n'est pas membre du canal {channel_id}.\033[0m")
+                    return None
+                rows.append((channel_id, user[0], content, now))
+            self.connection.executemany("INSERT INTO messages (channel_id, sender_id, content, reception_date) VALUES (?, ?, ?, ?)", rows)
+            # AUTOINCREMENT : les id du lot sont les derniers attribués dans cette transaction.
+            last_id = self.connection.execute("SELECT MAX(id) FROM messages").fetchone()[0]
+        print(f"\033[32m{len(rows)} messages envoyés avec succès.\033[0m")
+        first_id = (last_id or 0) - len(rows) + 1
+        return [Message(sender_id, channel_id, content, first_id + i, date) for i, (channel_id, sender_id, content, date) in enumerate(rows)]
+
+    def post_message(self, channel_id : int, sender_name : str, content : str) -> Message:
+        with self.lock, self.connection:
+            user_id = self.connection.execute("SELECT id FROM users WHERE name = ?", (sender_name,)).fetchone()[0]
+            channel_name = self.connection.execute("SELECT name FROM channels WHERE id = ?", (channel_id,)).fetchone()[0]
+            if not self.connection.execute("SELECT 1 FROM memberships WHERE channel_id = ? AND user_id = ?", (channel_id, user_id)).fetchone():
+                print(f"\033[31m{sender_name} doit rejoindre le canal {channel_id} avant d'envoyer des messages.\033[0m")
+                return None
+            date = time.time()
+            message_id = self.connection.execute("INSERT INTO messages (channel_id, sender_id, content, reception_date) VALUES (?, ?, ?, ?)",
+                                                 (channel_id, user_id, content, date)).lastrowid
+        print(f"\033[32m{sender_name} a envoyé un message avec succès dans le canal {channel_name}.\033[0m")
+        return Message(user_id, channel_id, content, message_id, date)
@@ -0,0 +1,56 @@
+"""Outils communs aux tests : fichiers serveur vides, http_server local, port fermé."""
+import asyncio
+import json
+import os
+import socket
+import threading
+from contextlib import redirect_stdout
+
+def write_empty(path : str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"users": [], "channels": [], "messages": []}, f)
+
+def dead_url() -> str:
+    """URL d'un port local sur lequel rien n'écoute."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"http://127.0.0.1:{port}"
+
+def quiet():
+    """Contexte qui masque les messages colorés des serveurs."""
+    return redirect_stdout(open(os.devnull, "w"))
+
+def start_http_server(path : str, journal : bool = False):
+    """Lance http_server sur un Server local dans un thread, sur un port libre ; renvoie (url, fonction d'arrêt)."""
+    from http_server import MessengerHTTPServer
+    from server import Server
+
+    server = Server(path, journal=journal)
+    url, stop_app = start_app(MessengerHTTPServer(server).app)
+
+    def stop():
+        stop_app()
+        server.close()
+    return url, stop
+
+def start_app(app):
+    """Sert une application aiohttp dans un thread, sur un port libre ; renvoie (url, fonction d'arrêt)."""
+    from aiohttp import web
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    loop.run_until_complete(web.SockSite(runner, sock).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", stop
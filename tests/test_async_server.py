@@ -0,0 +1,80 @@
+"""Tests d'AsyncRemoteServer contre un http_server local (port libre, dans un thread)."""
+import os
+import tempfile
+import unittest
+from async_server import AsyncRemoteServer
+from model import User, Channel
+from tests.fixtures import quiet, start_http_server, write_empty
+
+class AsyncRemoteServerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "remote.json")
+        write_empty(path)
+        self.quiet = quiet()
+        self.quiet.__enter__()
+        self.url, self.stop = start_http_server(path)
+
+    async def asyncSetUp(self):
+        self.server = AsyncRemoteServer(self.url)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    def tearDown(self):
+        self.stop()
+        self.quiet.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    async def test_creations_return_models(self):
+        user = await self.server.create_user("alice")
+        self.assertIsInstance(user, User)
+        self.assertEqual((user.id, user.name), (1, "alice"))
+        self.assertIsNone(await self.server.create_user("alice"))
+
+        channel = await self.server.create_channel("general")
+        self.assertIsInstance(channel, Channel)
+        self.assertEqual((channel.id, channel.name), (1, "general"))
+        self.assertIsNone(await self.server.create_channel("general"))
+
+    async def test_post_and_read_messages(self):
+        await self.server.create_user("alice")
+        await self.server.create_channel("general")
+        self.assertIsNone(await self.server.post_message(1, "alice", "trop tôt"))
+        await self.server.join_channel(1, "alice")
+
+        message = await self.server.post_message(1, "alice", "bonjour")
+        self.assertEqual((message["content"], message["sender_name"]), ("bonjour", "alice"))
+        await self.server.post_message(1, "alice", "au revoir")
+
+        messages = await self.server.get_messages(1)
+        self.assertEqual([message["content"] for message in messages], ["bonjour", "au revoir"])
+        page = await self.server.get_messages_page(1, limit=1)
+        self.assertEqual([message["content"] for message in page.messages], ["au revoir"])
+        older = await self.server.get_messages_page(1, limit=1, before=page.before)
+        self.assertEqual([message["content"] for message in older.messages], ["bonjour"])
+
+    async def test_post_to_unknown_channel(self):
+        await self.server.create_user("alice")
+        self.assertIsNone(await self.server.post_message(42, "alice", "perdu"))
+        self.assertIsNone(await self.server.post_message(42, "inconnu", "perdu"))
+
+    async def test_sender_names_read_the_cache_once(self):
+        await self.server.create_user("alice")
+        await self.server.create_channel("general")
+        await self.server.join_channel(1, "alice")
+        await self.server.post_message(1, "alice", "bonjour")
+        await self.server.post_message(1, "alice", "au revoir")
+        cache = self.server.user_cache
+        cache.hits = cache.misses = 0
+        messages = await self.server.get_messages(1)
+        self.assertEqual([message["sender_name"] for message in messages], ["alice", "alice"])
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        # Entrée expirée : un seul rechargement, jamais de None.
+        cache.invalidate()
+        messages = await self.server.get_messages(1)
+        self.assertEqual([message["sender_name"] for message in messages], ["alice", "alice"])
+        self.assertEqual(await self.server.get_user_name(42), "Unknown")
+
+if __name__ == "__main__":
+    unittest.main()
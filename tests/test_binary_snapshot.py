@@ -0,0 +1,93 @@
+"""Tests du format binaire des snapshots et de son chargement par le Server local."""
+import os
+import struct
+import tempfile
+import unittest
+import binary_snapshot
+from model import User, Channel
+from server import Server
+from tests.fixtures import quiet, write_empty
+
+class BinarySnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "server.bin")
+        self.quiet = quiet()
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        alice, bob = User(1, "alice"), User(2, "bob")
+        channel = Channel(3, "général")
+        channel.members = [alice, bob]
+        rows = [(1, 3, "bonjour", 10, 1000.5), (2, 3, "ça va ?", 11, 1001.0)]
+        binary_snapshot.save(self.path, 7, [alice, bob], [channel], rows, {"seq": 11})
+
+        snapshot = binary_snapshot.load(self.path)
+        self.assertEqual(snapshot.lsn, 7)
+        self.assertEqual(snapshot.users, [(1, "alice"), (2, "bob")])
+        self.assertEqual(snapshot.channels, [(3, "général", [1, 2])])
+        self.assertEqual(list(snapshot.sender_ids), [1, 2])
+        self.assertEqual(list(snapshot.channel_ids), [3, 3])
+        self.assertEqual(list(snapshot.contents), ["bonjour", "ça va ?"])
+        self.assertEqual(list(snapshot.ids), [10, 11])
+        self.assertEqual(list(snapshot.dates), [1000.5, 1001.0])
+        self.assertEqual(snapshot.extra, {"seq": 11})
+        snapshot.contents.materialize()
+
+    def test_newer_version_is_rejected(self):
+        binary_snapshot.save(self.path, 0, [], [], [])
+        with open(self.path, "r+b") as f:
+            f.seek(4)
+            f.write(struct.pack("<H", binary_snapshot.VERSION + 1))
+        with self.assertRaisesRegex(ValueError, "Version de snapshot"):
+            binary_snapshot.load(self.path)
+
+    def test_invalid_file_is_rejected(self):
+        with open(self.path, "wb") as f:
+            f.write(b"XXXX" + bytes(binary_snapshot.HEADER.size))
+        with self.assertRaisesRegex(ValueError, "pas un snapshot binaire"):
+            binary_snapshot.load(self.path)
+        with open(self.path, "wb") as f:
+            f.write(b"MSGB")
+        with self.assertRaisesRegex(ValueError, "pas un snapshot binaire"):
+            binary_snapshot.load(self.path)
+
+    def test_server_converts_json_to_binary(self):
+        json_path = os.path.join(self.directory.name, "server.json")
+        write_empty(json_path)
+        server = Server(json_path)
+        server.create_user("alice")
+        server.create_channel("general")
+        server.join_channel(1, "alice")
+        posted = [server.post_message(1, "alice", content) for content in ("un", "deux")]
+        server.save_as(self.path)
+
+        loaded = Server(self.path)
+        self.assertEqual(loaded.snapshot_format, "binary")
+        self.assertEqual([user.name for user in loaded.get_channel_members(1)], ["alice"])
+        self.assertEqual([(message.id, message.content, message.reception_date) for message in loaded.get_messages(1)],
+                         [(message.id, message.content, message.reception_date) for message in posted])
+
+    def test_save_releases_the_mapping(self):
+        write_empty(os.path.join(self.directory.name, "server.json"))
+        server = Server(os.path.join(self.directory.name, "server.json"))
+        server.create_user("alice")
+        server.create_channel("general")
+        server.join_channel(1, "alice")
+        server.post_message(1, "alice", "un")
+        server.save_as(self.path)
+
+        server = Server(self.path)
+        contents = server.messages.contents
+        self.assertIsInstance(contents, binary_snapshot.MappedContents)
+        # Chaque écriture remplace le fichier projeté : la projection est fermée avant.
+        server.post_message(1, "alice", "deux")
+        self.assertTrue(contents.mapped.closed)
+        self.assertEqual([message.content for message in Server(self.path).get_messages(1)], ["un", "deux"])
+
+if __name__ == "__main__":
+    unittest.main()
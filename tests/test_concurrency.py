@@ -0,0 +1,139 @@
+"""Tests des primitives de concurrence : verrou lecteurs/rédacteur, group commit, séquence."""
+import threading
+import time
+import unittest
+from concurrency import RWLock, GroupCommitWriter, Sequence
+
+class RWLockTest(unittest.TestCase):
+    def test_readers_share_the_lock(self):
+        lock = RWLock()
+        inside = threading.Barrier(3, timeout=2)
+
+        def read():
+            with lock.read():
+                inside.wait()  # les trois lecteurs doivent tenir le verrou ensemble
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        read()
+        for thread in threads:
+            thread.join()
+
+    def test_writer_is_exclusive_and_preferred(self):
+        lock = RWLock()
+        events = []
+        reading = threading.Event()
+        release = threading.Event()
+
+        def first_reader():
+            with lock.read():
+                reading.set()
+                release.wait(2)
+                events.append("lecture 1")
+
+        def writer():
+            with lock.write():
+                events.append("écriture")
+
+        def second_reader():
+            with lock.read():
+                events.append("lecture 2")
+
+        threads = [threading.Thread(target=first_reader)]
+        threads[0].start()
+        reading.wait(2)
+        threads.append(threading.Thread(target=writer))
+        threads[1].start()
+        while not lock.waiting_writers:
+            time.sleep(0.001)
+        # Le rédacteur attend : un nouveau lecteur passe après lui.
+        threads.append(threading.Thread(target=second_reader))
+        threads[2].start()
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+        release.set()
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(events, ["lecture 1", "écriture", "lecture 2"])
+
+class GroupCommitWriterTest(unittest.TestCase):
+    def test_batches_keep_submission_order_and_ack_after_flush(self):
+        flushed = []
+        durable = set()
+
+        def flush(batch):
+            time.sleep(0.002)
+            flushed.append(list(batch))
+            durable.update(batch)
+
+        writer = GroupCommitWriter(flush, window=0.005)
+        lock = threading.Lock()
+        order = []
+        acked_before_flush = []
+
+        def worker(index):
+            for i in range(50):
+                item = (index, i)
+                with lock:  # soumission et ordre attendu sous le même verrou (comme le verrou d'écriture du Server)
+                    ticket = writer.submit(item)
+                    order.append(item)
+                writer.wait(ticket)
+                if item not in durable:
+                    acked_before_flush.append(item)
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        self.assertEqual(acked_before_flush, [])
+        self.assertEqual([item for batch in flushed for item in batch], order)
+        self.assertEqual(writer.flushed, 400)
+        self.assertLess(len(flushed), 400)  # des écritures concurrentes ont partagé un flush
+
+    def test_close_flushes_pending_writes(self):
+        flushed = []
+        writer = GroupCommitWriter(flushed.extend, window=0.05)
+        for i in range(3):
+            writer.submit(i)
+        writer.close()
+        self.assertEqual(flushed, [0, 1, 2])
+
+    def test_flush_error_is_raised_to_waiters(self):
+        def flush(batch):
+            raise OSError("disque plein")
+
+        writer = GroupCommitWriter(flush, window=0)
+        ticket = writer.submit("x")
+        with self.assertRaisesRegex(OSError, "disque plein"):
+            writer.wait(ticket)
+        writer.close()
+
+class SequenceTest(unittest.TestCase):
+    def test_numbers_are_unique_and_increasing(self):
+        sequence = Sequence()
+        results = [[] for _ in range(4)]
+
+        def take(numbers):
+            for _ in range(1000):
+                numbers.append(sequence.next())
+        threads = [threading.Thread(target=take, args=(numbers,)) for numbers in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for numbers in results:
+            self.assertEqual(numbers, sorted(numbers))
+        self.assertEqual(sorted(number for numbers in results for number in numbers), list(range(1, 4001)))
+
+    def test_advance_never_goes_back(self):
+        sequence = Sequence(10)
+        sequence.advance(5)
+        self.assertEqual(sequence.next(), 11)
+        sequence.advance(20)
+        self.assertEqual(sequence.next(), 21)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Tests du journal du Server local : rejeu, réparation d'une écriture interrompue, compaction."""
+import json
+import os
+import tempfile
+import unittest
+from journal import Journal
+from server import Server
+from tests.fixtures import quiet, write_empty
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "server.json")
+        self.log_path = self.path + ".log"
+        write_empty(self.path)
+        self.quiet = quiet()
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def populate(self, **options) -> Server:
+        server = Server(self.path, journal=True, **options)
+        server.create_user("alice")
+        server.create_channel("general")
+        server.join_channel(1, "alice")
+        for content in ("un", "deux", "trois"):
+            server.post_message(1, "alice", content)
+        server.close()
+        return server
+
+    def contents(self, server : Server) -> list:
+        return [message.content for message in server.get_messages(1)]
+
+    def test_replay_restores_state(self):
+        self.populate()
+        server = Server(self.path, journal=True)
+        self.assertEqual([user.name for user in server.get_users()], ["alice"])
+        self.assertEqual([user.name for user in server.get_channel_members(1)], ["alice"])
+        self.assertEqual(self.contents(server), ["un", "deux", "trois"])
+        self.assertEqual(server.lsn, 6)
+        server.close()
+
+    def test_torn_record_is_dropped_and_truncated(self):
+        self.populate()
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+        last_line = data.rstrip(b"\n").rsplit(b"\n", 1)[1]
+        torn_size = len(data) - len(last_line) // 2 - 1
+        with open(self.log_path, "r+b") as f:
+            f.truncate(torn_size)
+
+        server = Server(self.path, journal=True)
+        self.assertEqual(self.contents(server), ["un", "deux"])
+        self.assertEqual(os.path.getsize(self.log_path), len(data) - len(last_line) - 1)
+        # Les écritures suivantes reprennent après le dernier enregistrement valide.
+        server.post_message(1, "alice", "quatre")
+        server.close()
+        server = Server(self.path, journal=True)
+        self.assertEqual(self.contents(server), ["un", "deux", "quatre"])
+        server.close()
+
+    def test_garbage_line_stops_replay(self):
+        self.populate()
+        with open(self.log_path, "ab") as f:
+            f.write(b'{"op": "post_mess\n')
+        records = Journal(self.log_path).replay(repair=False)
+        self.assertEqual(len(records), 6)
+        server = Server(self.path, journal=True)
+        self.assertEqual(self.contents(server), ["un", "deux", "trois"])
+        server.close()
+
+    def test_read_only_replay_leaves_journal_untouched(self):
+        self.populate()
+        with open(self.log_path, "ab") as f:
+            f.write(b'{"op": "post')
+        size = os.path.getsize(self.log_path)
+        server = Server(self.path, read_only=True)
+        self.assertEqual(self.contents(server), ["un", "deux", "trois"])
+        self.assertEqual(os.path.getsize(self.log_path), size)
+
+    def test_replay_without_journal_mode_folds_the_log(self):
+        self.populate()
+        server = Server(self.path)
+        self.assertEqual(self.contents(server), ["un", "deux", "trois"])
+        self.assertFalse(os.path.exists(self.log_path))
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)["messages"]), 3)
+        server.create_user("bob")
+        server.close()
+
+        # Une session journalisée ne rejoue pas les mutations déjà repliées.
+        server = Server(self.path, journal=True)
+        self.assertEqual(self.contents(server), ["un", "deux", "trois"])
+        self.assertEqual([user.name for user in server.get_users()], ["alice", "bob"])
+        server.close()
+
+    def test_compaction_truncates_the_journal(self):
+        self.populate(compact_every=4)
+        with open(self.path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot["lsn"], 4)
+        self.assertEqual(len(Journal(self.log_path).replay(repair=False)), 2)
+
+        server = Server(self.path, journal=True, compact_every=4)
+        self.assertEqual(self.contents(server), ["un", "deux", "trois"])
+        server.compact()
+        self.assertEqual(os.path.getsize(self.log_path), 0)
+        server.close()
+        server = Server(self.path, journal=True)
+        self.assertEqual(self.contents(server), ["un", "deux", "trois"])
+        self.assertEqual(server.lsn, 6)
+        server.close()
+
+if __name__ == "__main__":
+    unittest.main()
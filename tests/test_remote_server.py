@@ -0,0 +1,71 @@
+"""Tests de RemoteServer contre un http_server local et contre un serveur aux anciennes routes."""
+import os
+import tempfile
+import unittest
+from aiohttp import web
+from server import RemoteServer
+from tests.fixtures import quiet, start_app, start_http_server, write_empty
+
+def legacy_app() -> web.Application:
+    """Serveur distant déployé avant GET /channels/{id}/messages."""
+    users = [{"id": 1, "name": "alice"}]
+    messages = [
+        {"id": 1, "sender_id": 1, "channel_id": 1, "content": "un"},
+        {"id": 2, "sender_id": 1, "channel_id": 2, "content": "ailleurs"},
+        {"id": 3, "sender_id": 1, "channel_id": 1, "content": "deux"},
+    ]
+
+    async def get_users(request):
+        return web.json_response(users)
+
+    async def get_messages(request):
+        return web.json_response(messages)
+
+    app = web.Application()
+    app.add_routes([web.get("/users", get_users), web.get("/messages", get_messages)])
+    return app
+
+class RemoteServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "remote.json")
+        write_empty(self.path)
+        self.quiet = quiet()
+        self.quiet.__enter__()
+        self.stops = []
+
+    def tearDown(self):
+        for stop in self.stops:
+            stop()
+        self.quiet.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def remote(self, app : web.Application = None) -> RemoteServer:
+        url, stop = start_app(app) if app is not None else start_http_server(self.path)
+        server = RemoteServer(url, retries=0)
+        self.stops += [stop, server.close]
+        return server
+
+    def test_get_messages(self):
+        server = self.remote()
+        server.create_user("alice")
+        server.create_channel("general")
+        server.create_channel("autre")
+        server.join_channel(1, "alice")
+        server.join_channel(2, "alice")
+        server.post_message(1, "alice", "un")
+        server.post_message(2, "alice", "ailleurs")
+        server.post_message(1, "alice", "deux")
+        messages = server.get_messages(1)
+        self.assertEqual([(message["content"], message["sender_name"]) for message in messages], [("un", "alice"), ("deux", "alice")])
+        self.assertFalse(server.legacy_messages)
+
+    def test_get_messages_falls_back_to_the_legacy_route(self):
+        server = self.remote(legacy_app())
+        messages = server.get_messages(1)
+        self.assertEqual([(message["content"], message["sender_name"]) for message in messages], [("un", "alice"), ("deux", "alice")])
+        self.assertTrue(server.legacy_messages)
+        self.assertEqual([message["content"] for message in server.get_messages(2)], ["ailleurs"])
+
+if __name__ == "__main__":
+    unittest.main()
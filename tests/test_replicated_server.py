@@ -0,0 +1,103 @@
+"""Tests de ReplicatedServer contre un http_server local (port libre, dans un thread)."""
+import os
+import tempfile
+import unittest
+from replicated_server import ReplicatedServer
+from server import RemoteServer
+from tests.fixtures import dead_url, quiet, start_http_server, write_empty
+
+class ReplicatedServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.remote_path = os.path.join(self.directory.name, "remote.json")
+        self.replica_path = os.path.join(self.directory.name, "replica.json")
+        write_empty(self.remote_path)
+        self.quiet = quiet()
+        self.quiet.__enter__()
+        self.url, self.stop = start_http_server(self.remote_path, journal=True)
+        self.replicas = []
+
+    def tearDown(self):
+        for replica in self.replicas:
+            replica.close()
+        self.stop()
+        self.quiet.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def replica(self, url : str = None) -> ReplicatedServer:
+        remote = RemoteServer(url or self.url, connect_timeout=0.5, read_timeout=2.0, retries=0)
+        replica = ReplicatedServer(remote, self.replica_path, sync_interval=0)
+        self.replicas.append(replica)
+        return replica
+
+    def remote(self) -> RemoteServer:
+        return RemoteServer(self.url, retries=0)
+
+    def test_writes_are_pushed_then_pulled(self):
+        self.remote().create_channel("general")
+        replica = self.replica()
+        self.assertTrue(replica.sync())
+        replica.create_user("alice")
+        self.assertTrue(replica.sync())
+        replica.join_channel(1, "alice")
+        replica.post_message(1, "alice", "bonjour")
+        self.assertEqual(replica.sync_status()["pending"], 2)
+        self.assertTrue(replica.sync())
+
+        self.assertEqual([message["content"] for message in self.remote().get_messages(1)], ["bonjour"])
+        self.assertEqual([message.content for message in replica.get_messages(1)], ["bonjour"])
+        status = replica.sync_status()
+        self.assertEqual((status["online"], status["pending"], status["conflicts"]), (True, 0, 0))
+        self.assertEqual(status["checkpoint"], 1)
+
+    def test_offline_writes_survive_restart(self):
+        self.remote().create_channel("general")
+        self.assertTrue(self.replica().sync())
+        self.replicas.pop().close()
+
+        offline = self.replica(dead_url())
+        offline.create_user("bob")
+        self.assertFalse(offline.sync())
+        self.assertFalse(offline.sync_status()["online"])
+        self.assertEqual(offline.sync_status()["pending"], 1)
+        self.replicas.pop().close()
+        self.assertTrue(os.path.exists(self.replica_path + ".outbox"))
+
+        online = self.replica()
+        self.assertEqual(online.sync_status()["pending"], 1)
+        self.assertTrue(online.sync())
+        self.assertEqual([user.name for user in self.remote().get_users()], ["bob"])
+        self.assertEqual([user.name for user in online.get_users()], ["bob"])
+        self.assertEqual(online.sync_status()["pending"], 0)
+
+    def test_conflicting_write_is_dropped(self):
+        replica = self.replica(dead_url())
+        replica.create_user("carol")
+        self.replicas.pop().close()
+        self.remote().create_user("carol")
+
+        replica = self.replica()
+        self.assertTrue(replica.sync())
+        status = replica.sync_status()
+        self.assertEqual((status["pending"], status["conflicts"]), (0, 1))
+        operation, reason = replica.conflicts[0]
+        self.assertEqual(operation["name"], "carol")
+        self.assertIn("existe déjà", reason)
+        self.assertEqual([user.name for user in replica.get_users()], ["carol"])
+
+    def test_replayed_post_is_not_duplicated(self):
+        remote = self.remote()
+        remote.create_channel("general")
+        remote.create_user("dave")
+        remote.join_channel(1, "dave")
+        replica = self.replica()
+        self.assertTrue(replica.sync())
+        replica.post_message(1, "dave", "une seule fois")
+        operation = replica.outbox[0]
+        # Réponse perdue après acceptation : la même écriture est renvoyée.
+        self.assertIsNone(replica._send(operation))
+        self.assertTrue(replica.sync())
+        self.assertEqual([message["content"] for message in self.remote().get_messages(1)], ["une seule fois"])
+
+if __name__ == "__main__":
+    unittest.main()
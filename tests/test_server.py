@@ -0,0 +1,42 @@
+"""Tests du Server local : chargement, index et requêtes sur les messages."""
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from server import Server
+from tests.fixtures import quiet
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "server.json")
+        self.quiet = quiet()
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def write(self, users : list, channels : list, messages : list):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"users": users, "channels": channels, "messages": messages}, f)
+
+    def test_orphaned_messages_are_reported_and_dropped(self):
+        self.write([{"id": 1, "name": "alice"}],
+                   [{"id": 1, "name": "general", "members": [{"id": 1, "name": "alice"}]}],
+                   [{"sender_id": 1, "channel": 1, "content": "gardé"},
+                    {"sender_id": 2, "channel": 1, "content": "orphelin"}])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            server = Server(self.path)
+        self.assertIn("1 message(s) de l'utilisateur inexistant 2", output.getvalue())
+        self.assertEqual([message.content for message in server.get_messages(1)], ["gardé"])
+        # Le nouvel utilisateur 2 ne récupère pas les messages de l'ancien.
+        server.create_user("bob")
+        self.assertEqual(server.users_by_name["bob"].id, 2)
+        self.assertEqual([message.content for message in server.get_messages(1)], ["gardé"])
+
+if __name__ == "__main__":
+    unittest.main()